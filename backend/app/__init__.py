@@ -1,24 +1,120 @@
-from flask import Flask
-from app.routes import nlp, integration, template_generator, test
+from flask import Flask, jsonify, request
 from app.utils.config import configure_app, initialize_firebase
-from app.routes.settings import settings_bp
+from app.utils.instrumentation import init_instrumentation
+from app.utils.admission import init_admission
+from app.utils.startup import StartupReport
+from app.services.jobs import JobQueue
+from app.services.clients import ClientRegistry
+from app.services.document_cache import DocumentCache
+from app.services.publisher import (
+    GoogleDocsPublisher, NotionPublisher, PublishOutbox, PublishService,
+)
+
+def shutdown_app(app):
+    """Drains async jobs and releases pools, listeners and connections. Safe to call twice."""
+    if app.extensions.get("shutdown_done"):
+        return
+    app.extensions["shutdown_done"] = True
+    app.extensions["job_queue"].shutdown(wait=True)
+    app.extensions["publisher"].shutdown(timeout=app.config["SERVER_GRACEFUL_TIMEOUT"])
+    app.extensions["document_cache"].close()
+    if "admission" in app.extensions:
+        app.extensions["admission"].close()
+    app.extensions["clients"].close()
+
+    from app.services.pdf_renderer import shutdown_pdf_renderer
+    from app.services.transcript_extractor import shutdown_pdf_executor
+    shutdown_pdf_renderer()
+    shutdown_pdf_executor()
 
 def create_app():
+    startup = StartupReport()
     app = Flask(__name__)
-    configure_app(app)
+    with startup.phase("config"):
+        configure_app(app)
 
     # Initialize Firebase
-    initialize_firebase()
+    with startup.phase("firebase"):
+        initialize_firebase()
+
+    # Shared Firestore, Notion, Google Docs and HTTP clients, created on first use
+    app.extensions["clients"] = ClientRegistry(
+        http_pool_size=app.config["HTTP_POOL_SIZE"],
+        http_retries=app.config["HTTP_RETRIES"],
+        probe_ttl=app.config["HEALTH_PROBE_TTL"],
+    )
+
+    # Read-through cache for Firestore document reads
+    app.extensions["document_cache"] = DocumentCache(
+        lambda: app.extensions["clients"].firestore,
+        default_ttl=app.config["DOC_CACHE_DEFAULT_TTL"],
+        collection_ttls=app.config["DOC_CACHE_TTLS"],
+        max_entries=app.config["DOC_CACHE_MAX_ENTRIES"],
+        listen=app.config["DOC_CACHE_LISTEN"],
+    )
+
+    # Worker pool for routes called in async mode
+    app.extensions["job_queue"] = JobQueue(
+        max_workers=app.config["JOB_WORKERS"],
+        max_depth=app.config["JOB_MAX_QUEUE_DEPTH"],
+        retention=app.config["JOB_RETENTION_SECONDS"],
+        max_finished=app.config["JOB_MAX_FINISHED"],
+    )
 
-    # Register blueprints
-    app.register_blueprint(nlp.bp)
-    app.register_blueprint(integration.bp)
-    app.register_blueprint(template_generator.bp)
-    app.register_blueprint(test.bp)
-    app.register_blueprint(settings_bp)
+    # Outbox and background workers for Google Docs and Notion publishing
+    clients = app.extensions["clients"]
+    app.extensions["publisher"] = PublishService(
+        PublishOutbox(app.config["PUBLISH_DB_PATH"]),
+        {
+            "google_docs": GoogleDocsPublisher(clients),
+            "notion": NotionPublisher(clients, schema_ttl=app.config["NOTION_SCHEMA_TTL"]),
+        },
+        workers=app.config["PUBLISH_WORKERS"],
+        max_attempts=app.config["PUBLISH_MAX_ATTEMPTS"],
+        retry_backoff=app.config["PUBLISH_RETRY_BACKOFF"],
+    )
+    # Resume publishes left over from a previous run. With SERVER_PRELOAD the app is
+    # built in the gunicorn master, so the workers start on the first submit instead
+    # of before the fork.
+    if not app.config["SERVER_PRELOAD"]:
+        app.extensions["publisher"].start()
+
+    # Stage timers, Server-Timing, /metrics and /debug/profile
+    init_instrumentation(app)
+
+    # Per-tenant quotas and weighted fair queuing for the expensive routes
+    init_admission(app)
+
+    # Register blueprints. Route modules only import light dependencies; SDKs
+    # such as openai, slack_sdk, pypdf and python-docx load on first use.
+    with startup.phase("blueprints"):
+        from app.routes import nlp, integration, template_generator, test, jobs
+        from app.routes.settings import settings_bp
+        app.register_blueprint(nlp.bp)
+        app.register_blueprint(integration.bp)
+        app.register_blueprint(template_generator.bp)
+        app.register_blueprint(test.bp)
+        app.register_blueprint(test.user_bp)
+        app.register_blueprint(settings_bp)
+        app.register_blueprint(jobs.bp)
+
+    if app.config["PRELOAD_SECTION_VECTORS"]:
+        with startup.phase("section_vectors"):
+            from app.services.section_classifier import get_section_classifier
+            get_section_classifier()
 
     @app.route("/")
     def index():
         return "Welcome to the Intelligent Business Template API"
 
+    @app.route("/health")
+    def health():
+        # Liveness by default; ?deep=1 probes Firestore, Notion and Google Docs (cached for HEALTH_PROBE_TTL).
+        deep = request.args.get("deep", "").lower() in ("1", "true", "yes")
+        checks = app.extensions["clients"].health(deep=deep)
+        healthy = all(check["status"] != "error" for check in checks.values())
+        return jsonify({"status": "ok" if healthy else "degraded", "clients": checks}), 200 if healthy else 503
+
+    app.extensions["startup"] = startup.finish()
+    print(startup.summary())
     return app
\ No newline at end of file
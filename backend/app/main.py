@@ -3,4 +3,6 @@ from app import create_app
 app = create_app()
 
 if __name__ == "__main__":
-    app.run(debug=True)
+    # Development server only; production runs gunicorn -c gunicorn.conf.py wsgi:app
+    host, _, port = app.config["SERVER_BIND"].rpartition(":")
+    app.run(host=host or "0.0.0.0", port=int(port), debug=app.config["DEBUG"])
@@ -1,44 +1,52 @@
 import os
-import re
 import json
-from pypdf import PdfReader
-from docx import Document
-from flask import Blueprint, request, jsonify
-from app.services.messaging import SlackIntegration, WhatsAppIntegration, TeamsIntegration
-from app.services.nlp_processor import NLPProcessor
-from firebase_admin import firestore
+import threading
+from flask import Blueprint, current_app, request, jsonify
+from app.services.messaging import get_slack_integration, get_teams_integration, get_whatsapp_integration
+from app.services.nlp_processor import get_nlp_processor
+from app.services.text_normalizer import collapse_whitespace, compact_points
+from app.services.slack_ingest import ChannelStateStore, SlackIngestor
+from app.services.transcript_extractor import TranscriptTooLargeError, read_transcript, spool_upload
+from app.routes.jobs import is_async_request, submit_job
+from app.services.document_cache import get_document_cache
 
 # Configuration for wkhtmltopdf (optional, depending on your setup)
 wkhtmltopdf_path = '/usr/local/bin/wkhtmltopdf'  # Replace with the actual path if needed
 
 bp = Blueprint("integration", __name__, url_prefix="/integration")
 
-# Initialize messaging services
-slack_service = SlackIntegration()
-whatsapp_service = WhatsAppIntegration()
-teams_service = TeamsIntegration()
-nlp_processor = NLPProcessor(api_key=os.getenv("OPENAI_API_KEY"))
+PROVIDERS = ("slack", "teams", "whatsapp")
 
+# Messaging services and the NLP processor are created on first use, so importing
+# this module is cheap and a missing Slack token only affects the Slack routes.
+_slack_ingestor = None
+_slack_ingestor_lock = threading.Lock()
 
-def clean_and_extract_key_points(conversation):
-    cleaned_conversation = re.sub(r'\s+', ' ', conversation).strip()
-    key_points = nlp_processor.extract_key_points(cleaned_conversation)
+
+def get_slack_ingestor() -> SlackIngestor:
+    global _slack_ingestor
+    with _slack_ingestor_lock:
+        if _slack_ingestor is None:
+            _slack_ingestor = SlackIngestor(
+                get_slack_integration(),
+                clean_and_extract_key_points,
+                ChannelStateStore(os.getenv("SLACK_STATE_PATH", os.path.join(os.getenv("UPLOAD_FOLDER", "./uploads"), "slack_state.sqlite3"))),
+                page_size=int(os.getenv("SLACK_PAGE_SIZE", "200")),
+                initial_limit=int(os.getenv("SLACK_INITIAL_HISTORY", "200")),
+                max_points=int(os.getenv("SLACK_SUMMARY_MAX_POINTS", "50")),
+            )
+        return _slack_ingestor
+
+
+def clean_and_extract_key_points(conversation, normalized=False):
+    """Extracts a compact list of key points; pass normalized=True for text read_transcript already collapsed."""
+    cleaned_conversation = conversation if normalized else collapse_whitespace(conversation)
+    key_points = get_nlp_processor().extract_key_points_chunked(cleaned_conversation)
 
     if isinstance(key_points, dict) and "error" in key_points:
         return key_points # Return the error dictionary
 
-    cleaned_key_points = []
-    if isinstance(key_points, str):
-        for point in key_points.split('\n'):
-            cleaned_point = re.sub(r'\s+', ' ', point.strip())
-            if cleaned_point:
-                cleaned_point = re.sub(r"^\d+\.\s*", "", cleaned_point).strip()
-                cleaned_key_points.append(cleaned_point)
-    elif isinstance(key_points, list):
-        cleaned_key_points = [re.sub(r'\s+', ' ', str(point).strip()) for point in key_points]
-    else:
-        cleaned_key_points = []
-    return cleaned_key_points
+    return compact_points(key_points)
 
 @bp.route("/slack", methods=["POST"])
 def slack_event():
@@ -46,15 +54,22 @@ def slack_event():
     if not data or not data.get("channel_id"):
         return jsonify({"error": "Channel ID is required"}), 400
 
-    conversation = slack_service.fetch_conversation(data.get("channel_id"))
-    if not conversation:
-        return jsonify({"error": f"Failed to fetch Slack conversation: {slack_service.last_error}"}), 500
+    from slack_sdk.errors import SlackApiError
 
-    cleaned_key_points = clean_and_extract_key_points(conversation)
-    if isinstance(cleaned_key_points, dict) and "error" in cleaned_key_points:
-        return jsonify(cleaned_key_points), 500
+    try:
+        slack_ingestor = get_slack_ingestor()
+    except ValueError as e:
+        return jsonify({"error": f"Slack is not configured: {e}"}), 503
 
-    return jsonify({"key_points": cleaned_key_points})
+    try:
+        result = slack_ingestor.ingest(data.get("channel_id"), reset=bool(data.get("reset")))
+    except SlackApiError as e:
+        slack_ingestor.slack.last_error = str(e)
+        return jsonify({"error": f"Failed to fetch Slack conversation: {slack_ingestor.slack.last_error}"}), 500
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 500
+
+    return jsonify(result)
 
 @bp.route("/whatsapp", methods=["POST"])
 def whatsapp_event():
@@ -62,7 +77,7 @@ def whatsapp_event():
     if not data or not data.get("thread_id"):
         return jsonify({"error": "Thread ID is required"}), 400
 
-    conversation = whatsapp_service.fetch_conversation(data.get("thread_id"))
+    conversation = get_whatsapp_integration().fetch_conversation(data.get("thread_id"))
     if not conversation:
         return jsonify({"error": "Failed to fetch WhatsApp conversation"}), 500
 
@@ -77,7 +92,7 @@ def teams_event():
     if not data or not data.get("team_id"):
         return jsonify({"error": "Team ID is required"}), 400
 
-    conversation = teams_service.fetch_conversation(data.get("team_id"))
+    conversation = get_teams_integration().fetch_conversation(data.get("team_id"))
     if not conversation:
         return jsonify({"error": "Failed to fetch Teams conversation"}), 500
 
@@ -87,36 +102,100 @@ def teams_event():
 
     return jsonify({"key_points": cleaned_key_points})
 
+def process_upload_job(filename, source, max_pages, max_chars):
+    """Runs the upload pipeline; source is a spooled upload when filename is set, else the transcript text."""
+    normalized = bool(filename)
+    if filename:
+        with source:
+            transcript = read_transcript(filename, source, max_pages, max_chars)
+    else:
+        transcript = source
+        if len(transcript) > max_chars:
+            raise TranscriptTooLargeError(f"Transcript exceeds the {max_chars} character limit")
+    if not transcript:
+        raise ValueError("Transcript is required")
+
+    cleaned_key_points = clean_and_extract_key_points(transcript, normalized)
+    if isinstance(cleaned_key_points, dict) and "error" in cleaned_key_points:
+        raise RuntimeError(cleaned_key_points["error"])
+    return {"key_points": cleaned_key_points}
+
+@bp.route("/fan_out", methods=["POST"])
+async def fan_out_event():
+    """Fetches from, or posts to, many conversations of one provider concurrently.
+
+    An async view: Flask runs it on an event loop in the request's worker thread.
+    """
+    data = request.json
+    if not data or data.get("provider") not in PROVIDERS or not data.get("ids"):
+        return jsonify({"error": "provider (slack, teams or whatsapp) and ids are required"}), 400
+    ids = data["ids"]
+    if not isinstance(ids, list) or not all(isinstance(i, str) and i for i in ids):
+        return jsonify({"error": "ids must be a list of non-empty strings"}), 400
+    action = data.get("action", "fetch")
+    if action not in ("fetch", "send") or (action == "send" and not data.get("message")):
+        return jsonify({"error": "action must be fetch, or send with a message"}), 400
+
+    from app.services.async_messaging import AsyncMessaging
+
+    async def run():
+        async with AsyncMessaging() as messaging:
+            if action == "fetch":
+                return await messaging.fetch_many(data["provider"], data["ids"])
+            return await messaging.send_many(data["provider"], data["ids"], data["message"])
+
+    try:
+        results = await run()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 500
+    failed = sum(1 for result in results if "error" in result)
+    return jsonify({"results": results, "succeeded": len(results) - failed, "failed": failed}), 200
+
 @bp.route("/upload", methods=["POST"])
 def upload_transcript():
     try:
+        max_pages = current_app.config["TRANSCRIPT_MAX_PAGES"]
+        max_chars = current_app.config["TRANSCRIPT_MAX_CHARS"]
+
+        if is_async_request():
+            # The upload stream is tied to this request, so spool it before handing off.
+            if "file" in request.files:
+                file = request.files["file"]
+                spooled = spool_upload(file.stream, file.filename)
+                response = submit_job("upload", process_upload_job, file.filename, spooled, max_pages, max_chars)
+                if response[1] != 202:
+                    spooled.close()
+                return response
+            transcript = (request.get_json(silent=True) or {}).get("transcript", "")
+            if not transcript:
+                return jsonify({"error": "Transcript is required"}), 400
+            return submit_job("upload", process_upload_job, None, transcript, max_pages, max_chars)
+
         transcript = ""
+        normalized = False
 
         if "file" in request.files:
             file = request.files["file"]
-            filename = file.filename.lower()
-
-            if filename.endswith(".pdf"):
-                reader = PdfReader(file)
-                transcript = " ".join([page.extract_text() for page in reader.pages])
-            elif filename.endswith(".docx"):
-                doc = Document(file)
-                transcript = "\n".join([paragraph.text for paragraph in doc.paragraphs])
-            else:
-                transcript = file.read().decode("utf-8")
+            with spool_upload(file.stream, file.filename) as spooled:
+                transcript = read_transcript(file.filename, spooled, max_pages, max_chars)
+            normalized = True
 
         elif request.json:
             transcript = request.json.get("transcript", "")
+            if len(transcript) > max_chars:
+                raise TranscriptTooLargeError(f"Transcript exceeds the {max_chars} character limit")
 
         if not transcript:
             return jsonify({"error": "Transcript is required"}), 400
 
-        cleaned_key_points = clean_and_extract_key_points(transcript)
+        cleaned_key_points = clean_and_extract_key_points(transcript, normalized)
         if isinstance(cleaned_key_points, dict) and "error" in cleaned_key_points:
             return jsonify(cleaned_key_points), 500
 
         return jsonify({"key_points": cleaned_key_points}), 200
 
+    except TranscriptTooLargeError as e:
+        return jsonify({"error": str(e)}), 413
     except UnicodeDecodeError:
         return jsonify({"error": "Unsupported file encoding or format"}), 400
     except Exception as e:
@@ -127,12 +206,14 @@ def upload_transcript():
 @bp.route("/read/<collection>/<doc_id>", methods=["GET"])
 def read_document(collection, doc_id):
     try:
-        db = firestore.client()
-        doc_ref = db.collection(collection).document(doc_id)
-        doc = doc_ref.get()
-        if doc.exists:
-            return jsonify(doc.to_dict()), 200
+        document = get_document_cache().get(collection, doc_id)
+        if document is not None:
+            return jsonify(document), 200
         else:
             return jsonify({"error": "Document not found"}), 404
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
+
+@bp.route("/cache/stats", methods=["GET"])
+def document_cache_stats():
+    return jsonify(get_document_cache().stats()), 200
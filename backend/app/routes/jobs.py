@@ -0,0 +1,82 @@
+import io
+from flask import Blueprint, current_app, g, jsonify, request, send_file, url_for
+from app.services.jobs import QueueFullError
+from app.services.token_budget import usage_route
+
+bp = Blueprint("jobs", __name__, url_prefix="/jobs")
+
+
+def is_async_request():
+    """True when the client asked for async mode via ?async=1 or an "async" JSON/form field."""
+    flag = request.args.get("async") or request.form.get("async")
+    if flag is None and request.is_json:
+        flag = (request.get_json(silent=True) or {}).get("async")
+    return str(flag).lower() in ("1", "true", "yes")
+
+
+def run_for_route(route, slot, fn, *args, **kwargs):
+    """Runs a job with its OpenAI usage charged to the route that queued it, then frees its admission slot."""
+    try:
+        with usage_route(route):
+            return fn(*args, **kwargs)
+    finally:
+        if slot is not None:
+            slot.release()
+
+
+def submit_job(kind, fn, *args, **kwargs):
+    """Queues fn on the app's job queue and returns the 202 (or 429) response.
+
+    The request's admission slot, if any, goes with the job, so admission
+    control counts the job until it finishes rather than until the 202.
+    """
+    slot = g.get("admission_slot")
+    try:
+        job = current_app.extensions["job_queue"].submit(
+            kind, run_for_route, request.endpoint, slot, fn, *args, **kwargs
+        )
+    except QueueFullError as e:
+        response = jsonify({"error": str(e)})
+        response.headers["Retry-After"] = str(current_app.config["JOB_RETRY_AFTER"])
+        return response, 429
+
+    # The job owns the slot now; the request's teardown must not release it.
+    g.pop("admission_slot", None)
+    status_url = url_for("jobs.get_job", job_id=job.id)
+    response = jsonify({**job.to_dict(), "status_url": status_url})
+    response.headers["Location"] = status_url
+    return response, 202
+
+
+@bp.route("/<job_id>", methods=["GET"])
+def get_job(job_id):
+    job = current_app.extensions["job_queue"].get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    payload = job.to_dict()
+    if job.status == "succeeded":
+        if isinstance(job.result, dict) and isinstance(job.result.get("content"), bytes):
+            payload["artifact_url"] = url_for("jobs.get_job_artifact", job_id=job.id)
+        else:
+            payload["result"] = job.result
+    return jsonify(payload), 200
+
+
+@bp.route("/<job_id>/artifact", methods=["GET"])
+def get_job_artifact(job_id):
+    job = current_app.extensions["job_queue"].get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    if job.status != "succeeded":
+        return jsonify({"error": f"Job is {job.status}"}), 409
+    if not isinstance(job.result, dict) or not isinstance(job.result.get("content"), bytes):
+        return jsonify({"error": "Job has no file artifact"}), 404
+
+    return send_file(
+        io.BytesIO(job.result["content"]),
+        mimetype=job.result["mimetype"],
+        as_attachment=True,
+        download_name=job.result["filename"],
+        etag=job.result["etag"],
+    )
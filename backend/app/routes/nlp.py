@@ -1,9 +1,8 @@
-import os
-from flask import Blueprint, request, jsonify
-from app.services.nlp_processor import NLPProcessor  # Assuming you have this
+import json
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from app.services.nlp_processor import get_nlp_processor
 
 bp = Blueprint("nlp", __name__, url_prefix="/nlp")
-nlp_processor = NLPProcessor(api_key=os.getenv("OPENAI_API_KEY"))
 
 @bp.route("/process", methods=["POST"])
 def process_text():
@@ -13,9 +12,46 @@ def process_text():
             return jsonify({"error": "Text is required"}), 400
 
         text = data["text"]
-        key_points = nlp_processor.extract_key_points(text) # Use your NLP logic.
+        if data.get("stream") or request.accept_mimetypes.best == "text/event-stream":
+            # stream_with_context keeps the request around so usage is charged to this route.
+            return Response(
+                stream_with_context(stream_key_point_events(text)),
+                mimetype="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            )
+
+        key_points = get_nlp_processor().extract_key_points_chunked(text) # Use your NLP logic.
 
         return jsonify({"key_points": key_points}), 200 # Return 200 OK
     except Exception as e:
         print(f"NLP Processing Error: {e}") # Log the error for debugging
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
+
+def sse_event(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+def stream_key_point_events(text):
+    """Relays key points as Server-Sent Events: one "point" event each, then "done" with the full list."""
+    key_points = []
+    try:
+        for point in get_nlp_processor().stream_key_points(text):
+            key_points.append(point)
+            yield sse_event("point", {"index": len(key_points) - 1, "point": point})
+    except Exception as e:
+        print(f"NLP Streaming Error: {e}")
+        yield sse_event("error", {"error": str(e)})
+        return
+    yield sse_event("done", {"key_points": key_points})
+
+@bp.route("/cache/stats", methods=["GET"])
+def cache_stats():
+    return jsonify(get_nlp_processor().cache_stats()), 200
+
+@bp.route("/limits/stats", methods=["GET"])
+def limit_stats():
+    return jsonify(get_nlp_processor().limit_stats()), 200
+
+@bp.route("/usage", methods=["GET"])
+def usage_stats():
+    """Prompt and completion tokens and latency per route, plus the most recent calls."""
+    return jsonify(get_nlp_processor().usage_stats()), 200
@@ -1,12 +1,15 @@
-from flask import Blueprint, request, jsonify
-from firebase_admin import firestore
+from flask import Blueprint, current_app, request, jsonify
+from app.services.clients import get_clients
+from app.services.document_cache import get_document_cache
+from app.services.firestore_bulk import bulk_write, bulk_writes
+from app.utils.metrics import timed
 
 settings_bp = Blueprint("settings", __name__, url_prefix="/settings")
 
 @settings_bp.route("/update", methods=["POST"])
 def update_settings():
     try:
-        db = firestore.client()  # Initialize Firestore client inside the function
+        db = get_clients().firestore
         data = request.json
         setting_id = data.get("setting_id")
         settings_data = data.get("settings_data")
@@ -15,17 +18,42 @@ def update_settings():
             return jsonify({"error": "setting_id and settings_data are required"}), 400
 
         doc_ref = db.collection("settings").document(setting_id)
-        doc_ref.update(settings_data)
+        with timed("firestore.write"):
+            doc_ref.update(settings_data)
+        get_document_cache().invalidate("settings", setting_id)
 
         return jsonify({"status": "success", "message": "Settings updated successfully"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@settings_bp.route("/bulk_update", methods=["POST"])
+def bulk_update_settings():
+    """Updates many settings documents through chunked Firestore batched writes."""
+    try:
+        data = request.json
+        items = data.get("settings") if data else None
+        if not isinstance(items, list) or not items:
+            return jsonify({"error": "settings must be a non-empty list"}), 400
+        max_documents = current_app.config["BULK_MAX_DOCUMENTS"]
+        if len(items) > max_documents:
+            return jsonify({"error": f"At most {max_documents} documents are allowed per request"}), 400
+
+        writes = bulk_writes("update", "settings", items, "setting_id", "settings_data")
+        report = bulk_write(get_clients().firestore, writes, "setting_id and settings_data are required")
+        for result in report["results"]:
+            if result["status"] == "ok":
+                get_document_cache().invalidate("settings", result["id"])
+        return jsonify(report), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @settings_bp.route("/delete/<collection>/<doc_id>", methods=["DELETE"])
 def delete_document(collection, doc_id):
     try:
-        db = firestore.client()  # Initialize Firestore client inside the function
-        db.collection(collection).document(doc_id).delete()
+        db = get_clients().firestore
+        with timed("firestore.write"):
+            db.collection(collection).document(doc_id).delete()
+        get_document_cache().invalidate(collection, doc_id)
         return jsonify({"status": "success", "message": "Document deleted successfully"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
\ No newline at end of file
@@ -1,98 +1,37 @@
 import os
 import io
-from notion_client import Client
+import json
 from dotenv import load_dotenv
-from flask import Blueprint, send_file, make_response, request, jsonify
+from flask import Blueprint, Response, current_app, send_file, make_response, request, jsonify, url_for
 from app.services import template_service
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
+from app.services.pdf_renderer import get_pdf_renderer
+from app.templates.industry_templates import get_available_industries
+from app.utils.zip_stream import stream_zip
+from app.routes.jobs import is_async_request, submit_job
+from app.services.publisher import get_publisher
 
 load_dotenv()
 
 bp = Blueprint("template_generator", __name__, url_prefix="/templates")
 
-# Google Docs Functionality
+def send_document(document):
+    if not document["content"]:
+        return jsonify({"error": "File generation failed"}), 500
 
-def save_to_google_docs(template_content, document_title):
-    credentials_path = os.getenv("GOOGLE_SERVICE_ACCOUNT_CREDENTIALS")
-    if not credentials_path or not os.path.exists(credentials_path):
-        raise FileNotFoundError(f"Google credentials file not found: {credentials_path}")
-
-    try:
-        credentials = service_account.Credentials.from_service_account_file(
-            credentials_path,
-            scopes=["https://www.googleapis.com/auth/documents"]
-        )
-        docs_service = build('docs', 'v1', credentials=credentials)
-
-        # Create a new Google Doc
-        document = docs_service.documents().create(body={"title": document_title}).execute()
-        document_id = document.get("documentId")
-
-        # Write content to the Google Doc
-        requests = [{"insertText": {"location": {"index": 1}, "text": template_content}}]
-        docs_service.documents().batchUpdate(documentId=document_id, body={"requests": requests}).execute()
-
-        return f"https://docs.google.com/document/d/{document_id}"
-    except Exception as e:
-        print(f"Error saving to Google Docs: {e}")
-        return None
-
-# Notion Functionality
-
-def save_to_notion(template_content, page_title):
-    notion_token = os.getenv("YOUR_NOTION_INTEGRATION_TOKEN")
-    database_id = os.getenv("YOUR_DATABASE_ID")
-
-    if not notion_token:
-        raise ValueError("YOUR_NOTION_INTEGRATION_TOKEN environment variable is not set.")
-    if not database_id:
-        raise ValueError("YOUR_DATABASE_ID environment variable is not set.")
-
-    notion = Client(auth=notion_token)
-
-    try:
-        database = notion.databases.retrieve(database_id)
-        # Find the title property
-        title_property_name = None
-        for name, details in database["properties"].items():
-            if details["type"] == "title":
-                title_property_name = name
-                break
-        if not title_property_name:
-            raise ValueError("No title property found in the database.")
-
-        # Construct the properties dictionary dynamically
-        properties = {
-            title_property_name: {"title": [{"text": {"content": page_title}}]}
-        }
-
-        # Example: Setting "Status" to "In Progress" (Adapt as needed)
-        if "Status" in database["properties"]:
-            properties["Status"] = {"select": {"name": "In Progress"}}
-        # Example: Setting "Due Date" (Adapt as needed)
-        if "Due Date" in database["properties"]:
-            properties["Due Date"] = {"date": {"start": "2024-12-31"}}  # ISO 8601 format
-
-        new_page = notion.pages.create(
-            parent={"database_id": database_id},
-            properties=properties,
-            children=[
-                {
-                    "object": "block",
-                    "type": "paragraph",
-                    "paragraph": {
-                        "rich_text": [{"type": "text", "text": {"content": template_content}}]
-                    }
-                }
-            ]
-        )
+    # Werkzeug only evaluates conditional headers for GET/HEAD, and these routes are POST.
+    if request.if_none_match.contains(document["etag"]):
+        response = make_response("", 304)
+        response.set_etag(document["etag"])
+        return response
 
-        url = new_page.get("url")
-        return url
-    except Exception as e:
-        print(f"Error saving to Notion: {e}")
-        return None
+    response = make_response(send_file(
+        io.BytesIO(document["content"]),
+        mimetype=document["mimetype"],
+        as_attachment=True,
+        download_name=document["filename"],
+        etag=document["etag"],
+    ))
+    return response
 
 @bp.route("/generate", methods=["POST"])
 def generate():
@@ -103,44 +42,28 @@ def generate():
         template_type = data["template_type"]
         key_points = data["key_points"]
         format_type = data.get("format", "word")  # Default to "word"
+        industry = data.get("industry")
 
-        template_data = template_service.create_template(template_type, key_points)
-        content = template_data.get("content", "")
-
-        file_bytes = None
-        mimetype = None
-        filename = None
-
-        if format_type == "word":
-            mimetype = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-            filename = f"{template_type}.docx"
-            file_bytes = template_service.export_as_word(content)
-        elif format_type == "pdf":
-            mimetype = "application/pdf"
-            filename = f"{template_type}.pdf"
-            file_bytes = template_service.export_as_pdf(content)
-        elif format_type == "pptx":
-            mimetype = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
-            filename = f"{template_type}.pptx"
-            file_bytes = template_service.export_as_pptx(content)
-        else:
+        if format_type not in template_service.EXPORT_FORMATS:
             return jsonify({"error": f"Unsupported format: {format_type}"}), 400
+        if industry and industry not in get_available_industries():
+            return jsonify({"error": f"Unknown industry: {industry}"}), 400
 
-        if file_bytes is None:
-            return jsonify({"error": "File generation failed"}), 500
-
-        response = make_response(send_file(
-            io.BytesIO(file_bytes),
-            mimetype=mimetype,
-            as_attachment=True,
-            download_name=filename,
-        ))
+        if is_async_request():
+            return submit_job("generate", render_document_job, template_type, key_points, format_type, industry)
 
-        return response
+        document = template_service.render_document(template_type, key_points, format_type, industry)
+        return send_document(document)
     except Exception as e:
         print(f"Template Generation Error: {e}")
         return jsonify({"error": str(e)}), 500
 
+def render_document_job(template_type, key_points, format_type, industry=None):
+    document = template_service.render_document(template_type, key_points, format_type, industry)
+    if not document["content"]:
+        raise RuntimeError("File generation failed")
+    return document
+
 @bp.route("/store", methods=["POST"])
 def store_template():
     try:
@@ -148,62 +71,145 @@ def store_template():
         template_type = data.get("template_type")
         key_points = data.get("key_points")
         format_type = data.get("format")
+        industry = data.get("industry")
 
         if not template_type or not key_points or not format_type:
             return jsonify({"error": "template_type, key_points, and format are required"}), 400
 
-        content = template_service.create_template(template_type, key_points)["content"]
-
-        file_bytes = None
-        mimetype = None
-        filename = None
-
-        if format_type == "word":
-            mimetype = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-            filename = f"{template_type}.docx"
-            file_bytes = template_service.export_as_word(content)
-        elif format_type == "pdf":
-            mimetype = "application/pdf"
-            filename = f"{template_type}.pdf"
-            file_bytes = template_service.export_as_pdf(content)
-        elif format_type == "pptx":
-            mimetype = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
-            filename = f"{template_type}.pptx"
-            file_bytes = template_service.export_as_pptx(content)
-        else:
+        if format_type not in template_service.EXPORT_FORMATS:
             return jsonify({"error": f"Unsupported format: {format_type}"}), 400
+        if industry and industry not in get_available_industries():
+            return jsonify({"error": f"Unknown industry: {industry}"}), 400
 
-        if file_bytes is None:
-            return jsonify({"error": "File generation failed"}), 500
-
-        response = make_response(send_file(
-            io.BytesIO(file_bytes),
-            mimetype=mimetype,
-            as_attachment=True,
-            download_name=filename,
-        ))
-
-        return response
+        document = template_service.render_document(template_type, key_points, format_type, industry)
+        return send_document(document)
     except Exception as e:
         print(f"Template Generation Error: {e}")
         return jsonify({"error": str(e)}), 500
 
-@bp.route('/save_to_google_docs', methods=['POST'])
-def save_to_google_docs_route():
-    """Saves the generated template to Google Docs."""
+@bp.route("/generate_batch", methods=["POST"])
+def generate_batch():
+    """Renders several (template_type, format, industry) specs and streams them back as one zip."""
     try:
         data = request.get_json()
-        template_type = data.get("template_type")
-        key_points = data.get("key_points")
-
-        if not template_type or not key_points:
-            return jsonify({"error": "template_type and key_points are required"}), 400
+        if not data or not data.get("specs"):
+            return jsonify({"error": "specs are required"}), 400
+
+        specs = []
+        for spec in data["specs"]:
+            template_type = spec.get("template_type")
+            format_type = spec.get("format", "word")
+            key_points = spec.get("key_points", data.get("key_points"))
+            industry = spec.get("industry")
+            if not template_type or not key_points:
+                return jsonify({"error": "Each spec needs a template_type and key_points"}), 400
+            if format_type not in template_service.EXPORT_FORMATS:
+                return jsonify({"error": f"Unsupported format: {format_type}"}), 400
+            if industry and industry not in get_available_industries():
+                return jsonify({"error": f"Unknown industry: {industry}"}), 400
+            specs.append({
+                "template_type": template_type,
+                "format": format_type,
+                "key_points": key_points,
+                "industry": industry,
+            })
+
+        max_specs = current_app.config["BATCH_MAX_SPECS"]
+        if len(specs) > max_specs:
+            return jsonify({"error": f"At most {max_specs} specs are allowed per batch"}), 400
+
+        results = template_service.render_batch(specs, max_workers=current_app.config["BATCH_MAX_WORKERS"])
+        return Response(
+            stream_zip(batch_entries(results)),
+            mimetype="application/zip",
+            headers={"Content-Disposition": "attachment; filename=templates.zip"},
+        )
+    except Exception as e:
+        print(f"Batch Generation Error: {e}")
+        return jsonify({"error": str(e)}), 500
 
-        template_data = template_service.create_template(template_type, key_points)
-        content = template_data.get("content", "")
+def batch_entries(results):
+    """Turns render_batch results into zip entries, ending with a manifest of what succeeded."""
+    manifest = []
+    used_names = set()
+    for spec, document, error in results:
+        entry = {"template_type": spec["template_type"], "format": spec["format"], "industry": spec["industry"]}
+        if error is None and not document["content"]:
+            error = "File generation failed"
+        if error is not None:
+            manifest.append({**entry, "error": error})
+            continue
+
+        name = document["filename"]
+        if spec["industry"]:
+            name = f"{spec['industry']}_{name}"
+        stem, extension = os.path.splitext(name)
+        suffix = 1
+        while name in used_names:
+            suffix += 1
+            name = f"{stem}_{suffix}{extension}"
+        used_names.add(name)
+
+        manifest.append({**entry, "filename": name})
+        yield name, document["content"]
+    yield "manifest.json", json.dumps({"entries": manifest}, indent=2).encode("utf-8")
+
+@bp.route("/cache/stats", methods=["GET"])
+def render_cache_stats():
+    return jsonify(template_service.rendered_documents.stats()), 200
+
+@bp.route("/pdf/stats", methods=["GET"])
+def pdf_render_stats():
+    return jsonify(get_pdf_renderer().stats_dict()), 200
+
+def publish_template(provider):
+    """Queues the generated template for publishing and returns where to poll for the URL."""
+    data = request.get_json()
+    template_type = data.get("template_type") if data else None
+    key_points = data.get("key_points") if data else None
+    industry = data.get("industry") if data else None
+
+    if not template_type or not key_points:
+        return jsonify({"error": "template_type and key_points are required"}), 400
+    if industry and industry not in get_available_industries():
+        return jsonify({"error": f"Unknown industry: {industry}"}), 400
+
+    template_data = template_service.create_template(template_type, key_points, industry)
+    content = template_data.get("content", "")
+    title = data.get("title") or f"{template_type} Template"
+
+    publish_id = get_publisher().submit(provider, title, content)
+    return jsonify({
+        "publish_id": publish_id,
+        "status": "pending",
+        "status_url": url_for("template_generator.publish_status", publish_id=publish_id),
+    }), 202
 
-        doc_url = save_to_google_docs(content, f"{template_type} Template")
-        return jsonify({"url": doc_url}), 200
+@bp.route('/save_to_google_docs', methods=['POST'])
+def save_to_google_docs_route():
+    """Saves the generated template to Google Docs in the background."""
+    try:
+        return publish_template("google_docs")
     except Exception as e:
         print(f"Google Docs Error: {e}")
         return jsonify({"error": str(e)}), 500
+
+@bp.route('/save_to_notion', methods=['POST'])
+def save_to_notion_route():
+    """Saves the generated template to the Notion database in the background."""
+    try:
+        return publish_template("notion")
+    except Exception as e:
+        print(f"Notion Error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@bp.route('/publish/<publish_id>', methods=['GET'])
+def publish_status(publish_id):
+    entry = get_publisher().outbox.get(publish_id)
+    if entry is None:
+        return jsonify({"error": "Unknown publish id"}), 404
+    return jsonify(entry), 200
+
+@bp.route('/publish/stats', methods=['GET'])
+def publish_stats():
+    return jsonify(get_publisher().outbox.counts()), 200
@@ -1,5 +1,7 @@
-from flask import Blueprint, request, jsonify
-from firebase_admin import firestore
+from flask import Blueprint, current_app, request, jsonify
+from app.services.clients import get_clients
+from app.services.firestore_bulk import bulk_write, bulk_writes
+from app.utils.metrics import timed
 
 # Ensure unique names for blueprints
 bp = Blueprint("test_bp", __name__, url_prefix="/test")  # Rename to "test_bp"
@@ -8,8 +10,9 @@ user_bp = Blueprint("user_bp", __name__, url_prefix="/user")  # Rename to "user_
 @bp.route("/firebase", methods=["GET"])
 def test_firebase():
     try:
-        db = firestore.client()  # Initialize Firestore client inside the function
-        test_doc = db.collection("test").document("testDoc").get()
+        db = get_clients().firestore
+        with timed("firestore.read"):
+            test_doc = db.collection("test").document("testDoc").get()
         data = test_doc.to_dict() if test_doc.exists else {"message": "Test document not found"}
         return jsonify({"status": "success", "data": data})
     except Exception as e:
@@ -18,7 +21,7 @@ def test_firebase():
 @user_bp.route("/create", methods=["POST"])
 def create_user():
     try:
-        db = firestore.client()  # Initialize Firestore client inside the function
+        db = get_clients().firestore
         data = request.json
         user_id = data.get("user_id")
         user_data = data.get("user_data")
@@ -27,8 +30,26 @@ def create_user():
             return jsonify({"error": "user_id and user_data are required"}), 400
 
         doc_ref = db.collection("users").document(user_id)
-        doc_ref.set(user_data)
+        with timed("firestore.write"):
+            doc_ref.set(user_data)
 
         return jsonify({"status": "success", "message": "User created successfully"}), 201
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
+
+@user_bp.route("/bulk_create", methods=["POST"])
+def bulk_create_users():
+    try:
+        data = request.json
+        items = data.get("users") if data else None
+        if not isinstance(items, list) or not items:
+            return jsonify({"error": "users must be a non-empty list"}), 400
+        max_documents = current_app.config["BULK_MAX_DOCUMENTS"]
+        if len(items) > max_documents:
+            return jsonify({"error": f"At most {max_documents} documents are allowed per request"}), 400
+
+        writes = bulk_writes("set", "users", items, "user_id", "user_data")
+        report = bulk_write(get_clients().firestore, writes, "user_id and user_data are required")
+        return jsonify(report), 201 if report["failed"] == 0 else 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
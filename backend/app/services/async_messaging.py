@@ -0,0 +1,162 @@
+import os
+import random
+import asyncio
+import aiohttp
+from slack_sdk.errors import SlackApiError
+from slack_sdk.web.async_client import AsyncWebClient
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PROVIDER_CONCURRENCY = {
+    "slack": int(os.environ.get("SLACK_CONCURRENCY", "10")),
+    "teams": int(os.environ.get("TEAMS_CONCURRENCY", "5")),
+    "whatsapp": int(os.environ.get("WHATSAPP_CONCURRENCY", "5")),
+}
+
+
+def _retry_delay(error, attempt, backoff):
+    if isinstance(error, SlackApiError) and error.response.status_code == 429:
+        return float(error.response.headers.get("Retry-After", 1))
+    return backoff * (2 ** attempt) * (0.5 + random.random())
+
+
+def _is_retryable(error):
+    if isinstance(error, SlackApiError):
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status == 429 or error.status >= 500
+    return isinstance(error, (asyncio.TimeoutError, aiohttp.ClientError))
+
+
+async def call_with_retries(make_call, timeout=10, retries=2, backoff=0.5):
+    """Awaits make_call() with a per-attempt timeout, retrying transient failures with jittered backoff."""
+    for attempt in range(retries + 1):
+        try:
+            return await asyncio.wait_for(make_call(), timeout)
+        except Exception as e:
+            if attempt == retries or not _is_retryable(e):
+                raise
+            await asyncio.sleep(_retry_delay(e, attempt, backoff))
+
+
+async def fan_out(targets, make_call, concurrency, timeout=10, retries=2):
+    """Runs make_call(target) for every target with at most concurrency calls in flight.
+
+    Returns one {"id", "result"} or {"id", "error"} dict per target, in input order.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(target):
+        async with semaphore:
+            try:
+                result = await call_with_retries(lambda: make_call(target), timeout=timeout, retries=retries)
+                return {"id": target, "result": result}
+            except Exception as e:
+                return {"id": target, "error": str(e) or type(e).__name__}
+
+    return await asyncio.gather(*(run(target) for target in targets))
+
+
+class AsyncSlackIntegration:
+    def __init__(self, session):
+        token = os.environ.get("YOUR_SLACK_BOT_TOKEN")
+        if token is None:
+            raise ValueError("YOUR_SLACK_BOT_TOKEN environment variable not set.")
+        self.client = AsyncWebClient(token=token, session=session)
+
+    async def send_message(self, channel_id, message):
+        result = await self.client.chat_postMessage(channel=channel_id, text=message)
+        return result.data
+
+    async def fetch_conversation(self, channel_id):
+        result = await self.client.conversations_history(channel=channel_id, limit=10)
+        return "\n".join(msg.get("text", "") for msg in result.get("messages", []))
+
+
+class AsyncTeamsIntegration:
+    def __init__(self, session):
+        self.session = session
+        self.webhook_url = os.environ.get("YOUR_TEAMS_WEBHOOK_URL", "YOUR_TEAMS_WEBHOOK_URL")
+
+    async def send_message(self, message, webhook_url=None):
+        async with self.session.post(webhook_url or self.webhook_url, json={"text": message}) as response:
+            response.raise_for_status()
+            return await response.text()
+
+    async def fetch_conversation(self, team_id):
+        # Simulate fetching Teams conversation
+        return "Sample Teams conversation for team ID: " + team_id
+
+
+class AsyncWhatsAppIntegration:
+    def __init__(self, session):
+        self.session = session
+        self.base_url = "https://graph.facebook.com/v12.0/"
+        self.token = os.environ.get("YOUR_WHATSAPP_API_TOKEN", "YOUR_WHATSAPP_API_TOKEN")
+
+    async def send_message(self, phone_number_id, recipient, message):
+        payload = {"messaging_product": "whatsapp", "to": recipient, "type": "text", "text": {"body": message}}
+        async with self.session.post(
+            f"{self.base_url}{phone_number_id}/messages",
+            json=payload,
+            headers={"Authorization": f"Bearer {self.token}"},
+        ) as response:
+            response.raise_for_status()
+            return await response.json()
+
+    async def fetch_conversation(self, thread_id):
+        # Simulate fetching WhatsApp conversation
+        return "Sample WhatsApp conversation for thread ID: " + thread_id
+
+
+class AsyncMessaging:
+    """Async providers sharing one pooled aiohttp session for the lifetime of the context.
+
+        async with AsyncMessaging() as messaging:
+            results = await messaging.fetch_many("slack", channel_ids)
+    """
+
+    def __init__(self, timeout=None, retries=None, concurrency=None):
+        self.timeout = timeout or float(os.environ.get("MESSAGING_TIMEOUT", "10"))
+        self.retries = retries if retries is not None else int(os.environ.get("MESSAGING_RETRIES", "2"))
+        self.concurrency = {**PROVIDER_CONCURRENCY, **(concurrency or {})}
+        self.session = None
+        self._providers = {}
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=sum(self.concurrency.values()))
+        self.session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.session.close()
+
+    def provider(self, name):
+        if name not in self._providers:
+            if name == "slack":
+                self._providers[name] = AsyncSlackIntegration(self.session)
+            elif name == "teams":
+                self._providers[name] = AsyncTeamsIntegration(self.session)
+            elif name == "whatsapp":
+                self._providers[name] = AsyncWhatsAppIntegration(self.session)
+            else:
+                raise ValueError(f"Unknown provider: {name}")
+        return self._providers[name]
+
+    async def fetch_many(self, name, conversation_ids):
+        provider = self.provider(name)
+        return await fan_out(conversation_ids, provider.fetch_conversation,
+                             self.concurrency[name], self.timeout, self.retries)
+
+    async def send_many(self, name, targets, message):
+        """Posts message to each target: a Slack channel id, a Teams webhook URL or a
+        WhatsApp "phone_number_id:recipient" pair."""
+        provider = self.provider(name)
+        if name == "slack":
+            make_call = lambda channel_id: provider.send_message(channel_id, message)
+        elif name == "whatsapp":
+            make_call = lambda target: provider.send_message(*target.split(":", 1), message)
+        else:
+            make_call = lambda webhook_url: provider.send_message(message, webhook_url=webhook_url)
+        return await fan_out(targets, make_call, self.concurrency[name], self.timeout, self.retries)
@@ -0,0 +1,146 @@
+import os
+import time
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from flask import current_app
+
+GOOGLE_DOCS_SCOPES = ["https://www.googleapis.com/auth/documents"]
+
+
+class ClientRegistry:
+    """Shared API clients for the whole app, each created on first use.
+
+    The SDKs themselves are imported on first use too, so workers that never
+    touch Notion or Google Docs never pay for importing them.
+
+    Firestore, Notion (httpx) and the requests session are safe to share
+    between threads. The Google API client is built on httplib2, which is
+    not, so each thread gets its own Docs service over shared credentials.
+    """
+
+    def __init__(self, http_pool_size=10, http_retries=2, probe_ttl=30.0):
+        self.http_pool_size = http_pool_size
+        self.http_retries = http_retries
+        self.probe_ttl = probe_ttl
+        self._probed = None
+        self._probed_at = 0.0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._firestore = None
+        self._notion = None
+        self._google_credentials = None
+        self._http = None
+
+    @property
+    def firestore(self):
+        if self._firestore is None:
+            with self._lock:
+                if self._firestore is None:
+                    from firebase_admin import firestore
+                    self._firestore = firestore.client()
+        return self._firestore
+
+    @property
+    def notion(self):
+        if self._notion is None:
+            notion_token = os.getenv("YOUR_NOTION_INTEGRATION_TOKEN")
+            if not notion_token:
+                raise ValueError("YOUR_NOTION_INTEGRATION_TOKEN environment variable is not set.")
+            with self._lock:
+                if self._notion is None:
+                    from notion_client import Client as NotionClient
+                    self._notion = NotionClient(auth=notion_token)
+        return self._notion
+
+    @property
+    def google_credentials(self):
+        if self._google_credentials is None:
+            credentials_path = os.getenv("GOOGLE_SERVICE_ACCOUNT_CREDENTIALS")
+            if not credentials_path or not os.path.exists(credentials_path):
+                raise FileNotFoundError(f"Google credentials file not found: {credentials_path}")
+            with self._lock:
+                if self._google_credentials is None:
+                    from google.oauth2 import service_account
+                    self._google_credentials = service_account.Credentials.from_service_account_file(
+                        credentials_path, scopes=GOOGLE_DOCS_SCOPES
+                    )
+        return self._google_credentials
+
+    @property
+    def google_docs(self):
+        docs_service = getattr(self._local, "google_docs", None)
+        if docs_service is None:
+            from googleapiclient.discovery import build
+            docs_service = build("docs", "v1", credentials=self.google_credentials, cache_discovery=False)
+            self._local.google_docs = docs_service
+        return docs_service
+
+    @property
+    def http(self):
+        if self._http is None:
+            with self._lock:
+                if self._http is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(
+                        pool_connections=self.http_pool_size,
+                        pool_maxsize=self.http_pool_size,
+                        max_retries=Retry(total=self.http_retries, backoff_factor=0.3,
+                                          status_forcelist=(502, 503, 504), allowed_methods=None),
+                    )
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    self._http = session
+        return self._http
+
+    def _check(self, probe):
+        start = time.perf_counter()
+        try:
+            probe()
+        except (ValueError, FileNotFoundError) as e:
+            return {"status": "not_configured", "detail": str(e)}
+        except Exception as e:
+            return {"status": "error", "detail": str(e)}
+        return {"status": "ok", "latency_ms": round((time.perf_counter() - start) * 1000, 1)}
+
+    def health(self, deep=False) -> dict:
+        """Reports which clients are created; with deep, makes one cheap call through each.
+
+        Deep probes spend API quota (Notion counts users.me), so their results
+        are reused for probe_ttl seconds.
+        """
+        if not deep:
+            clients = {
+                "firestore": self._firestore,
+                "notion": self._notion,
+                "google_docs": self._google_credentials,
+                "http": self._http,
+            }
+            return {name: {"status": "ok" if client is not None else "idle"} for name, client in clients.items()}
+
+        with self._lock:
+            if self._probed is not None and time.monotonic() - self._probed_at < self.probe_ttl:
+                return self._probed
+        probed = {
+            "firestore": self._check(lambda: next(iter(self.firestore.collections()), None)),
+            "notion": self._check(lambda: self.notion.users.me()),
+            "google_docs": self._check(lambda: self.google_docs),
+            "http": self._check(lambda: self.http),
+        }
+        with self._lock:
+            self._probed, self._probed_at = probed, time.monotonic()
+        return probed
+
+    def close(self):
+        with self._lock:
+            if self._http is not None:
+                self._http.close()
+                self._http = None
+            if self._notion is not None:
+                self._notion.close()
+                self._notion = None
+
+
+def get_clients() -> ClientRegistry:
+    return current_app.extensions["clients"]
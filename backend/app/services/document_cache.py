@@ -0,0 +1,107 @@
+import threading
+from flask import current_app
+from app.services.cache import LRUCache
+from app.utils.metrics import timed
+
+
+class DocumentCache:
+    """Read-through cache for Firestore documents with per-collection TTLs.
+
+    Writers must call invalidate() after mutating a document. With
+    listen=True, each cached document also gets a snapshot listener that
+    refreshes or drops the entry when the document changes elsewhere.
+    A TTL of 0 disables caching for that collection.
+    """
+
+    def __init__(self, client_factory, default_ttl=30, collection_ttls=None,
+                 max_entries=4096, listen=False, max_listeners=100):
+        self._client_factory = client_factory
+        self.default_ttl = default_ttl
+        self.collection_ttls = collection_ttls or {}
+        self.listen = listen
+        self.max_listeners = max_listeners
+        self._cache = LRUCache(max_entries=max_entries)
+        self._watches = {}
+        self._lock = threading.Lock()
+        self.invalidations = 0
+
+    def ttl_for(self, collection):
+        return self.collection_ttls.get(collection, self.default_ttl)
+
+    def get(self, collection, doc_id):
+        """Returns the document as a dict, or None if it does not exist."""
+        key = (collection, doc_id)
+        ttl = self.ttl_for(collection)
+        if ttl > 0:
+            cached = self._cache.get(key)
+            if cached is not None:
+                return dict(cached)
+
+        doc_ref = self._client_factory().collection(collection).document(doc_id)
+        with timed("firestore.read"):
+            snapshot = doc_ref.get()
+        if not snapshot.exists:
+            return None
+        data = snapshot.to_dict()
+        if ttl > 0:
+            self._cache.set(key, data, ttl=ttl)
+            if self.listen:
+                self._watch(key, doc_ref)
+        return dict(data)
+
+    def invalidate(self, collection, doc_id):
+        self._cache.delete((collection, doc_id))
+        self.invalidations += 1
+
+    def _watch(self, key, doc_ref):
+        with self._lock:
+            if key in self._watches or len(self._watches) >= self.max_listeners:
+                return
+            self._watches[key] = None
+
+        def on_snapshot(snapshots, changes, read_time):
+            for snapshot in snapshots:
+                if snapshot.exists:
+                    self._cache.set(key, snapshot.to_dict(), ttl=self.ttl_for(key[0]))
+                else:
+                    self.invalidate(*key)
+
+        try:
+            watch = doc_ref.on_snapshot(on_snapshot)
+        except Exception as e:
+            print(f"Snapshot listener for {key[0]}/{key[1]} failed: {e}")
+            with self._lock:
+                self._watches.pop(key, None)
+            return
+        with self._lock:
+            self._watches[key] = watch
+
+    def close(self):
+        with self._lock:
+            watches = [watch for watch in self._watches.values() if watch is not None]
+            self._watches.clear()
+        for watch in watches:
+            watch.unsubscribe()
+
+    def stats(self) -> dict:
+        stats = self._cache.stats()
+        lookups = stats["hits"] + stats["misses"]
+        return {
+            **stats,
+            "hit_rate": stats["hits"] / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "listeners": len(self._watches),
+        }
+
+
+def parse_collection_ttls(value: str) -> dict:
+    """Parses "settings=300,templates=600" into {"settings": 300, "templates": 600}."""
+    ttls = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        collection, _, ttl = item.partition("=")
+        ttls[collection.strip()] = int(ttl)
+    return ttls
+
+
+def get_document_cache() -> DocumentCache:
+    return current_app.extensions["document_cache"]
@@ -0,0 +1,96 @@
+import re
+import numpy as np
+from app.services.text_normalizer import PointIndex, collapse_whitespace, content_words
+
+_sentence_end = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[A-Z0-9])")
+
+# Sentences with fewer content words rarely carry a point ("Sounds good.").
+MIN_SENTENCE_WORDS = 4
+MAX_POINT_CHARS = 300
+
+
+def split_sentences(text: str) -> list:
+    return [sentence for sentence in _sentence_end.split(collapse_whitespace(text)) if sentence]
+
+
+def _trim(sentence: str) -> str:
+    if len(sentence) <= MAX_POINT_CHARS:
+        return sentence
+    return sentence[:MAX_POINT_CHARS].rsplit(" ", 1)[0] + "…"
+
+
+def sentence_scores(sentence_words) -> np.ndarray:
+    """TF-IDF centrality of each sentence (given as its content words): cosine similarity to the document centroid.
+
+    The term matrix is kept as (row, column, value) triplets and reduced with
+    np.bincount, so the cost is linear in the number of words.
+    """
+    sentences = len(sentence_words)
+    vocabulary = {}
+    rows, columns = [], []
+    for row, words in enumerate(sentence_words):
+        rows.extend([row] * len(words))
+        columns.extend(vocabulary.setdefault(word, len(vocabulary)) for word in words)
+    if not rows:
+        return np.zeros(sentences)
+
+    rows = np.array(rows, dtype=np.int64)
+    columns = np.array(columns, dtype=np.int64)
+    # Sum repeated words within a sentence into one term frequency.
+    cells, inverse = np.unique(rows * len(vocabulary) + columns, return_inverse=True)
+    tf = np.bincount(inverse).astype(np.float64)
+    rows, columns = cells // len(vocabulary), cells % len(vocabulary)
+
+    document_frequency = np.bincount(columns, minlength=len(vocabulary))
+    idf = np.log((1 + sentences) / (1 + document_frequency)) + 1.0
+    values = (1.0 + np.log(tf)) * idf[columns]
+    norms = np.sqrt(np.bincount(rows, weights=values * values, minlength=sentences))
+    values = values / np.maximum(norms[rows], 1e-9)
+
+    centroid = np.bincount(columns, weights=values, minlength=len(vocabulary))
+    centroid /= max(np.linalg.norm(centroid), 1e-9)
+    return np.bincount(rows, weights=values * centroid[columns], minlength=sentences)
+
+
+class ExtractiveSummarizer:
+    """Picks key points out of the text itself by TF-IDF sentence scoring; CPU only, no network.
+
+    summarize() also reports a confidence between 0 and 1: how clearly the
+    chosen sentences stand out from the rest. Text with fewer than
+    min_sentences usable sentences (an unpunctuated chat log, say) gets 0.
+    """
+
+    def __init__(self, max_points=10, min_sentences=3):
+        self.max_points = max_points
+        self.min_sentences = min_sentences
+
+    def summarize(self, text):
+        """Returns (key points in document order, confidence)."""
+        sentences, words = [], []
+        for sentence in split_sentences(text):
+            sentence_words = content_words(sentence)
+            if len(sentence_words) >= MIN_SENTENCE_WORDS:
+                sentences.append(sentence)
+                words.append(sentence_words)
+        if not sentences:
+            return [], 0.0
+        scores = sentence_scores(words)
+        ranked = np.argsort(-scores, kind="stable")
+
+        index = PointIndex()
+        chosen = []
+        for i in ranked.tolist():
+            if len(chosen) == self.max_points:
+                break
+            if index.add(sentences[i]):
+                chosen.append(i)
+
+        if len(sentences) < self.min_sentences:
+            confidence = 0.0
+        elif len(chosen) == len(sentences):
+            confidence = 1.0
+        else:
+            top = scores[chosen].mean()
+            rest = np.delete(scores, chosen).mean()
+            confidence = float(max(0.0, (top - rest) / max(top, 1e-9)))
+        return [_trim(sentences[i]) for i in sorted(chosen)], confidence
@@ -0,0 +1,131 @@
+import re
+import time
+from app.utils.metrics import timed
+
+# Firestore rejects batched writes with more than 500 operations.
+FIRESTORE_BATCH_LIMIT = 500
+MAX_DOCUMENT_ID_BYTES = 1500
+_reserved_id = re.compile(r"__.*__", re.DOTALL)
+
+
+def _apply(target, op, doc_ref, data):
+    if op == "set":
+        target.set(doc_ref, data)
+    elif op == "update":
+        target.update(doc_ref, data)
+    elif op == "delete":
+        target.delete(doc_ref)
+    else:
+        raise ValueError(f"Unknown operation: {op}")
+
+
+def _apply_single(doc_ref, op, data):
+    if op == "set":
+        doc_ref.set(data)
+    elif op == "update":
+        doc_ref.update(data)
+    else:
+        doc_ref.delete()
+
+
+def commit_in_batches(db, writes, batch_size=FIRESTORE_BATCH_LIMIT):
+    """Commits (op, collection, doc_id, data) writes in chunked batched writes.
+
+    A batch is atomic, so when one fails its writes are retried one by one
+    to find out which documents actually failed. A write whose document
+    reference cannot be built fails on its own. Returns one result per
+    write, in input order, plus throughput figures.
+    """
+    batch_size = min(batch_size, FIRESTORE_BATCH_LIMIT)
+    results = [None] * len(writes)
+    batches = 0
+    start = time.perf_counter()
+
+    for offset in range(0, len(writes), batch_size):
+        batch = db.batch()
+        staged = []
+        for i in range(offset, min(offset + batch_size, len(writes))):
+            op, collection, doc_id, data = writes[i]
+            try:
+                doc_ref = db.collection(collection).document(doc_id)
+                _apply(batch, op, doc_ref, data)
+            except Exception as e:
+                results[i] = {"id": doc_id, "status": "error", "error": str(e)}
+                continue
+            staged.append((i, doc_ref))
+        if not staged:
+            continue
+        batches += 1
+        try:
+            with timed("firestore.batch_commit"):
+                batch.commit()
+            for i, _ in staged:
+                results[i] = {"id": writes[i][2], "status": "ok"}
+        except Exception as e:
+            print(f"Batch of {len(staged)} writes failed, retrying individually: {e}")
+            for i, doc_ref in staged:
+                op, _, doc_id, data = writes[i]
+                try:
+                    _apply_single(doc_ref, op, data)
+                    results[i] = {"id": doc_id, "status": "ok"}
+                except Exception as single_error:
+                    results[i] = {"id": doc_id, "status": "error", "error": str(single_error)}
+
+    elapsed = time.perf_counter() - start
+    committed = sum(1 for result in results if result["status"] == "ok")
+    return {
+        "results": results,
+        "committed": committed,
+        "failed": len(results) - committed,
+        "batches": batches,
+        "elapsed_ms": round(elapsed * 1000, 1),
+        "docs_per_second": round(committed / elapsed, 1) if elapsed > 0 else None,
+    }
+
+
+def document_id_error(doc_id):
+    """Why Firestore would reject doc_id as a document id, or None if it is valid."""
+    if "/" in doc_id:
+        return "Document ids cannot contain '/'"
+    if doc_id in (".", ".."):
+        return "Document ids cannot be '.' or '..'"
+    if _reserved_id.fullmatch(doc_id):
+        return "Document ids matching __.*__ are reserved"
+    if len(doc_id.encode("utf-8")) > MAX_DOCUMENT_ID_BYTES:
+        return f"Document ids cannot exceed {MAX_DOCUMENT_ID_BYTES} bytes"
+    return None
+
+
+def bulk_writes(op, collection, items, id_key, data_key):
+    """Turns request items into (op, collection, doc_id, data) writes; items that are not objects get no id or data."""
+    writes = []
+    for item in items:
+        if isinstance(item, dict):
+            writes.append((op, collection, item.get(id_key), item.get(data_key)))
+        else:
+            writes.append((op, collection, None, None))
+    return writes
+
+
+def bulk_write(db, writes, invalid_message):
+    """Commits writes with a valid string document id and a non-empty object; the rest are reported as errors."""
+    errors = {}
+    for i, (_, _, doc_id, data) in enumerate(writes):
+        if not (isinstance(doc_id, str) and doc_id and isinstance(data, dict) and data):
+            errors[i] = invalid_message
+        else:
+            error = document_id_error(doc_id)
+            if error:
+                errors[i] = error
+    valid = [i for i in range(len(writes)) if i not in errors]
+    report = commit_in_batches(db, [writes[i] for i in valid])
+
+    results = [
+        {"id": doc_id if isinstance(doc_id, str) else None, "status": "error", "error": errors.get(i)}
+        for i, (_, _, doc_id, _) in enumerate(writes)
+    ]
+    for i, result in zip(valid, report["results"]):
+        results[i] = result
+    report["results"] = results
+    report["failed"] = len(results) - report["committed"]
+    return report
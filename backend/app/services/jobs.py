@@ -0,0 +1,113 @@
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, kind):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def done(self):
+        return self.status in ("succeeded", "failed")
+
+    def timings(self) -> dict:
+        timings = {}
+        if self.started_at is not None:
+            timings["queued_ms"] = round((self.started_at - self.submitted_at) * 1000, 1)
+        if self.finished_at is not None:
+            timings["run_ms"] = round((self.finished_at - self.started_at) * 1000, 1)
+            timings["total_ms"] = round((self.finished_at - self.submitted_at) * 1000, 1)
+        return timings
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "error": self.error,
+            "timings": self.timings(),
+        }
+
+
+class JobQueue:
+    """In-process job queue backed by a thread pool.
+
+    At most max_depth jobs may be queued or running at once; further
+    submissions raise QueueFullError. Finished jobs are kept for
+    retention seconds so their results can be collected, and at most
+    max_finished of them at a time (oldest evicted first), because their
+    results hold rendered documents and transcripts in memory.
+    """
+
+    def __init__(self, max_workers=4, max_depth=100, retention=3600, max_finished=200):
+        self.max_depth = max_depth
+        self.retention = retention
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._finished = OrderedDict()  # job id -> None, in the order jobs finished
+        self._active = 0
+        self._lock = threading.Lock()
+
+    def submit(self, kind, fn, *args, **kwargs) -> Job:
+        job = Job(kind)
+        with self._lock:
+            self._prune()
+            if self._active >= self.max_depth:
+                raise QueueFullError(f"Job queue is full ({self.max_depth} jobs pending)")
+            self._active += 1
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            self._prune()
+            return self._jobs.get(job_id)
+
+    def depth(self) -> int:
+        return self._active
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, job, fn, args, kwargs):
+        job.started_at = time.time()
+        job.status = "running"
+        try:
+            job.result = fn(*args, **kwargs)
+            job.status = "succeeded"
+        except Exception as e:
+            print(f"Job {job.id} ({job.kind}) failed: {e}")
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self._active -= 1
+                self._finished[job.id] = None
+                self._prune()
+
+    def _prune(self):
+        """Drops finished jobs past retention, then the oldest beyond max_finished (caller holds the lock)."""
+        cutoff = time.time() - self.retention
+        while self._finished:
+            job_id = next(iter(self._finished))
+            if len(self._finished) <= self.max_finished and self._jobs[job_id].finished_at >= cutoff:
+                break
+            del self._finished[job_id]
+            del self._jobs[job_id]
@@ -0,0 +1,195 @@
+import io
+import threading
+from functools import lru_cache
+from typing import Dict, List, Optional
+from app.services.pdf_renderer import get_pdf_renderer
+from app.templates.industry_templates import get_template_structure
+
+TEMPLATE_TITLES = {
+    "business_plan": "Business Plan",
+    "pitch_deck": "Pitch Deck",
+    "marketing_strategy": "Marketing Strategy",
+}
+
+# python-pptx layout indexes in the default template.
+PPTX_TITLE_LAYOUT = 0
+PPTX_CONTENT_LAYOUT = 1
+
+
+class SectionLayout:
+    def __init__(self, title: str, subsections: List[str]):
+        self.title = title
+        self.subsections = tuple(subsections)
+
+
+class Layout:
+    """An industry template structure compiled once into reusable section objects."""
+
+    def __init__(self, industry: str, template_type: str, title: str, sections: List[SectionLayout]):
+        self.industry = industry
+        self.template_type = template_type
+        self.title = title
+        self.sections = tuple(sections)
+
+    def arrange(self, key_points: List[str]) -> "StructuredDocument":
+        from app.services.section_classifier import get_section_classifier
+
+        placed = [{"general": [], "subsections": {}} for _ in self.sections]
+        assignments = get_section_classifier().assign(self.industry, self.template_type, key_points)
+        for point, (i, j) in zip(key_points, assignments):
+            if j is None:
+                placed[i]["general"].append(point)
+            else:
+                placed[i]["subsections"].setdefault(j, []).append(point)
+
+        sections = []
+        for section, points in zip(self.sections, placed):
+            subsections = [
+                {"title": section.subsections[j], "key_points": points["subsections"][j]}
+                for j in sorted(points["subsections"])
+            ]
+            sections.append({
+                "title": section.title,
+                "key_points": points["general"],
+                "subsections": subsections,
+                "prompts": list(section.subsections),
+            })
+        return StructuredDocument(self.title, sections)
+
+
+def _is_empty(section) -> bool:
+    return not section["key_points"] and not section["subsections"]
+
+
+class StructuredDocument:
+    def __init__(self, title: str, sections: List[Dict]):
+        self.title = title
+        self.sections = sections
+
+    def to_text(self) -> str:
+        lines = [f"{self.title}:", ""]
+        for section in self.sections:
+            lines.append(section["title"])
+            if _is_empty(section):
+                lines.append("To be completed: " + ", ".join(section["prompts"]))
+            lines.extend(f"- {point}" for point in section["key_points"])
+            for subsection in section["subsections"]:
+                lines.append(f"  {subsection['title']}")
+                lines.extend(f"  - {point}" for point in subsection["key_points"])
+            lines.append("")
+        return "\n".join(lines).rstrip()
+
+    def to_dict(self) -> List[Dict]:
+        return [{key: section[key] for key in ("title", "key_points", "subsections")} for section in self.sections]
+
+
+@lru_cache(maxsize=None)
+def compile_layout(industry: str, template_type: str) -> Optional[Layout]:
+    structure = get_template_structure(industry, template_type)
+    if not structure.get("sections"):
+        return None
+    sections = [SectionLayout(section["title"], section.get("subsections", [])) for section in structure["sections"]]
+    title = TEMPLATE_TITLES.get(template_type, template_type.replace("_", " ").title())
+    return Layout(industry, template_type, title, sections)
+
+
+# Skeletons are built once per process and cloned by loading the saved bytes,
+# which skips the default-template setup and style tweaks on every request.
+_skeleton_lock = threading.Lock()
+_skeletons = {}
+
+
+def _build_docx_skeleton() -> bytes:
+    from docx import Document
+    from docx.shared import Pt
+    doc = Document()
+    doc.styles["Normal"].font.name = "Calibri"
+    doc.styles["Normal"].font.size = Pt(11)
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def _build_pptx_skeleton() -> bytes:
+    from pptx import Presentation
+    buffer = io.BytesIO()
+    Presentation().save(buffer)
+    return buffer.getvalue()
+
+
+def _skeleton(kind: str) -> bytes:
+    with _skeleton_lock:
+        if kind not in _skeletons:
+            _skeletons[kind] = _build_docx_skeleton() if kind == "docx" else _build_pptx_skeleton()
+        return _skeletons[kind]
+
+
+def render_word(document: StructuredDocument) -> bytes:
+    from docx import Document
+    doc = Document(io.BytesIO(_skeleton("docx")))
+    # Paragraph.style= rescans the styles part for the default on every call, which
+    # dominates large documents; resolve the style id once and set it on the XML.
+    bullet_id = doc.styles["List Bullet"].style_id
+
+    def add_bullet(text):
+        doc.add_paragraph(text)._p.style = bullet_id
+
+    doc.add_heading(document.title, level=0)
+    for section in document.sections:
+        doc.add_heading(section["title"], level=1)
+        if _is_empty(section):
+            doc.add_paragraph("To be completed: " + ", ".join(section["prompts"]))
+        for point in section["key_points"]:
+            add_bullet(point)
+        for subsection in section["subsections"]:
+            doc.add_heading(subsection["title"], level=2)
+            for point in subsection["key_points"]:
+                add_bullet(point)
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def render_pptx(document: StructuredDocument) -> bytes:
+    from pptx import Presentation
+    prs = Presentation(io.BytesIO(_skeleton("pptx")))
+    title_slide = prs.slides.add_slide(prs.slide_layouts[PPTX_TITLE_LAYOUT])
+    title_slide.shapes.title.text = document.title
+    for section in document.sections:
+        slide = prs.slides.add_slide(prs.slide_layouts[PPTX_CONTENT_LAYOUT])
+        slide.shapes.title.text = section["title"]
+        body = slide.placeholders[1].text_frame
+        lines = [(point, 0) for point in section["key_points"]]
+        for subsection in section["subsections"]:
+            lines.append((subsection["title"], 0))
+            lines.extend((point, 1) for point in subsection["key_points"])
+        if not lines:
+            lines = [(prompt, 0) for prompt in section["prompts"]] or [("To be completed", 0)]
+        body.text = lines[0][0]
+        for text, level in lines[1:]:
+            paragraph = body.add_paragraph()
+            paragraph.text = text
+            paragraph.level = level
+    buffer = io.BytesIO()
+    prs.save(buffer)
+    return buffer.getvalue()
+
+
+def render_pdf(document: StructuredDocument) -> bytes:
+    blocks = [("title", document.title)]
+    for section in document.sections:
+        blocks.append(("heading", section["title"]))
+        if _is_empty(section):
+            blocks.append(("paragraph", "To be completed: " + ", ".join(section["prompts"])))
+        blocks.extend(("paragraph", f"• {point}") for point in section["key_points"])
+        for subsection in section["subsections"]:
+            blocks.append(("subheading", subsection["title"]))
+            blocks.extend(("paragraph", f"• {point}") for point in subsection["key_points"])
+    return get_pdf_renderer().render(blocks)
+
+
+STRUCTURED_EXPORTERS = {
+    "word": render_word,
+    "pdf": render_pdf,
+    "pptx": render_pptx,
+}
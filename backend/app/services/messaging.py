@@ -1,6 +1,7 @@
 import os
+import time
+import threading
 import requests
-from slack_sdk import WebClient
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -10,8 +11,10 @@ class SlackIntegration:
         self.token = os.environ.get("YOUR_SLACK_BOT_TOKEN")
         if self.token is None:
             raise ValueError("YOUR_SLACK_BOT_TOKEN environment variable not set.")
+        from slack_sdk import WebClient
         self.client = WebClient(token=self.token)  # Initialize the Slack client here
         self.last_error = None
+        self.max_rate_limit_retries = int(os.environ.get("SLACK_RATE_LIMIT_RETRIES", "5"))
 
     def send_message(self, channel_id, message):
         try:
@@ -30,6 +33,31 @@ class SlackIntegration:
             self.last_error = str(e)
             return "", 500
 
+    def _call_with_backoff(self, method, **kwargs):
+        """Calls a Web API method, sleeping for Retry-After whenever Slack rate limits us."""
+        from slack_sdk.errors import SlackApiError
+        for attempt in range(self.max_rate_limit_retries + 1):
+            try:
+                return method(**kwargs)
+            except SlackApiError as e:
+                if e.response.status_code != 429 or attempt == self.max_rate_limit_retries:
+                    raise
+                time.sleep(int(e.response.headers.get("Retry-After", 1)))
+
+    def fetch_history_page(self, channel_id, oldest=None, cursor=None, limit=200):
+        """Fetches one page of messages newer than oldest (exclusive), newest first.
+
+        Returns (messages, next_cursor); next_cursor is None on the last page.
+        """
+        kwargs = {"channel": channel_id, "limit": limit}
+        if oldest:
+            kwargs["oldest"] = oldest
+        if cursor:
+            kwargs["cursor"] = cursor
+        result = self._call_with_backoff(self.client.conversations_history, **kwargs)
+        next_cursor = (result.get("response_metadata") or {}).get("next_cursor") if result.get("has_more") else None
+        return result.get("messages", []), next_cursor or None
+
 class WhatsAppIntegration:
     def __init__(self):
         self.base_url = "https://graph.facebook.com/v12.0/"
@@ -45,14 +73,39 @@ class WhatsAppIntegration:
 
 class TeamsIntegration:
     def __init__(self):
-        self.webhook_url = "YOUR_TEAMS_WEBHOOK_URL"
+        self.webhook_url = os.environ.get("YOUR_TEAMS_WEBHOOK_URL", "YOUR_TEAMS_WEBHOOK_URL")
+        self.timeout = float(os.environ.get("MESSAGING_TIMEOUT", "10"))
+        self.session = requests.Session()  # Reuse connections across messages
 
     def send_message(self, message):
         headers = {"Content-Type": "application/json"}
         payload = {"text": message}
-        response = requests.post(self.webhook_url, json=payload, headers=headers)
+        response = self.session.post(self.webhook_url, json=payload, headers=headers, timeout=self.timeout)
         return response.json()
 
     def fetch_conversation(self, team_id):
         # Simulate fetching Teams conversation
-        return "Sample Teams conversation for team ID: " + team_id
\ No newline at end of file
+        return "Sample Teams conversation for team ID: " + team_id
+
+_services = {}
+_services_lock = threading.Lock()
+
+
+def _get_service(name, factory):
+    with _services_lock:
+        if name not in _services:
+            _services[name] = factory()
+        return _services[name]
+
+
+def get_slack_integration() -> SlackIntegration:
+    """Raises ValueError when YOUR_SLACK_BOT_TOKEN is not set; the next call tries again."""
+    return _get_service("slack", SlackIntegration)
+
+
+def get_whatsapp_integration() -> WhatsAppIntegration:
+    return _get_service("whatsapp", WhatsAppIntegration)
+
+
+def get_teams_integration() -> TeamsIntegration:
+    return _get_service("teams", TeamsIntegration)
@@ -1,19 +1,550 @@
-import openai
+import os
+import re
+import time
+import random
+import threading
+from collections import deque
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from app.services.cache import make_key, get_key_point_cache
+from app.services.rate_limiter import RateLimitTimeout, SingleFlight, get_openai_limiter
+from app.services.token_budget import CONTEXT_WINDOWS, DEFAULT_CONTEXT_TOKENS, TokenCounter, UsageTracker, current_route
+from app.services.text_normalizer import PointIndex, clean_point, collapse_whitespace, compact_points, normalize_points
+from app.utils.metrics import registry, timed
+
+SYSTEM_PROMPT = "You are an assistant that extracts key points from text."
+USER_PROMPT = "Extract key points from the following text: {text}"
+
+# Rough OpenAI tokenizer ratio for English text; good enough to size chunks.
+CHARS_PER_TOKEN = 4
+
+OPENAI_RETRIES = registry.counter("openai_retries_total", "OpenAI calls retried after a transient error.", ["error"])
+OPENAI_COALESCED = registry.counter("openai_coalesced_total", "Extractions that waited on an identical in-flight call.")
+OPENAI_TOKENS = registry.counter("openai_tokens_total", "OpenAI tokens used, by route.", ["route", "kind"])
+OPENAI_CALL_SECONDS = registry.histogram("openai_call_duration_seconds", "OpenAI call latency, by route.", ["route"])
+NLP_ROUTED = registry.counter("nlp_hybrid_routed_total", "Hybrid backend extractions by where they were answered.", ["outcome"])
+
+# Identical extractions in flight at the same time share one API call. Keys
+# include the model and prompts, so every processor can share this.
+_in_flight = SingleFlight()
+
+# Token and latency accounting shared by every processor in the process.
+usage_tracker = UsageTracker(recent=int(os.getenv("NLP_USAGE_RECENT", "100")))
+
+# The messages for one call, their counted size and the completion budget chosen for them.
+PromptPlan = namedtuple("PromptPlan", "messages prompt_tokens max_tokens trimmed")
+
+
+_word = re.compile(r"\S+")
+
+
+def normalize_text(text: str) -> str:
+    """Collapses whitespace so trivially different copies of a text share a cache entry."""
+    return collapse_whitespace(text)
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def iter_chunks(text: str, chunk_tokens: int, overlap_tokens: int = 0):
+    """Lazily splits text into word-aligned chunks of about chunk_tokens tokens.
+
+    Consecutive chunks share roughly overlap_tokens tokens so that points
+    spanning a boundary are seen whole by at least one chunk.
+    """
+    overlap_tokens = min(overlap_tokens, chunk_tokens // 2)
+    window = deque()
+    window_tokens = 0
+    fresh = False
+    for match in _word.finditer(text):
+        word = match.group()
+        tokens = estimate_tokens(word)
+        if window and window_tokens + tokens > chunk_tokens:
+            yield " ".join(window)
+            fresh = False
+            while window and window_tokens > overlap_tokens:
+                window_tokens -= estimate_tokens(window.popleft())
+        window.append(word)
+        window_tokens += tokens
+        fresh = True
+    if fresh:
+        yield " ".join(window)
+
+
+def bounded_map(executor, fn, items, max_in_flight):
+    """Like executor.map, but pulls from items lazily with at most max_in_flight pending calls."""
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= max_in_flight:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def clean_key_point(line: str) -> str:
+    """Collapses whitespace and drops a leading number or bullet from one model output line."""
+    return clean_point(line)
+
+
+def clean_key_points(key_points):
+    """Turns model output (a numbered string or a list) into a list of clean, distinct key points."""
+    return compact_points(key_points)
+
+
+def format_key_points(points) -> str:
+    return "\n".join(f"{i + 1}. {point}" for i, point in enumerate(points))
+
+
+def merge_key_points(results):
+    """Reduce step: merges per-chunk key point strings, dropping duplicates from overlaps."""
+    index = PointIndex()
+    merged = []
+    for result in results:
+        if isinstance(result, dict) and "error" in result:
+            return result
+        merged.extend(normalize_points(result.split("\n"), index))
+    return format_key_points(merged)
+
+
+class PromptTooLargeError(ValueError):
+    """The prompt overhead and completion budget leave no room for the text in the context window."""
+
+
+def _retry_delay(error, attempt, backoff, max_delay=30.0):
+    """Honors Retry-After when OpenAI sends it, otherwise exponential backoff with jitter."""
+    retry_after = (getattr(error, "headers", None) or {}).get("retry-after")
+    if retry_after:
+        try:
+            return min(float(retry_after), max_delay)
+        except ValueError:
+            pass
+    return min(backoff * (2 ** attempt) * (0.5 + random.random()), max_delay)
+
 
 class NLPProcessor:
-    def __init__(self, api_key):
-        openai.api_key = api_key
+    """The OpenAI chat completion backend."""
+
+    name = "openai"
+
+    def __init__(self, api_key, model="gpt-4", max_tokens=300, cache=None,
+                 chunk_tokens=None, chunk_overlap=None, max_workers=None,
+                 limiter=None, max_retries=None, retry_backoff=None,
+                 context_tokens=None, min_completion_tokens=None, completion_ratio=None, usage=None):
+        self.api_key = api_key
+        self.model = model  # Use "gpt-3.5-turbo" if that's your plan
+        self.max_tokens = max_tokens
+        self.cache = cache if cache is not None else get_key_point_cache()
+        self.chunk_tokens = chunk_tokens or int(os.getenv("NLP_CHUNK_TOKENS", "2000"))
+        self.chunk_overlap = chunk_overlap if chunk_overlap is not None else int(os.getenv("NLP_CHUNK_OVERLAP", "200"))
+        self.max_workers = max_workers or int(os.getenv("NLP_MAX_WORKERS", "4"))
+        self.limiter = limiter if limiter is not None else get_openai_limiter()
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("NLP_MAX_RETRIES", "3"))
+        self.retry_backoff = retry_backoff if retry_backoff is not None else float(os.getenv("NLP_RETRY_BACKOFF", "1.0"))
+        self.counter = TokenCounter(model)
+        self.context_tokens = context_tokens or int(
+            os.getenv("NLP_CONTEXT_TOKENS") or CONTEXT_WINDOWS.get(model, DEFAULT_CONTEXT_TOKENS)
+        )
+        self.min_completion_tokens = min_completion_tokens or int(os.getenv("NLP_MIN_COMPLETION_TOKENS", "64"))
+        self.completion_ratio = completion_ratio if completion_ratio is not None else float(
+            os.getenv("NLP_COMPLETION_RATIO", "0.25")
+        )
+        self.usage = usage if usage is not None else usage_tracker
+
+    def _openai(self):
+        """Imports the OpenAI SDK on first use; it is one of the slowest imports in the app."""
+        import openai
+        openai.api_key = self.api_key
+        return openai
+
+    def cache_key(self, text):
+        return make_key(normalize_text(text), self.model, SYSTEM_PROMPT, USER_PROMPT, self.max_tokens)
+
+    def completion_tokens(self, prompt_tokens):
+        """max_tokens for a prompt: a floor plus a share of the prompt size, capped at self.max_tokens.
+
+        Short inputs have few key points, so they get a smaller completion
+        budget and reserve fewer tokens from the rate limiter.
+        """
+        return min(self.max_tokens, self.min_completion_tokens + int(prompt_tokens * self.completion_ratio))
 
-    def extract_key_points(self, text):
+    def plan(self, text):
+        """Counts the prompt before sending it and shortens text that would overflow the context window.
+
+        Raises PromptTooLargeError when not even a shortened text fits.
+        """
+        messages = self._messages(text)
+        prompt_tokens = self.counter.count_messages(messages)
+        max_tokens = self.completion_tokens(prompt_tokens)
+        overflow = prompt_tokens + max_tokens - self.context_tokens
+        if overflow > 0:
+            budget = self.counter.count(text) - overflow
+            text = self.counter.shorten(text, budget) if budget > 0 else ""
+            if not text:
+                raise PromptTooLargeError(
+                    f"The prompt overhead and a {max_tokens}-token completion leave no room for the text "
+                    f"in the {self.context_tokens}-token context window"
+                )
+            messages = self._messages(text)
+            prompt_tokens = self.counter.count_messages(messages)
+        return PromptPlan(messages, prompt_tokens, min(max_tokens, self.context_tokens - prompt_tokens), overflow > 0)
+
+    def _record(self, route, plan, started, prompt_tokens=0, completion_tokens=0, estimated=False, error=None):
+        latency = time.monotonic() - started
+        self.usage.record(route, prompt_tokens, completion_tokens, latency, max_tokens=plan.max_tokens,
+                          trimmed=plan.trimmed, estimated=estimated, error=error)
+        OPENAI_TOKENS.inc(prompt_tokens, route=route, kind="prompt")
+        OPENAI_TOKENS.inc(completion_tokens, route=route, kind="completion")
+        OPENAI_CALL_SECONDS.observe(latency, route=route)
+
+    def _create(self, plan, **kwargs):
+        """Calls ChatCompletion.create within the rate limits, retrying rate limits and outages."""
+        openai = self._openai()
+        retryable = (openai.error.RateLimitError, openai.error.ServiceUnavailableError,
+                     openai.error.APIConnectionError, openai.error.Timeout, openai.error.TryAgain)
+        estimated = plan.prompt_tokens + plan.max_tokens
+        for attempt in range(self.max_retries + 1):
+            with timed("openai.rate_limit_wait"):
+                self.limiter.acquire(estimated)
+            try:
+                response = openai.ChatCompletion.create(
+                    model=self.model,
+                    messages=plan.messages,
+                    max_tokens=plan.max_tokens,
+                    **kwargs
+                )
+            except Exception as e:
+                # A failed attempt used no tokens; refund its reservation so retries are not charged twice.
+                self.limiter.record_usage(estimated, 0)
+                if not isinstance(e, retryable) or attempt == self.max_retries:
+                    raise
+                OPENAI_RETRIES.inc(error=type(e).__name__)
+                time.sleep(_retry_delay(e, attempt, self.retry_backoff))
+                continue
+            # Streamed responses carry no usage; stream_key_points settles them once the stream ends.
+            if not kwargs.get("stream"):
+                self.limiter.record_usage(estimated, (response.get("usage") or {}).get("total_tokens"))
+            return response
+
+    def _extract_uncached(self, text, key, route):
+        openai = self._openai()
+        try:
+            plan = self.plan(text)
+        except PromptTooLargeError as e:
+            return {"error": str(e)}
+        started = time.monotonic()
         try:
-            response = openai.ChatCompletion.create(
-                model="gpt-4",  # Use "gpt-3.5-turbo" if that's your plan
-                messages=[
-                    {"role": "system", "content": "You are an assistant that extracts key points from text."},
-                    {"role": "user", "content": f"Extract key points from the following text: {text}"}
-                ],
-                max_tokens=300
+            with timed("openai"):
+                response = self._create(plan)
+            key_points = response["choices"][0]["message"]["content"].strip()
+        except (openai.error.OpenAIError, RateLimitTimeout) as e:
+            self._record(route, plan, started, error=type(e).__name__)
+            return {"error": str(e)}
+
+        usage = response.get("usage") or {}
+        self._record(
+            route, plan, started,
+            prompt_tokens=usage.get("prompt_tokens", plan.prompt_tokens),
+            completion_tokens=usage.get("completion_tokens", self.counter.count(key_points)),
+            estimated="completion_tokens" not in usage,
+        )
+        if self.cache is not None:
+            self.cache.set(key, key_points)
+        return key_points
+
+    def extract_key_points(self, text, route=None):
+        """Returns the key points as text, or {"error": ...}.
+
+        Concurrent calls for the same text wait for a single API call. Usage
+        is charged to route, by default the current request's endpoint.
+        """
+        route = route or current_route()
+        key = self.cache_key(text)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        leader = []
+        result = _in_flight.do(key, lambda: leader.append(True) or self._extract_uncached(text, key, route))
+        if not leader:
+            OPENAI_COALESCED.inc()
+        return result
+
+    def _messages(self, text):
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": USER_PROMPT.format(text=text)}
+        ]
+
+    def _iter_chunk_results(self, text):
+        """Yields per-chunk extraction results in order, or the single result for short text."""
+        # Worker threads have no request context, so resolve the route here.
+        route = current_route()
+        chunks = iter_chunks(text, self.chunk_tokens, self.chunk_overlap)
+        first = next(chunks, None)
+        second = next(chunks, None)
+        if second is None:
+            yield self.extract_key_points(text, route)
+            return
+
+        def remaining():
+            yield first
+            yield second
+            yield from chunks
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            yield from bounded_map(
+                executor, lambda chunk: self.extract_key_points(chunk, route), remaining(), self.max_workers * 2
             )
-            return response["choices"][0]["message"]["content"].strip()
-        except openai.error.OpenAIError as e:
-            return {"error": str(e)}
\ No newline at end of file
+
+    def extract_key_points_chunked(self, text):
+        """Map-reduce extraction for long text.
+
+        Chunks are extracted concurrently by up to max_workers threads and the
+        per-chunk key points are merged in order. Text that fits in a single
+        chunk goes through extract_key_points unchanged.
+        """
+        results = self._iter_chunk_results(text)
+        first = next(results)
+        second = next(results, None)
+        if second is None:
+            return first
+        return merge_key_points([first, second, *results])
+
+    def stream_key_points(self, text):
+        """Yields cleaned key points one at a time as the model produces them.
+
+        Short text is streamed token by token from the completion API; long
+        text yields each chunk's new points as soon as that chunk finishes.
+        Raises openai.error.OpenAIError, PromptTooLargeError, or RuntimeError
+        for chunk failures.
+        """
+        if estimate_tokens(text) > self.chunk_tokens:
+            index = PointIndex()
+            for result in self._iter_chunk_results(text):
+                if isinstance(result, dict) and "error" in result:
+                    raise RuntimeError(result["error"])
+                yield from normalize_points(result.split("\n"), index)
+            return
+
+        key = self.cache_key(text) if self.cache is not None else None
+        cached = self.cache.get(key) if key is not None else None
+        if cached is not None:
+            yield from clean_key_points(cached)
+            return
+
+        route = current_route()
+        plan = self.plan(text)
+        started = time.monotonic()
+        try:
+            with timed("openai.stream_start"):
+                response = self._create(plan, stream=True)
+        except Exception as e:
+            self._record(route, plan, started, error=type(e).__name__)
+            raise
+        content = []
+
+        def lines():
+            buffer = ""
+            for chunk in response:
+                delta = chunk["choices"][0].get("delta", {}).get("content")
+                if not delta:
+                    continue
+                content.append(delta)
+                buffer += delta
+                *complete, buffer = buffer.split("\n")
+                yield from complete
+            yield buffer
+
+        error = None
+        try:
+            yield from normalize_points(lines())
+        except BaseException as e:
+            # Includes GeneratorExit when the client disconnects mid-stream.
+            error = type(e).__name__
+            raise
+        finally:
+            close = getattr(response, "close", None)
+            if close is not None:
+                close()
+            # Streamed responses carry no usage, so the completion streamed so far is counted locally.
+            key_points = "".join(content).strip()
+            completion_tokens = self.counter.count(key_points)
+            self.limiter.record_usage(plan.prompt_tokens + plan.max_tokens, plan.prompt_tokens + completion_tokens)
+            self._record(route, plan, started, prompt_tokens=plan.prompt_tokens,
+                         completion_tokens=completion_tokens, estimated=True, error=error)
+            # Only a complete answer is cached.
+            if key is not None and error is None:
+                self.cache.set(key, key_points)
+
+    def cache_stats(self):
+        return self.cache.stats() if self.cache is not None else {"enabled": False}
+
+    def usage_stats(self):
+        return {
+            "backend": self.name,
+            "token_counter": self.counter.backend,
+            "context_tokens": self.context_tokens,
+            **self.usage.stats(),
+        }
+
+    def limit_stats(self):
+        return {
+            **self.limiter.stats(),
+            "in_flight": _in_flight.in_flight(),
+            "coalesced": _in_flight.coalesced,
+        }
+
+
+class ExtractiveBackend:
+    """Local key point extraction by TF-IDF sentence scoring: milliseconds, no API key, works offline.
+
+    Exposes the same methods as NLPProcessor so routes need not know which
+    backend is configured.
+    """
+
+    name = "extractive"
+
+    def __init__(self, max_points=10, min_sentences=3):
+        # NumPy is only imported when a local backend is configured.
+        from app.services.extractive_summarizer import ExtractiveSummarizer
+        self.summarizer = ExtractiveSummarizer(max_points=max_points, min_sentences=min_sentences)
+
+    def summarize(self, text):
+        with timed("extractive"):
+            return self.summarizer.summarize(text)
+
+    def extract_key_points(self, text, route=None):
+        return format_key_points(self.summarize(text)[0])
+
+    def extract_key_points_chunked(self, text):
+        return self.extract_key_points(text)
+
+    def stream_key_points(self, text):
+        yield from self.summarize(text)[0]
+
+    def cache_stats(self):
+        return {"enabled": False, "backend": self.name}
+
+    def limit_stats(self):
+        return {"backend": self.name}
+
+    def usage_stats(self):
+        return {"backend": self.name, "routes": {}, "recent": []}
+
+
+class HybridBackend:
+    """Extracts locally and escalates to the LLM only for long or ambiguous input.
+
+    Input over max_local_tokens goes straight to the remote backend. Anything
+    else is summarized locally first, and the local result is kept unless its
+    confidence is below min_confidence. If an escalated call fails, the local
+    points are returned rather than the error; a stream falls back the same
+    way as long as the remote backend has not yielded anything yet.
+    """
+
+    name = "hybrid"
+
+    def __init__(self, local, remote, max_local_tokens=4000, min_confidence=0.1):
+        self.local = local
+        self.remote = remote
+        self.max_local_tokens = max_local_tokens
+        self.min_confidence = min_confidence
+        self._lock = threading.Lock()
+        self.counts = {"local": 0, "escalated_long": 0, "escalated_ambiguous": 0, "fallback": 0}
+
+    def _count(self, outcome):
+        with self._lock:
+            self.counts[outcome] += 1
+        NLP_ROUTED.inc(outcome=outcome)
+
+    def _route(self, text):
+        """Returns (local points, None) to answer locally, or (local points or None, reason) to escalate."""
+        if estimate_tokens(text) > self.max_local_tokens:
+            return None, "escalated_long"
+        points, confidence = self.local.summarize(text)
+        if not points or confidence < self.min_confidence:
+            return points, "escalated_ambiguous"
+        return points, None
+
+    def _extract(self, text, escalate):
+        points, reason = self._route(text)
+        if reason is None:
+            self._count("local")
+            return format_key_points(points)
+        self._count(reason)
+        result = escalate(text)
+        if isinstance(result, dict) and "error" in result and points:
+            self._count("fallback")
+            return format_key_points(points)
+        return result
+
+    def extract_key_points(self, text, route=None):
+        return self._extract(text, lambda text: self.remote.extract_key_points(text, route))
+
+    def extract_key_points_chunked(self, text):
+        return self._extract(text, self.remote.extract_key_points_chunked)
+
+    def stream_key_points(self, text):
+        points, reason = self._route(text)
+        if reason is None:
+            self._count("local")
+            yield from points
+            return
+        self._count(reason)
+        remote = self.remote.stream_key_points(text)
+        streamed = False
+        try:
+            for point in remote:
+                streamed = True
+                yield point
+        except Exception:
+            # Once remote points were sent, mixing in local ones would garble the answer.
+            if streamed or not points:
+                raise
+            self._count("fallback")
+            yield from points
+        finally:
+            remote.close()
+
+    def cache_stats(self):
+        return self.remote.cache_stats()
+
+    def limit_stats(self):
+        return {**self.remote.limit_stats(), "backend": self.name, "routing": dict(self.counts)}
+
+    def usage_stats(self):
+        return {**self.remote.usage_stats(), "backend": self.name, "routing": dict(self.counts)}
+
+
+NLP_BACKENDS = ("openai", "extractive", "hybrid")
+
+
+def build_backend(name):
+    if name == "openai":
+        return NLPProcessor(api_key=os.getenv("OPENAI_API_KEY"))
+    if name == "extractive":
+        return ExtractiveBackend(max_points=int(os.getenv("NLP_EXTRACTIVE_MAX_POINTS", "10")))
+    if name == "hybrid":
+        return HybridBackend(
+            build_backend("extractive"),
+            build_backend("openai"),
+            max_local_tokens=int(os.getenv("NLP_HYBRID_MAX_LOCAL_TOKENS", "4000")),
+            min_confidence=float(os.getenv("NLP_HYBRID_MIN_CONFIDENCE", "0.1")),
+        )
+    raise ValueError(f"Unknown NLP backend: {name}")
+
+
+_nlp_processor = None
+_nlp_processor_lock = threading.Lock()
+
+
+def get_nlp_processor():
+    """The backend selected by NLP_BACKEND (openai, extractive or hybrid), shared by every route."""
+    global _nlp_processor
+    with _nlp_processor_lock:
+        if _nlp_processor is None:
+            _nlp_processor = build_backend(os.getenv("NLP_BACKEND", "openai"))
+        return _nlp_processor
@@ -0,0 +1,290 @@
+import os
+import html
+import time
+import shutil
+import textwrap
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# Documents are passed to backends as a list of (style, text) blocks where
+# style is one of "title", "heading" or "paragraph". Newlines inside a block
+# are line breaks.
+
+
+class RendererBusyError(Exception):
+    pass
+
+
+def blocks_to_html(blocks) -> str:
+    parts = []
+    for style, text in blocks:
+        text = html.escape(text).replace("\n", "<br>")
+        if style == "title":
+            parts.append(f"<h1><b>{text}</b></h1>")
+        elif style == "heading":
+            parts.append(f"<h2>{text}</h2>")
+        elif style == "subheading":
+            parts.append(f"<h3>{text}</h3>")
+        else:
+            parts.append(f"<p>{text}</p>")
+    return "".join(parts)
+
+
+def _pdfkit_configuration():
+    import pdfkit
+    path = os.getenv("WKHTMLTOPDF_PATH") or shutil.which("wkhtmltopdf")
+    return pdfkit.configuration(wkhtmltopdf=path) if path else None
+
+
+class WkhtmltopdfBackend:
+    """Runs wkhtmltopdf through pdfkit in the calling thread, one process per document."""
+
+    name = "wkhtmltopdf"
+
+    def __init__(self):
+        self.configuration = _pdfkit_configuration()
+
+    def render(self, blocks) -> bytes:
+        import pdfkit
+        return pdfkit.from_string(blocks_to_html(blocks), False, configuration=self.configuration)
+
+
+_worker_configuration = None
+
+
+def _init_pool_worker():
+    global _worker_configuration
+    _worker_configuration = _pdfkit_configuration()
+
+
+def _render_in_worker(page_html):
+    import pdfkit
+    return pdfkit.from_string(page_html, False, configuration=_worker_configuration)
+
+
+class WkhtmltopdfPoolBackend:
+    """Renders on a pool of long-lived worker processes behind a bounded queue.
+
+    wkhtmltopdf has no resident mode, so each document still execs the
+    binary, but workers keep the resolved configuration warm and the pool
+    caps how many renders run at once. Callers that cannot get a queue
+    slot within queue_timeout seconds get RendererBusyError.
+    """
+
+    name = "pool"
+
+    def __init__(self, pool_size=2, queue_depth=8, queue_timeout=10):
+        self.pool_size = pool_size
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(pool_size + queue_depth)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        # Created on first use so that forked WSGI workers each get their own pool.
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.pool_size, initializer=_init_pool_worker)
+            return self._executor
+
+    def render(self, blocks) -> bytes:
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise RendererBusyError("PDF render queue is full")
+        try:
+            return self._get_executor().submit(_render_in_worker, blocks_to_html(blocks)).result()
+        finally:
+            self._slots.release()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+
+class SimplePdfBackend:
+    """Pure-Python renderer using the PDF base-14 Helvetica fonts; needs no external binary."""
+
+    name = "python"
+
+    PAGE_WIDTH = 612
+    PAGE_HEIGHT = 792
+    MARGIN = 72
+    STYLES = {
+        "title": ("F2", 20),
+        "heading": ("F2", 14),
+        "subheading": ("F2", 12),
+        "paragraph": ("F1", 11),
+    }
+
+    def _layout(self, blocks):
+        """Yields (font, size, y, text) lines, and None at each page break."""
+        usable_width = self.PAGE_WIDTH - 2 * self.MARGIN
+        y = self.PAGE_HEIGHT - self.MARGIN
+        for style, text in blocks:
+            font, size = self.STYLES.get(style, self.STYLES["paragraph"])
+            leading = size * 1.4
+            # Helvetica averages roughly half an em per character.
+            width = max(1, int(usable_width / (size * 0.5)))
+            for line in text.split("\n"):
+                for wrapped in textwrap.wrap(line, width) or [""]:
+                    if y - leading < self.MARGIN:
+                        yield None
+                        y = self.PAGE_HEIGHT - self.MARGIN
+                    y -= leading
+                    yield font, size, y, wrapped
+            y -= size * 0.6
+
+    @staticmethod
+    def _escape(text):
+        text = text.encode("cp1252", "replace").decode("latin-1")
+        return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    def render(self, blocks) -> bytes:
+        pages = [[]]
+        for line in self._layout(blocks):
+            if line is None:
+                pages.append([])
+            else:
+                pages[-1].append(line)
+
+        objects = [
+            b"<< /Type /Catalog /Pages 2 0 R >>",
+            None,  # Pages, filled in once the page object numbers are known
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+        ]
+        page_ids = []
+        for lines in pages:
+            stream = "".join(
+                f"BT /{font} {size} Tf {self.MARGIN} {y:.2f} Td ({self._escape(text)}) Tj ET\n"
+                for font, size, y, text in lines
+            ).encode("latin-1")
+            objects.append(b"<< /Length %d >>\nstream\n%sendstream" % (len(stream), stream))
+            content_id = len(objects)
+            objects.append(
+                b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+                b"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents %d 0 R >>"
+                % (self.PAGE_WIDTH, self.PAGE_HEIGHT, content_id)
+            )
+            page_ids.append(len(objects))
+        kids = " ".join(f"{page_id} 0 R" for page_id in page_ids)
+        objects[1] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode("ascii")
+
+        output = bytearray(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(len(output))
+            output += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+        xref_offset = len(output)
+        output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+        for offset in offsets:
+            output += b"%010d 00000 n \n" % offset
+        output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset)
+        return bytes(output)
+
+
+class LatencyStats:
+    def __init__(self):
+        self.count = 0
+        self.failures = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, elapsed_ms, failed=False):
+        with self._lock:
+            if failed:
+                self.failures += 1
+                return
+            self.count += 1
+            self.total_ms += elapsed_ms
+            self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "failures": self.failures,
+            "avg_ms": round(self.total_ms / self.count, 2) if self.count else None,
+            "max_ms": round(self.max_ms, 2),
+        }
+
+
+class PdfRenderer:
+    """Renders through the configured backend, falling back when it fails or is busy."""
+
+    def __init__(self, backend, fallback=None):
+        self.backend = backend
+        self.fallback = fallback
+        self.stats = {backend.name: LatencyStats()}
+        if fallback is not None:
+            self.stats[fallback.name] = LatencyStats()
+
+    def _timed_render(self, backend, blocks):
+        start = time.perf_counter()
+        try:
+            pdf_bytes = backend.render(blocks)
+        except Exception:
+            self.stats[backend.name].record(0, failed=True)
+            raise
+        self.stats[backend.name].record((time.perf_counter() - start) * 1000)
+        return pdf_bytes
+
+    def render(self, blocks) -> bytes:
+        try:
+            return self._timed_render(self.backend, blocks)
+        except Exception as e:
+            if self.fallback is None:
+                raise
+            print(f"PDF backend {self.backend.name} failed, using {self.fallback.name}: {e}")
+            return self._timed_render(self.fallback, blocks)
+
+    def stats_dict(self) -> dict:
+        return {
+            "backend": self.backend.name,
+            "fallback": self.fallback.name if self.fallback is not None else None,
+            "backends": {name: stats.to_dict() for name, stats in self.stats.items()},
+        }
+
+
+def build_backend(name):
+    if name == "wkhtmltopdf":
+        return WkhtmltopdfBackend()
+    if name == "pool":
+        return WkhtmltopdfPoolBackend(
+            pool_size=int(os.getenv("PDF_POOL_SIZE", "2")),
+            queue_depth=int(os.getenv("PDF_POOL_QUEUE_DEPTH", "8")),
+            queue_timeout=float(os.getenv("PDF_POOL_QUEUE_TIMEOUT", "10")),
+        )
+    if name == "python":
+        return SimplePdfBackend()
+    raise ValueError(f"Unknown PDF backend: {name}")
+
+
+_pdf_renderer = None
+_pdf_renderer_lock = threading.Lock()
+
+
+def get_pdf_renderer():
+    """Returns the process-wide renderer selected by PDF_BACKEND and PDF_FALLBACK."""
+    global _pdf_renderer
+    with _pdf_renderer_lock:
+        if _pdf_renderer is None:
+            backend = build_backend(os.getenv("PDF_BACKEND", "wkhtmltopdf"))
+            fallback_name = os.getenv("PDF_FALLBACK", "python")
+            fallback = None
+            if fallback_name not in ("", "none") and fallback_name != backend.name:
+                fallback = build_backend(fallback_name)
+            _pdf_renderer = PdfRenderer(backend, fallback)
+        return _pdf_renderer
+
+
+def shutdown_pdf_renderer():
+    """Stops the renderer's worker processes, if it has any."""
+    global _pdf_renderer
+    with _pdf_renderer_lock:
+        renderer, _pdf_renderer = _pdf_renderer, None
+    if renderer is not None:
+        for backend in (renderer.backend, renderer.fallback):
+            if hasattr(backend, "shutdown"):
+                backend.shutdown()
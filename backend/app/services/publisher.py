@@ -0,0 +1,381 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from flask import current_app
+
+# Notion rejects rich text objects over 2000 characters and more than 100
+# blocks per request.
+NOTION_TEXT_LIMIT = 2000
+NOTION_BLOCKS_PER_REQUEST = 100
+
+
+class PublishOutbox:
+    """Durable queue of documents waiting to be published, persisted in SQLite.
+
+    Entries move pending -> running -> succeeded/failed. Entries left running
+    by a crashed process are put back to pending by requeue_stale(). Each
+    entry also keeps the publisher's progress (e.g. a page already created),
+    so a retry resumes instead of starting over.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS publishes ("
+                "id TEXT PRIMARY KEY, provider TEXT NOT NULL, title TEXT NOT NULL, content TEXT NOT NULL, "
+                "status TEXT NOT NULL, url TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0, "
+                "available_at REAL NOT NULL, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS publishes_pending ON publishes (status, available_at)")
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(publishes)")}
+            if "progress" not in columns:
+                # Outboxes created before progress was tracked.
+                self._conn.execute("ALTER TABLE publishes ADD COLUMN progress TEXT")
+            self._conn.commit()
+        return self._conn
+
+    def enqueue(self, provider, title, content) -> str:
+        publish_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._connection().execute(
+                "INSERT INTO publishes (id, provider, title, content, status, available_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, 'pending', ?, ?, ?)",
+                (publish_id, provider, title, content, now, now, now),
+            )
+            self._connection().commit()
+        return publish_id
+
+    def claim(self, limit) -> list:
+        """Marks up to limit due pending entries as running and returns them."""
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            # Several gunicorn workers share the file; take the write lock before reading.
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = conn.execute(
+                    "SELECT id, provider, title, content, attempts, progress FROM publishes "
+                    "WHERE status = 'pending' AND available_at <= ? ORDER BY created_at LIMIT ?",
+                    (now, limit),
+                ).fetchall()
+                conn.executemany(
+                    "UPDATE publishes SET status = 'running', attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    [(now, row[0]) for row in rows],
+                )
+                conn.commit()
+            except sqlite3.Error:
+                conn.rollback()
+                raise
+        return [
+            {"id": row[0], "provider": row[1], "title": row[2], "content": row[3], "attempts": row[4] + 1,
+             "progress": json.loads(row[5]) if row[5] else {}}
+            for row in rows
+        ]
+
+    def save_progress(self, publish_id, progress):
+        with self._lock:
+            self._connection().execute(
+                "UPDATE publishes SET progress = ?, updated_at = ? WHERE id = ?",
+                (json.dumps(progress), time.time(), publish_id),
+            )
+            self._connection().commit()
+
+    def complete(self, publish_id, url):
+        self._finish(publish_id, "succeeded", url=url)
+
+    def fail(self, publish_id, error, retry_in=None):
+        """Records a failure; with retry_in the entry becomes pending again after that many seconds."""
+        if retry_in is None:
+            self._finish(publish_id, "failed", error=error)
+            return
+        now = time.time()
+        with self._lock:
+            self._connection().execute(
+                "UPDATE publishes SET status = 'pending', error = ?, available_at = ?, updated_at = ? WHERE id = ?",
+                (error, now + retry_in, now, publish_id),
+            )
+            self._connection().commit()
+
+    def _finish(self, publish_id, status, url=None, error=None):
+        with self._lock:
+            self._connection().execute(
+                "UPDATE publishes SET status = ?, url = ?, error = ?, content = '', updated_at = ? WHERE id = ?",
+                (status, url, error, time.time(), publish_id),
+            )
+            self._connection().commit()
+
+    def requeue_stale(self, older_than):
+        with self._lock:
+            cursor = self._connection().execute(
+                "UPDATE publishes SET status = 'pending' WHERE status = 'running' AND updated_at < ?",
+                (time.time() - older_than,),
+            )
+            self._connection().commit()
+        return cursor.rowcount
+
+    def get(self, publish_id):
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT id, provider, title, status, url, error, attempts, created_at, updated_at "
+                "FROM publishes WHERE id = ?", (publish_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        keys = ("id", "provider", "title", "status", "url", "error", "attempts", "created_at", "updated_at")
+        return dict(zip(keys, row))
+
+    def counts(self) -> dict:
+        with self._lock:
+            rows = self._connection().execute("SELECT status, COUNT(*) FROM publishes GROUP BY status").fetchall()
+        return dict(rows)
+
+
+def content_paragraphs(content):
+    """Splits template text into (style, text) paragraphs: the "Title:" line, headings and body lines."""
+    paragraphs = []
+    for i, line in enumerate(content.split("\n")):
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if i == 0 and stripped.endswith(":"):
+            paragraphs.append(("title", stripped[:-1]))
+        elif stripped.startswith("- "):
+            paragraphs.append(("bullet", stripped[2:]))
+        elif line.startswith("  "):
+            paragraphs.append(("subheading", stripped))
+        elif len(stripped) < 80 and ":" not in stripped and not stripped[0].isdigit() and not stripped.endswith("."):
+            paragraphs.append(("heading", stripped))
+        else:
+            paragraphs.append(("paragraph", stripped))
+    return paragraphs
+
+
+class GoogleDocsPublisher:
+    """Creates a document and writes all of its content in a single batchUpdate."""
+
+    NAMED_STYLES = {"title": "TITLE", "heading": "HEADING_1", "subheading": "HEADING_2"}
+
+    def __init__(self, clients):
+        self.clients = clients
+
+    @classmethod
+    def build_requests(cls, content):
+        """One insertText for the whole body plus paragraph and bullet styling, all for one batchUpdate."""
+        paragraphs = content_paragraphs(content)
+        text = "".join(paragraph + "\n" for _, paragraph in paragraphs)
+        requests = [{"insertText": {"location": {"index": 1}, "text": text}}]
+        index = 1
+        for style, paragraph in paragraphs:
+            # Docs indexes count UTF-16 code units, newline included.
+            length = len((paragraph + "\n").encode("utf-16-le")) // 2
+            span = {"startIndex": index, "endIndex": index + length}
+            if style in cls.NAMED_STYLES:
+                requests.append({"updateParagraphStyle": {
+                    "range": span,
+                    "paragraphStyle": {"namedStyleType": cls.NAMED_STYLES[style]},
+                    "fields": "namedStyleType",
+                }})
+            elif style == "bullet":
+                requests.append({"createParagraphBullets": {
+                    "range": span, "bulletPreset": "BULLET_DISC_CIRCLE_SQUARE",
+                }})
+            index += length
+        return requests
+
+    def publish(self, title, content, progress=None, checkpoint=None):
+        """Creates the document unless progress says an earlier attempt did; batchUpdate is atomic."""
+        progress = {} if progress is None else progress
+        docs = self.clients.google_docs
+        document_id = progress.get("document_id")
+        if document_id is None:
+            document_id = docs.documents().create(body={"title": title}).execute()["documentId"]
+            progress["document_id"] = document_id
+            if checkpoint is not None:
+                checkpoint()
+        docs.documents().batchUpdate(
+            documentId=document_id, body={"requests": self.build_requests(content)}
+        ).execute()
+        return f"https://docs.google.com/document/d/{document_id}"
+
+
+def notion_blocks(content):
+    """Converts template text to Notion blocks, splitting text at the per-object character limit."""
+    block_types = {"title": "heading_1", "heading": "heading_2", "subheading": "heading_3",
+                   "bullet": "bulleted_list_item", "paragraph": "paragraph"}
+    blocks = []
+    for style, text in content_paragraphs(content):
+        block_type = block_types[style]
+        rich_text = [
+            {"type": "text", "text": {"content": text[start:start + NOTION_TEXT_LIMIT]}}
+            for start in range(0, len(text), NOTION_TEXT_LIMIT)
+        ]
+        # A block holds at most 100 rich text objects; longer text continues in another block.
+        for start in range(0, len(rich_text), 100):
+            blocks.append({"object": "block", "type": block_type, block_type: {"rich_text": rich_text[start:start + 100]}})
+    return blocks
+
+
+class NotionPublisher:
+    """Creates a database page, caching the database schema between publishes."""
+
+    def __init__(self, clients, database_id=None, schema_ttl=600):
+        self.clients = clients
+        self.database_id = database_id or os.getenv("YOUR_DATABASE_ID")
+        self.schema_ttl = schema_ttl
+        self._schema = None
+        self._schema_loaded = 0.0
+        self._lock = threading.Lock()
+
+    def schema(self):
+        """Returns (title property name, database properties), refreshed every schema_ttl seconds."""
+        with self._lock:
+            if self._schema is None or time.monotonic() - self._schema_loaded > self.schema_ttl:
+                database = self.clients.notion.databases.retrieve(self.database_id)
+                title_property = next(
+                    (name for name, details in database["properties"].items() if details["type"] == "title"), None
+                )
+                if not title_property:
+                    raise ValueError("No title property found in the database.")
+                self._schema = (title_property, database["properties"])
+                self._schema_loaded = time.monotonic()
+            return self._schema
+
+    def invalidate_schema(self):
+        with self._lock:
+            self._schema = None
+
+    def publish(self, title, content, progress=None, checkpoint=None):
+        """Creates the page with the first 100 blocks and appends the rest.
+
+        progress records the page and how many blocks it holds, and checkpoint()
+        persists it after each step, so a retry appends to the page it already
+        created instead of creating a duplicate.
+        """
+        if not self.database_id:
+            raise ValueError("YOUR_DATABASE_ID environment variable is not set.")
+        progress = {} if progress is None else progress
+        notion = self.clients.notion
+        blocks = notion_blocks(content)
+
+        if "page_id" not in progress:
+            title_property, database_properties = self.schema()
+            properties = {title_property: {"title": [{"text": {"content": title}}]}}
+            if "Status" in database_properties:
+                properties["Status"] = {"select": {"name": "In Progress"}}
+            # Example: Setting "Due Date" (Adapt as needed)
+            if "Due Date" in database_properties:
+                properties["Due Date"] = {"date": {"start": "2024-12-31"}}  # ISO 8601 format
+            try:
+                page = notion.pages.create(
+                    parent={"database_id": self.database_id},
+                    properties=properties,
+                    children=blocks[:NOTION_BLOCKS_PER_REQUEST],
+                )
+            except Exception:
+                # The schema may have changed under us; reload it on the next attempt.
+                self.invalidate_schema()
+                raise
+            progress.update(page_id=page["id"], url=page.get("url"), blocks=min(len(blocks), NOTION_BLOCKS_PER_REQUEST))
+            if checkpoint is not None:
+                checkpoint()
+
+        for start in range(progress["blocks"], len(blocks), NOTION_BLOCKS_PER_REQUEST):
+            batch = blocks[start:start + NOTION_BLOCKS_PER_REQUEST]
+            notion.blocks.children.append(progress["page_id"], children=batch)
+            progress["blocks"] = start + len(batch)
+            if checkpoint is not None:
+                checkpoint()
+        return progress["url"]
+
+
+class PublishService:
+    """Background workers that drain the outbox through the provider publishers."""
+
+    def __init__(self, outbox, publishers, workers=2, poll_interval=1.0, max_attempts=3, retry_backoff=5.0,
+                 stale_after=600.0):
+        self.outbox = outbox
+        self.publishers = publishers
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.stale_after = stale_after
+        self._threads = []
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Starts the workers once per process.
+
+        Entries stuck running for stale_after seconds were claimed by a process
+        that died, so they are handed out again.
+        """
+        with self._lock:
+            if self._threads or self.workers <= 0:
+                return
+            self.outbox.requeue_stale(self.stale_after)
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"publisher-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, provider, title, content) -> str:
+        if provider not in self.publishers:
+            raise ValueError(f"Unknown publish provider: {provider}")
+        publish_id = self.outbox.enqueue(provider, title, content)
+        self.start()
+        self._wake.set()
+        return publish_id
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                entries = self.outbox.claim(1)
+            except sqlite3.Error as e:
+                print(f"Publish outbox unavailable: {e}")
+                entries = []
+            if not entries:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+            self.process(entries[0])
+
+    def process(self, entry):
+        progress = entry.get("progress", {})
+        try:
+            url = self.publishers[entry["provider"]].publish(
+                entry["title"], entry["content"], progress,
+                checkpoint=lambda: self.outbox.save_progress(entry["id"], progress),
+            )
+        except Exception as e:
+            print(f"Publishing {entry['id']} to {entry['provider']} failed: {e}")
+            retry = entry["attempts"] < self.max_attempts and not isinstance(e, (ValueError, FileNotFoundError))
+            retry_in = self.retry_backoff * 2 ** (entry["attempts"] - 1) if retry else None
+            self.outbox.fail(entry["id"], str(e), retry_in=retry_in)
+            return
+        self.outbox.complete(entry["id"], url)
+
+    def shutdown(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+
+def get_publisher() -> PublishService:
+    return current_app.extensions["publisher"]
@@ -0,0 +1,320 @@
+import os
+import math
+import time
+import heapq
+import sqlite3
+import threading
+from itertools import count
+from collections import OrderedDict
+from app.services.rate_limiter import TokenBucket
+from app.utils.metrics import registry
+
+ADMISSION_REJECTED = registry.counter(
+    "admission_rejected_total", "Requests turned away by admission control.", ["reason", "priority"]
+)
+ADMISSION_WAIT_SECONDS = registry.histogram(
+    "admission_queue_wait_seconds", "Time admitted requests waited for a slot.", ["priority"]
+)
+
+
+class AdmissionRejected(Exception):
+    """A request that is not admitted; status is 429 (over quota) or 503 (overloaded)."""
+
+    def __init__(self, message, status, retry_after):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class QuotaStore:
+    """Tenant bucket levels persisted in SQLite, so quotas survive restarts."""
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        # Opened on first use so that building the app does not touch the disk.
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS tenant_quotas ("
+                "tenant TEXT PRIMARY KEY, level REAL NOT NULL, saved_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS tenant_quotas_saved_at ON tenant_quotas (saved_at)")
+            self._conn.commit()
+        return self._conn
+
+    def load(self, tenant):
+        """Returns (level, saved_at) for the tenant, or None."""
+        with self._lock:
+            return self._connection().execute(
+                "SELECT level, saved_at FROM tenant_quotas WHERE tenant = ?", (tenant,)
+            ).fetchone()
+
+    def save(self, levels):
+        """Saves (tenant, level, saved_at) rows in one transaction."""
+        with self._lock:
+            self._connection().executemany(
+                "INSERT OR REPLACE INTO tenant_quotas (tenant, level, saved_at) VALUES (?, ?, ?)", levels
+            )
+            self._connection().commit()
+
+    def prune(self, saved_before):
+        """Deletes levels not saved since saved_before; returns how many were deleted."""
+        with self._lock:
+            cursor = self._connection().execute("DELETE FROM tenant_quotas WHERE saved_at < ?", (saved_before,))
+            self._connection().commit()
+        return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class TenantQuotas:
+    """One token bucket per tenant, sized by the tenant's priority class.
+
+    Buckets live in memory, least recently used first. Buckets idle for
+    idle_ttl seconds are dropped (a bucket that has refilled is the same as
+    a new one), and beyond max_tenants the least recently used go first.
+    With a store, a tenant's level is restored on first sight (refilled for
+    the time it was away), changed levels are written back at most every
+    flush_interval seconds and when evicted, and rows idle for idle_ttl are
+    pruned.
+    """
+
+    def __init__(self, rates, bursts, store=None, flush_interval=5.0, max_tenants=10000, idle_ttl=3600.0):
+        self.rates = rates
+        self.bursts = bursts
+        self.store = store
+        self.flush_interval = flush_interval
+        self.max_tenants = max_tenants
+        self.idle_ttl = idle_ttl
+        self._buckets = OrderedDict()  # tenant -> [bucket, last used (monotonic)]
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self.evictions = 0
+
+    def _bucket(self, tenant, priority):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._buckets.get(tenant)
+            if entry is not None:
+                entry[1] = now
+                self._buckets.move_to_end(tenant)
+                return entry[0]
+        bucket = TokenBucket(self.rates[priority], self.bursts[priority])
+        saved = self.store.load(tenant) if self.store is not None else None
+        if saved is not None:
+            level, saved_at = saved
+            bucket.set_level(level + max(0.0, time.time() - saved_at) * bucket.rate)
+        with self._lock:
+            entry = self._buckets.setdefault(tenant, [bucket, now])
+            evicted = self._evict(now)
+        if evicted and self.store is not None:
+            saved_at = time.time()
+            self.store.save([(name, old.level(), saved_at) for name, old in evicted])
+        return entry[0]
+
+    def _evict(self, now):
+        """Drops idle and surplus buckets (caller holds the lock); returns the evicted dirty ones to save."""
+        evicted = []
+        while self._buckets:
+            tenant, (bucket, last_used) = next(iter(self._buckets.items()))
+            if len(self._buckets) <= self.max_tenants and now - last_used < self.idle_ttl:
+                break
+            del self._buckets[tenant]
+            self.evictions += 1
+            if tenant in self._dirty:
+                self._dirty.discard(tenant)
+                evicted.append((tenant, bucket))
+        return evicted
+
+    def consume(self, tenant, priority, cost) -> float:
+        """Takes cost tokens from the tenant's bucket; returns 0, or the seconds until it could."""
+        bucket = self._bucket(tenant, priority)
+        admitted = bucket.try_acquire(cost)
+        if self.store is not None:
+            with self._lock:
+                if admitted:
+                    self._dirty.add(tenant)
+                due = time.monotonic() - self._last_flush >= self.flush_interval
+            if due:
+                self.flush()
+        return 0.0 if admitted else bucket.wait_time(cost)
+
+    def refund(self, tenant, cost):
+        with self._lock:
+            entry = self._buckets.get(tenant)
+        if entry is not None:
+            entry[0].debit(-cost)
+
+    def flush(self):
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            buckets = [(tenant, self._buckets[tenant][0]) for tenant in dirty if tenant in self._buckets]
+            self._last_flush = time.monotonic()
+            self._evict(self._last_flush)
+        if self.store is not None:
+            now = time.time()
+            if buckets:
+                self.store.save([(tenant, bucket.level(), now) for tenant, bucket in buckets])
+            self.store.prune(now - self.idle_ttl)
+
+    def levels(self) -> dict:
+        with self._lock:
+            buckets = [(tenant, entry[0]) for tenant, entry in self._buckets.items()]
+        return {tenant: round(bucket.level(), 2) for tenant, bucket in buckets}
+
+    def __len__(self):
+        with self._lock:
+            return len(self._buckets)
+
+
+class _Waiter:
+    __slots__ = ("granted", "cancelled")
+
+    def __init__(self):
+        self.granted = False
+        self.cancelled = False
+
+
+class WeightedFairQueue:
+    """max_concurrent slots shared by priority classes, handed out by weighted fair queuing.
+
+    When every slot is busy, requests queue with a virtual finish time of
+    cost / weight after their class's previous request (or the current
+    virtual time, if the class was idle). Freed slots go to the smallest
+    finish time, so under contention each class gets slots in proportion
+    to its weight and no class is starved.
+    """
+
+    def __init__(self, max_concurrent, weights, max_queue=64):
+        self.max_concurrent = max_concurrent
+        self.weights = weights
+        self.max_queue = max_queue
+        self._cond = threading.Condition()
+        self._active = 0
+        self._queued = 0
+        self._heap = []
+        self._sequence = count()
+        self._virtual_time = 0.0
+        self._finish_tags = {}
+
+    def acquire(self, priority, cost=1, timeout=None) -> float:
+        """Blocks until a slot is free; returns the seconds spent waiting.
+
+        Raises AdmissionRejected when the queue is full or timeout passes.
+        """
+        start = time.monotonic()
+        with self._cond:
+            if self._active < self.max_concurrent and not self._queued:
+                self._active += 1
+                return 0.0
+            if self._queued >= self.max_queue:
+                raise AdmissionRejected("Server is busy; too many queued requests", 503, 1)
+
+            tag = max(self._virtual_time, self._finish_tags.get(priority, 0.0)) + cost / self.weights[priority]
+            self._finish_tags[priority] = tag
+            waiter = _Waiter()
+            heapq.heappush(self._heap, (tag, next(self._sequence), waiter))
+            self._queued += 1
+
+            deadline = None if timeout is None else start + timeout
+            while not waiter.granted:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    waiter.cancelled = True
+                    self._queued -= 1
+                    raise AdmissionRejected("Timed out waiting for a free slot", 503, math.ceil(timeout) or 1)
+                self._cond.wait(remaining)
+        return time.monotonic() - start
+
+    def release(self):
+        with self._cond:
+            self._active -= 1
+            while self._heap and self._active < self.max_concurrent:
+                tag, _, waiter = heapq.heappop(self._heap)
+                if waiter.cancelled:
+                    continue
+                waiter.granted = True
+                self._queued -= 1
+                self._active += 1
+                self._virtual_time = tag
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {"active": self._active, "queued": self._queued, "max_concurrent": self.max_concurrent}
+
+
+class AdmissionSlot:
+    """A concurrency slot held by an admitted request.
+
+    release() frees it the first time and does nothing afterwards, so a
+    request can hand its slot to a stream or job that outlives it without
+    the two releasing it twice.
+    """
+
+    def __init__(self, queue):
+        self._queue = queue
+        self._lock = threading.Lock()
+        self._released = False
+
+    def release(self):
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self._queue.release()
+
+
+class AdmissionController:
+    """Per-tenant quotas, then a fair share of the concurrency slots, for expensive routes."""
+
+    def __init__(self, quotas, queue, tenant_priorities=None, default_priority="normal", queue_timeout=10.0):
+        self.quotas = quotas
+        self.queue = queue
+        self.tenant_priorities = tenant_priorities or {}
+        self.default_priority = default_priority
+        self.queue_timeout = queue_timeout
+
+    def priority(self, tenant) -> str:
+        return self.tenant_priorities.get(tenant, self.default_priority)
+
+    def admit(self, tenant, cost=1) -> AdmissionSlot:
+        """Returns the slot held for the request or raises AdmissionRejected; release the slot when done."""
+        priority = self.priority(tenant)
+        retry_after = self.quotas.consume(tenant, priority, cost)
+        if retry_after:
+            ADMISSION_REJECTED.inc(reason="quota", priority=priority)
+            raise AdmissionRejected(f"Tenant {tenant} is over its request quota", 429, max(1, math.ceil(retry_after)))
+        try:
+            waited = self.queue.acquire(priority, cost, timeout=self.queue_timeout)
+        except AdmissionRejected:
+            # Turned away for load rather than quota, so the tenant keeps its tokens.
+            self.quotas.refund(tenant, cost)
+            ADMISSION_REJECTED.inc(reason="overload", priority=priority)
+            raise
+        ADMISSION_WAIT_SECONDS.observe(waited, priority=priority)
+        return AdmissionSlot(self.queue)
+
+    def stats(self, tenants=False) -> dict:
+        """Slot and queue figures, plus each tenant's quota level when tenants is set."""
+        stats = {**self.queue.stats(), "tenant_count": len(self.quotas)}
+        if tenants:
+            stats["tenants"] = self.quotas.levels()
+        return stats
+
+    def close(self):
+        self.quotas.flush()
+        if self.quotas.store is not None:
+            self.quotas.store.close()
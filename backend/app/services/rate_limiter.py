@@ -0,0 +1,196 @@
+import os
+import time
+import threading
+
+
+class RateLimitTimeout(Exception):
+    pass
+
+
+class TokenBucket:
+    """Classic token bucket: holds up to capacity tokens, refilled at rate tokens per second.
+
+    Requests larger than capacity are clamped to it so they can still run
+    once the bucket is full. debit() may take the level below zero, which
+    delays later callers when a call turns out to cost more than estimated.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._level = capacity
+        self._updated = time.monotonic()
+        self._cond = threading.Condition()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount=1) -> float:
+        """Seconds until amount tokens would be available (0 if they are now)."""
+        with self._cond:
+            self._refill()
+            missing = min(amount, self.capacity) - self._level
+            return max(0.0, missing / self.rate) if missing > 0 else 0.0
+
+    def try_acquire(self, amount=1) -> bool:
+        with self._cond:
+            self._refill()
+            amount = min(amount, self.capacity)
+            if self._level >= amount:
+                self._level -= amount
+                return True
+            return False
+
+    def acquire(self, amount=1, timeout=None) -> float:
+        """Blocks until amount tokens are taken; returns the seconds spent waiting.
+
+        Raises RateLimitTimeout if that would take longer than timeout.
+        """
+        amount = min(amount, self.capacity)
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+        with self._cond:
+            while True:
+                self._refill()
+                if self._level >= amount:
+                    self._level -= amount
+                    return time.monotonic() - start
+                wait = (amount - self._level) / self.rate
+                if deadline is not None and time.monotonic() + wait > deadline:
+                    raise RateLimitTimeout(f"Rate limit wait of {wait:.1f}s exceeds the {timeout}s timeout")
+                self._cond.wait(wait)
+
+    def debit(self, amount):
+        """Removes amount tokens even if that leaves a deficit; a negative amount refunds."""
+        with self._cond:
+            self._refill()
+            self._level = min(self.capacity, self._level - amount)
+
+    def level(self) -> float:
+        with self._cond:
+            self._refill()
+            return self._level
+
+    def set_level(self, level):
+        """Restores a saved level, e.g. one persisted before a restart."""
+        with self._cond:
+            self._level = min(self.capacity, level)
+            self._updated = time.monotonic()
+            self._cond.notify_all()
+
+
+class OpenAIRateLimiter:
+    """Requests-per-minute and tokens-per-minute budgets shared by every NLPProcessor.
+
+    The budgets are per process: with several gunicorn workers, divide the
+    account's limits by the worker count. A limit of 0 disables that budget.
+    """
+
+    def __init__(self, requests_per_minute=0, tokens_per_minute=0, timeout=30.0):
+        self.timeout = timeout
+        self.requests = TokenBucket(requests_per_minute / 60.0, requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute / 60.0, tokens_per_minute) if tokens_per_minute else None
+        self._lock = threading.Lock()
+        self.throttled = 0
+        self.wait_seconds = 0.0
+
+    def acquire(self, estimated_tokens) -> float:
+        """Waits for one request slot and estimated_tokens; raises RateLimitTimeout past the timeout."""
+        waited = 0.0
+        deadline = time.monotonic() + self.timeout
+        if self.requests is not None:
+            waited += self.requests.acquire(1, timeout=self.timeout)
+        if self.tokens is not None:
+            try:
+                waited += self.tokens.acquire(estimated_tokens, timeout=max(0.0, deadline - time.monotonic()))
+            except RateLimitTimeout:
+                if self.requests is not None:
+                    self.requests.debit(-1)  # Give the request slot back.
+                raise
+        if waited:
+            with self._lock:
+                self.throttled += 1
+                self.wait_seconds += waited
+        return waited
+
+    def record_usage(self, estimated_tokens, actual_tokens):
+        """Charges (or refunds) the difference once the API reports the real token count."""
+        if self.tokens is not None and actual_tokens is not None:
+            self.tokens.debit(actual_tokens - estimated_tokens)
+
+    def stats(self) -> dict:
+        return {
+            "requests_available": None if self.requests is None else round(self.requests.level(), 1),
+            "tokens_available": None if self.tokens is None else round(self.tokens.level(), 1),
+            "throttled": self.throttled,
+            "wait_seconds": round(self.wait_seconds, 3),
+        }
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one execution.
+
+    The first caller runs fn; callers arriving while it is in flight wait
+    and receive the same result (or exception). Nothing is kept after the
+    call completes; caching is left to the caller.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+_openai_limiter = None
+_openai_limiter_lock = threading.Lock()
+
+
+def get_openai_limiter() -> OpenAIRateLimiter:
+    global _openai_limiter
+    with _openai_limiter_lock:
+        if _openai_limiter is None:
+            _openai_limiter = OpenAIRateLimiter(
+                requests_per_minute=int(os.getenv("OPENAI_REQUESTS_PER_MINUTE", "500")),
+                tokens_per_minute=int(os.getenv("OPENAI_TOKENS_PER_MINUTE", "80000")),
+                timeout=float(os.getenv("OPENAI_LIMIT_TIMEOUT", "30")),
+            )
+        return _openai_limiter
@@ -0,0 +1,189 @@
+import os
+import re
+import json
+import zlib
+import hashlib
+import threading
+import numpy as np
+from functools import lru_cache
+from app.templates.industry_templates import INDUSTRY_TEMPLATES
+
+EMBEDDING_DIM = 1024
+# Bump when the featurization changes so vectors cached on disk are rebuilt.
+EMBEDDING_VERSION = 1
+NGRAM = 4
+
+_word = re.compile(r"[a-z0-9]+")
+_stopwords = frozenset("a an and the of for to in on with by our your we is are be this that will".split())
+
+
+def _stem(word):
+    for suffix in ("ing", "es", "s"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            return word[: -len(suffix)]
+    return word
+
+
+@lru_cache(maxsize=65536)
+def _word_features(word, dim):
+    """Returns (columns, signed weights) for a word: the stemmed word plus character n-grams.
+
+    Vocabularies are small, so caching per word turns featurization into lookups.
+    crc32 is used instead of hash() because it is stable across processes,
+    which the on-disk cache depends on.
+    """
+    stem = _stem(word)
+    padded = f"#{stem}#"
+    features = [("w:" + stem, 1.0)]
+    features += [("g:" + padded[i:i + NGRAM], 0.3) for i in range(len(padded) - NGRAM + 1)]
+    columns, weights = [], []
+    for feature, weight in features:
+        bucket = zlib.crc32(feature.encode("utf-8"))
+        columns.append(bucket % dim)
+        # One hash bit picks the sign so collisions tend to cancel out.
+        weights.append(weight if bucket & 0x80000000 else -weight)
+    return np.array(columns, dtype=np.int64), np.array(weights)
+
+
+def _hashed_features(texts, dim):
+    """Returns (rows, columns, weights) of the hashed features of texts, duplicates summed."""
+    columns, weights, counts = [], [], []
+    for text in texts:
+        count = 0
+        for word in _word.findall(text.lower()):
+            if word in _stopwords or len(word) < 3:
+                continue
+            word_columns, word_weights = _word_features(word, dim)
+            columns.append(word_columns)
+            weights.append(word_weights)
+            count += len(word_columns)
+        counts.append(count)
+    if not columns:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0)
+    rows = np.repeat(np.arange(len(texts), dtype=np.int64), counts)
+    unique, inverse = np.unique(rows * dim + np.concatenate(columns), return_inverse=True)
+    values = np.bincount(inverse, weights=np.concatenate(weights), minlength=len(unique))
+    return unique // dim, unique % dim, values
+
+
+def embed(texts, dim=EMBEDDING_DIM) -> np.ndarray:
+    """Hashes each text into a dim-sized vector and L2-normalizes the rows."""
+    rows, columns, values = _hashed_features(texts, dim)
+    matrix = np.zeros((len(texts), dim), dtype=np.float32)
+    matrix[rows, columns] = values
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-9)
+
+
+def cosine_similarities(texts, vectors) -> np.ndarray:
+    """Cosine similarity of every text against normalized vectors, shape (len(texts), len(vectors)).
+
+    Equivalent to embed(texts) @ vectors.T, but works on the sparse features
+    directly instead of materializing a dense row of dim floats per text.
+    """
+    rows, columns, values = _hashed_features(texts, vectors.shape[1])
+    norms = np.sqrt(np.bincount(rows, weights=values * values, minlength=len(texts)))
+    contributions = vectors.T[columns] * values[:, None]
+    similarities = np.empty((len(texts), len(vectors)), dtype=np.float64)
+    for target in range(len(vectors)):
+        similarities[:, target] = np.bincount(rows, weights=contributions[:, target], minlength=len(texts))
+    return similarities / np.maximum(norms, 1e-9)[:, None]
+
+
+def _targets(structure):
+    """Flattens a template structure into (section index, subsection index or None, text) targets."""
+    targets = []
+    for i, section in enumerate(structure.get("sections", [])):
+        targets.append((i, None, section["title"]))
+        for j, subsection in enumerate(section.get("subsections", [])):
+            targets.append((i, j, f"{subsection} {subsection} {section['title']}"))
+    return targets
+
+
+def structure_fingerprint(templates=INDUSTRY_TEMPLATES, dim=EMBEDDING_DIM) -> str:
+    payload = json.dumps([templates, dim, EMBEDDING_VERSION, NGRAM], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SectionClassifier:
+    """Assigns key points to industry template sections by cosine similarity.
+
+    Vectors for every section and subsection are computed once and saved
+    to cache_path together with a fingerprint of INDUSTRY_TEMPLATES, so
+    later processes load them instead of recomputing. Points whose best
+    similarity is below min_similarity go to the first section.
+    """
+
+    def __init__(self, templates=INDUSTRY_TEMPLATES, cache_path=None, min_similarity=0.15, dim=EMBEDDING_DIM):
+        self.templates = templates
+        self.cache_path = cache_path
+        self.min_similarity = min_similarity
+        self.dim = dim
+        self.loaded_from_disk = False
+        self._targets = {}
+        self._vectors = {}
+        self._load_or_build()
+
+    def _load_or_build(self):
+        fingerprint = structure_fingerprint(self.templates, self.dim)
+        for industry, templates in self.templates.items():
+            for template_type, structure in templates.items():
+                self._targets[(industry, template_type)] = _targets(structure)
+
+        if self.cache_path and os.path.exists(self.cache_path):
+            try:
+                with np.load(self.cache_path, allow_pickle=False) as cached:
+                    if str(cached["fingerprint"]) == fingerprint:
+                        for key in self._targets:
+                            self._vectors[key] = cached["/".join(key)]
+                        self.loaded_from_disk = True
+                        return
+            except Exception as e:
+                print(f"Ignoring section vector cache {self.cache_path}: {e}")
+                self._vectors.clear()
+
+        for key, targets in self._targets.items():
+            self._vectors[key] = embed([text for _, _, text in targets], self.dim)
+        if self.cache_path:
+            self._save(fingerprint)
+
+    def _save(self, fingerprint):
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+            arrays = {"/".join(key): vectors for key, vectors in self._vectors.items()}
+            tmp_path = self.cache_path + ".tmp.npz"
+            np.savez(tmp_path, fingerprint=np.array(fingerprint), **arrays)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"Could not write section vector cache {self.cache_path}: {e}")
+
+    def assign(self, industry, template_type, key_points):
+        """Returns a (section index, subsection index or None) pair per key point."""
+        if not key_points:
+            return []
+        targets = self._targets[(industry, template_type)]
+        similarities = cosine_similarities(key_points, self._vectors[(industry, template_type)])
+        best = similarities.argmax(axis=1)
+        best_scores = similarities[np.arange(len(key_points)), best]
+        return [
+            targets[index][:2] if score >= self.min_similarity else (0, None)
+            for index, score in zip(best.tolist(), best_scores.tolist())
+        ]
+
+
+_classifier = None
+_classifier_lock = threading.Lock()
+
+
+def get_section_classifier() -> SectionClassifier:
+    global _classifier
+    with _classifier_lock:
+        if _classifier is None:
+            _classifier = SectionClassifier(
+                cache_path=os.getenv(
+                    "SECTION_VECTORS_PATH",
+                    os.path.join(os.getenv("UPLOAD_FOLDER", "./uploads"), "section_vectors.npz"),
+                ),
+                min_similarity=float(os.getenv("SECTION_MIN_SIMILARITY", "0.15")),
+            )
+        return _classifier
@@ -0,0 +1,153 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from app.services.text_normalizer import PointIndex
+
+
+class ChannelStateStore:
+    """Per-channel ingestion checkpoints and key point summaries, persisted in SQLite."""
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        # Opened on first use so that importing the routes does not touch the disk.
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS slack_channels ("
+                "channel_id TEXT PRIMARY KEY, oldest_ts TEXT, pending_cursor TEXT, "
+                "pending_latest_ts TEXT, key_points TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def load(self, channel_id) -> dict:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT oldest_ts, pending_cursor, pending_latest_ts, key_points FROM slack_channels "
+                "WHERE channel_id = ?", (channel_id,)
+            ).fetchone()
+        if row is None:
+            return {"oldest_ts": None, "pending_cursor": None, "pending_latest_ts": None, "key_points": []}
+        oldest_ts, pending_cursor, pending_latest_ts, key_points = row
+        return {
+            "oldest_ts": oldest_ts,
+            "pending_cursor": pending_cursor,
+            "pending_latest_ts": pending_latest_ts,
+            "key_points": json.loads(key_points),
+        }
+
+    def save(self, channel_id, state):
+        with self._lock:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO slack_channels "
+                "(channel_id, oldest_ts, pending_cursor, pending_latest_ts, key_points, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (channel_id, state["oldest_ts"], state["pending_cursor"], state["pending_latest_ts"],
+                 json.dumps(state["key_points"]), time.time()),
+            )
+            self._connection().commit()
+
+    def reset(self, channel_id):
+        with self._lock:
+            self._connection().execute("DELETE FROM slack_channels WHERE channel_id = ?", (channel_id,))
+            self._connection().commit()
+
+
+def merge_summary(existing, new_points, max_points):
+    """Appends unseen points to the summary, keeping the most recent max_points."""
+    index = PointIndex()
+    for point in existing:
+        index.add(point)
+    merged = list(existing)
+    merged.extend(point for point in new_points if point and index.add(point))
+    return merged[-max_points:]
+
+
+class SlackIngestor:
+    """Incrementally ingests a Slack channel into a persisted key point summary.
+
+    Each call fetches only messages newer than the channel's checkpoint,
+    extracts key points one history page at a time and merges them into
+    the stored summary. The cursor is saved after every page, so a run
+    interrupted by errors resumes where it stopped instead of refetching.
+    Runs for the same channel are serialized, so concurrent calls never
+    read the same cursor and process its messages twice.
+    """
+
+    def __init__(self, slack, extract_key_points, store, page_size=200, initial_limit=200, max_points=50):
+        self.slack = slack
+        self.extract_key_points = extract_key_points
+        self.store = store
+        self.page_size = page_size
+        self.initial_limit = initial_limit
+        self.max_points = max_points
+        self._locks = {}  # channel_id -> [lock, holders and waiters]
+        self._locks_guard = threading.Lock()
+
+    @contextmanager
+    def _channel_lock(self, channel_id):
+        with self._locks_guard:
+            entry = self._locks.setdefault(channel_id, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._locks_guard:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._locks[channel_id]
+
+    def ingest(self, channel_id, reset=False) -> dict:
+        with self._channel_lock(channel_id):
+            return self._ingest(channel_id, reset)
+
+    def _ingest(self, channel_id, reset):
+        if reset:
+            self.store.reset(channel_id)
+        state = self.store.load(channel_id)
+        first_run = state["oldest_ts"] is None
+        cursor = state["pending_cursor"]
+        latest_ts = state["pending_latest_ts"]
+        new_messages = 0
+
+        while True:
+            messages, next_cursor = self.slack.fetch_history_page(
+                channel_id, oldest=state["oldest_ts"], cursor=cursor, limit=self.page_size
+            )
+            texts = [msg.get("text", "") for msg in reversed(messages) if msg.get("text")]
+            if texts:
+                key_points = self.extract_key_points("\n".join(texts))
+                if isinstance(key_points, dict) and "error" in key_points:
+                    raise RuntimeError(key_points["error"])
+                state["key_points"] = merge_summary(state["key_points"], key_points, self.max_points)
+            if messages:
+                page_latest = max(messages, key=lambda msg: float(msg["ts"]))["ts"]
+                if latest_ts is None or float(page_latest) > float(latest_ts):
+                    latest_ts = page_latest
+            new_messages += len(messages)
+
+            cursor = next_cursor
+            if first_run and new_messages >= self.initial_limit:
+                cursor = None
+            state["pending_cursor"] = cursor
+            state["pending_latest_ts"] = latest_ts
+            if cursor is None:
+                break
+            self.store.save(channel_id, state)
+
+        if latest_ts is not None:
+            state["oldest_ts"] = latest_ts
+        state["pending_latest_ts"] = None
+        self.store.save(channel_id, state)
+        return {"key_points": state["key_points"], "new_messages": new_messages, "checkpoint": state["oldest_ts"]}
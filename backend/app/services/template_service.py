@@ -1,11 +1,22 @@
 import os
 import io
 import re
-import pdfkit
+import hashlib
 import tempfile
-from docx import Document
-from pptx import Presentation
-from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Optional
+from app.services.cache import LRUCache, make_key
+from app.services.pdf_renderer import get_pdf_renderer
+from app.services.layout_engine import STRUCTURED_EXPORTERS, compile_layout
+from app.utils.metrics import timed
+from app.templates.industry_templates import TEMPLATE_STRUCTURE_VERSION
+
+# Rendered files keyed by (format, content hash, structure version); the key doubles as the ETag.
+rendered_documents = LRUCache(
+    max_entries=int(os.getenv("RENDER_CACHE_MAX_ENTRIES", "256")),
+    max_bytes=int(os.getenv("RENDER_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    ttl=int(os.getenv("RENDER_CACHE_TTL", "3600")),
+)
 
 def format_template_content(title: str, key_points: List[str]) -> str:
     """Formats template content with numbering and newlines."""
@@ -18,7 +29,20 @@ def format_template_content(title: str, key_points: List[str]) -> str:
 
     return f"{title}:\n\n" + "\n".join(numbered_points)
 
-def create_template(template_type: str, key_points: List[str]) -> Dict[str, str]:
+def create_template(template_type: str, key_points: List[str], industry: Optional[str] = None) -> Dict[str, object]:
+    """Builds the template content; with an industry that has a structure for
+    template_type, key points are arranged into that industry's sections."""
+    layout = compile_layout(industry, template_type) if industry else None
+    if layout is not None:
+        document = layout.arrange(key_points)
+        return {
+            "template_type": template_type,
+            "industry": industry,
+            "content": document.to_text(),
+            "sections": document.to_dict(),
+            "document": document,
+        }
+
     if template_type == "business_plan":
         return generate_business_plan(key_points)
     elif template_type == "pitch_deck":
@@ -44,6 +68,7 @@ def export_as_word(template_content: str) -> bytes:
     if not template_content:
         return b""
     try:
+        from docx import Document
         doc = Document()
         doc.add_paragraph(template_content)
         file_stream = io.BytesIO()
@@ -62,11 +87,8 @@ def export_as_pdf(template_content: str) -> bytes:
         except ValueError: # Handle cases where there is no colon
             template_type = "Template"
             rest_of_content = template_content
-        formatted_content = rest_of_content.replace('\n', '<br>')
-        
-        html_content = f"<h1><b>{template_type.strip()}</b></h1><p>{formatted_content.strip()}</p>" # bolding the template type
-        pdf_bytes = pdfkit.from_string(html_content, False)
-        return pdf_bytes
+        blocks = [("title", template_type.strip()), ("paragraph", rest_of_content.strip())]
+        return get_pdf_renderer().render(blocks)
     except Exception as e:
         print(f"PDF Export Error: {e}")
         return b""
@@ -75,6 +97,7 @@ def export_as_pptx(template_content: str) -> bytes:
     if not template_content:
         return b""
     try:
+        from pptx import Presentation
         prs = Presentation()
         slide = prs.slides.add_slide(prs.slide_layouts[5])
         tf = slide.shapes.add_textbox(0, 0, prs.slide_width, prs.slide_height).text_frame
@@ -86,6 +109,66 @@ def export_as_pptx(template_content: str) -> bytes:
         print(f"PowerPoint Export Error: {e}")
         return b""
 
+EXPORT_FORMATS = {
+    "word": ("application/vnd.openxmlformats-officedocument.wordprocessingml.document", "docx", export_as_word),
+    "pdf": ("application/pdf", "pdf", export_as_pdf),
+    "pptx": ("application/vnd.openxmlformats-officedocument.presentationml.presentation", "pptx", export_as_pptx),
+}
+
+def document_etag(format_type: str, template_content: str, industry: Optional[str] = None) -> str:
+    content_hash = hashlib.sha256(template_content.encode("utf-8")).hexdigest()
+    return make_key(format_type, content_hash, industry, TEMPLATE_STRUCTURE_VERSION)
+
+def render_document(template_type: str, key_points: List[str], format_type: str,
+                    industry: Optional[str] = None) -> Dict[str, object]:
+    """Builds the template and exports it, returning the file bytes with its mimetype, filename and ETag.
+
+    Identical documents are served from the rendered document cache.
+    """
+    if format_type not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported format: {format_type}")
+    mimetype, extension, export = EXPORT_FORMATS[format_type]
+    template = create_template(template_type, key_points, industry)
+    content = template.get("content", "")
+    structured = template.get("document")
+    etag = document_etag(format_type, content, industry if structured else None)
+
+    file_bytes = rendered_documents.get(etag)
+    if file_bytes is None:
+        with timed(f"export.{format_type}"):
+            if structured is not None:
+                file_bytes = STRUCTURED_EXPORTERS[format_type](structured)
+            else:
+                file_bytes = export(content)
+        if file_bytes:
+            rendered_documents.set(etag, file_bytes)
+
+    return {
+        "content": file_bytes,
+        "mimetype": mimetype,
+        "filename": f"{template_type}.{extension}",
+        "etag": etag,
+    }
+
+def render_batch(specs: List[Dict], max_workers: int = 4):
+    """Renders every spec concurrently and yields (spec, document, error) as each one finishes."""
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = {
+            executor.submit(
+                render_document, spec["template_type"], spec["key_points"], spec["format"], spec.get("industry")
+            ): spec
+            for spec in specs
+        }
+        for future in as_completed(futures):
+            spec = futures[future]
+            try:
+                yield spec, future.result(), None
+            except Exception as e:
+                yield spec, None, str(e)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
 def handle_temporary_file(template_content: str, file_name: str, format_type: str) -> str:
     with tempfile.TemporaryDirectory() as temp_dir:
         extension = "docx" if format_type == "word" else format_type
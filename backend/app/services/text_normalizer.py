@@ -0,0 +1,133 @@
+import re
+
+# A leading "1.", "2)", "-", "*" or "•", followed by whitespace so that
+# "2.5 million", "-5% churn" or "**Bold**" keep their first characters.
+_marker = re.compile(r"^(?:\d+[.)]\s+|[-*•]\s+)")
+_token = re.compile(r"[a-z0-9]+")
+_stopwords = frozenset("a an and the of for to in on with by our your we is are be this that will".split())
+
+
+def collapse_whitespace(text: str) -> str:
+    """Collapses whitespace runs to single spaces and trims both ends.
+
+    str.split() does the scan in C, which is several times faster than
+    re.sub(r"\\s+", " ", text) on multi-megabyte transcripts.
+    """
+    return " ".join(text.split())
+
+
+def iter_collapsed(pieces):
+    """Streaming collapse_whitespace: yields pieces whose concatenation is the collapsed text.
+
+    Whitespace at piece boundaries is merged too, so pieces can be pages,
+    decoded chunks or model deltas.
+    """
+    pending_space = False
+    started = False
+    for piece in pieces:
+        if not piece:
+            continue
+        leading = piece[0].isspace()
+        trailing = piece[-1].isspace()
+        collapsed = " ".join(piece.split())
+        if not collapsed:
+            pending_space = pending_space or started
+            continue
+        if started and (pending_space or leading):
+            yield " "
+        yield collapsed
+        started = True
+        pending_space = trailing
+
+
+def clean_point(line: str) -> str:
+    """Collapses whitespace and strips a leading number or bullet from one line of model output."""
+    return _marker.sub("", " ".join(line.split()), count=1).lstrip()
+
+
+def content_words(text: str) -> list:
+    """Lowercased words of text without punctuation and stopwords."""
+    return [token for token in _token.findall(text.lower()) if token not in _stopwords]
+
+
+def point_tokens(point: str):
+    """Returns (hashes of the point's content words, its numbers).
+
+    Word order, case, punctuation and stopwords are ignored.
+    """
+    tokens = content_words(point)
+    return frozenset(map(hash, tokens)), frozenset(token for token in tokens if token.isdigit())
+
+
+class PointIndex:
+    """Hashing index of the key points seen so far, for near-duplicate detection.
+
+    Points with the same content words are duplicates outright. Otherwise an
+    inverted index from word hash to points finds the points sharing words
+    with a new one, and it is a duplicate if their Jaccard similarity is at
+    least threshold and they mention the same numbers ("grow 20%" and
+    "grow 25%" are different points). Only overlapping points are compared,
+    so adding a point costs time proportional to its words' postings.
+    """
+
+    def __init__(self, threshold=0.8):
+        self.threshold = threshold
+        self._exact = set()
+        self._sizes = []
+        self._numbers = []
+        self._postings = {}
+
+    def __len__(self):
+        return len(self._sizes)
+
+    def is_duplicate(self, tokens: frozenset, numbers: frozenset = frozenset()) -> bool:
+        if tokens in self._exact:
+            return True
+        if self.threshold >= 1.0 or not tokens:
+            return False
+        overlaps = {}
+        for token in tokens:
+            for point_id in self._postings.get(token, ()):
+                overlaps[point_id] = overlaps.get(point_id, 0) + 1
+        size = len(tokens)
+        return any(
+            shared / (size + self._sizes[point_id] - shared) >= self.threshold
+            and self._numbers[point_id] == numbers
+            for point_id, shared in overlaps.items()
+        )
+
+    def add(self, point: str) -> bool:
+        """Records point and returns True, or returns False if it duplicates an earlier point."""
+        tokens, numbers = point_tokens(point)
+        tokens = tokens or frozenset((point.lower(),))
+        if self.is_duplicate(tokens, numbers):
+            return False
+        point_id = len(self._sizes)
+        self._exact.add(tokens)
+        self._sizes.append(len(tokens))
+        self._numbers.append(numbers)
+        for token in tokens:
+            self._postings.setdefault(token, []).append(point_id)
+        return True
+
+
+def normalize_points(lines, index=None):
+    """Single pass over model output lines: cleans each one and yields the new, non-empty points.
+
+    lines may be any iterable, including a stream; pass an index to
+    deduplicate against points already produced elsewhere.
+    """
+    index = index if index is not None else PointIndex()
+    for line in lines:
+        point = clean_point(str(line))
+        if point and index.add(point):
+            yield point
+
+
+def compact_points(key_points, index=None) -> list:
+    """Turns model output (a numbered string or a list) into a list of clean, distinct key points."""
+    if isinstance(key_points, str):
+        key_points = key_points.split("\n")
+    elif not isinstance(key_points, list):
+        return []
+    return list(normalize_points(key_points, index))
@@ -0,0 +1,165 @@
+import re
+import time
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache
+from flask import has_request_context, request
+
+# Context windows of the chat models this app is run with; anything else gets
+# DEFAULT_CONTEXT_TOKENS unless NLP_CONTEXT_TOKENS overrides it.
+CONTEXT_WINDOWS = {
+    "gpt-4": 8192,
+    "gpt-4-32k": 32768,
+    "gpt-4-turbo": 128000,
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+    "gpt-3.5-turbo": 16385,
+    "gpt-3.5-turbo-16k": 16385,
+}
+DEFAULT_CONTEXT_TOKENS = 4096
+
+# Chat formatting overhead per message and for priming the reply, per OpenAI's cookbook.
+MESSAGE_OVERHEAD_TOKENS = 4
+REPLY_OVERHEAD_TOKENS = 3
+
+# Fallback tokenizer: every word piece of up to four characters and every
+# punctuation mark counts as a token. This overestimates English by roughly
+# a third, which errs on the side of never sending an oversized request.
+_piece = re.compile(r"\w{1,4}|[^\w\s]")
+
+
+@lru_cache(maxsize=None)
+def _load_encoding(model):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # The BPE files are downloaded on first use, which fails offline.
+        print(f"tiktoken unavailable for {model}, using the heuristic token counter: {e}")
+        return None
+
+
+class TokenCounter:
+    """Counts tokens with tiktoken when it is installed, otherwise with a local heuristic."""
+
+    def __init__(self, model):
+        self.model = model
+        self.encoding = _load_encoding(model)
+
+    @property
+    def backend(self) -> str:
+        return "tiktoken" if self.encoding is not None else "heuristic"
+
+    def count(self, text: str) -> int:
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        return len(_piece.findall(text))
+
+    def count_messages(self, messages) -> int:
+        return REPLY_OVERHEAD_TOKENS + sum(
+            MESSAGE_OVERHEAD_TOKENS + self.count(message["content"]) for message in messages
+        )
+
+    def shorten(self, text: str, max_tokens: int, separator=" … ") -> str:
+        """Cuts text to about max_tokens, keeping its start and its end.
+
+        Meeting transcripts put decisions and action items at the end, so
+        two thirds of the budget goes to the head and one third to the tail.
+        """
+        tokens = self.count(text)
+        if tokens <= max_tokens:
+            return text
+        # Characters per token of this text, used to turn token budgets into cut points.
+        ratio = len(text) / tokens
+        budget = max_tokens - self.count(separator)
+        while budget > 0:
+            head = text[:int(budget * 2 / 3 * ratio)].rsplit(" ", 1)[0]
+            tail = text[len(text) - int(budget / 3 * ratio):].split(" ", 1)[-1]
+            shortened = head + separator + tail
+            if self.count(shortened) <= max_tokens:
+                return shortened
+            budget -= max(1, budget // 10)
+        return ""
+
+
+_route = contextvars.ContextVar("usage_route", default=None)
+
+
+def current_route() -> str:
+    """The route OpenAI usage is charged to: the usage_route scope, the request endpoint, or "background"."""
+    route = _route.get()
+    if route:
+        return route
+    if has_request_context():
+        return request.endpoint or request.path
+    return "background"
+
+
+@contextmanager
+def usage_route(route):
+    """Charges usage inside the block to route, e.g. for jobs that outlive their request."""
+    token = _route.set(route)
+    try:
+        yield
+    finally:
+        _route.reset(token)
+
+
+class UsageTracker:
+    """Per-call and per-route accounting of prompt and completion tokens and latency.
+
+    Totals are kept per route for the life of the process; the last
+    `recent` calls are kept individually.
+    """
+
+    def __init__(self, recent=100):
+        self._lock = threading.Lock()
+        self._routes = {}
+        self._recent = deque(maxlen=recent)
+
+    def record(self, route, prompt_tokens, completion_tokens, latency, max_tokens=None, trimmed=False,
+               estimated=False, error=None):
+        call = {
+            "route": route,
+            "at": time.time(),
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "max_tokens": max_tokens,
+            "latency_ms": round(latency * 1000, 1),
+            "trimmed": trimmed,
+            "estimated": estimated,
+            "error": error,
+        }
+        with self._lock:
+            totals = self._routes.get(route)
+            if totals is None:
+                totals = self._routes[route] = {
+                    "requests": 0, "errors": 0, "trimmed": 0,
+                    "prompt_tokens": 0, "completion_tokens": 0, "latency_ms": 0.0,
+                }
+            totals["requests"] += 1
+            totals["errors"] += error is not None
+            totals["trimmed"] += trimmed
+            totals["prompt_tokens"] += prompt_tokens
+            totals["completion_tokens"] += completion_tokens
+            totals["latency_ms"] += call["latency_ms"]
+            self._recent.append(call)
+
+    def stats(self) -> dict:
+        with self._lock:
+            routes = {}
+            for route, totals in self._routes.items():
+                routes[route] = {
+                    **totals,
+                    "latency_ms": round(totals["latency_ms"], 1),
+                    "avg_latency_ms": round(totals["latency_ms"] / totals["requests"], 1),
+                    "total_tokens": totals["prompt_tokens"] + totals["completion_tokens"],
+                }
+            return {"routes": routes, "recent": list(self._recent)}
@@ -0,0 +1,124 @@
+import os
+import codecs
+import shutil
+import tempfile
+import threading
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
+from app.utils.metrics import timed
+from app.services.text_normalizer import iter_collapsed as normalize_whitespace
+
+READ_CHUNK_SIZE = 64 * 1024
+SPOOL_MAX_MEMORY = int(os.getenv("TRANSCRIPT_SPOOL_BYTES", str(1024 * 1024)))
+PDF_WORKERS = int(os.getenv("TRANSCRIPT_PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+# PDFs with fewer pages than this are parsed in-process; the pool only pays off for large files.
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("TRANSCRIPT_PDF_PARALLEL_MIN_PAGES", "16"))
+PDF_PAGES_PER_TASK = 8
+
+
+class TranscriptTooLargeError(Exception):
+    pass
+
+
+def spool_upload(stream, filename):
+    """Copies an upload into a temp file owned by the caller, without reading it into memory at once.
+
+    PDFs go to a named file on disk so that worker processes can open them;
+    everything else uses a SpooledTemporaryFile that stays in memory while small.
+    """
+    if filename.lower().endswith(".pdf"):
+        spooled = tempfile.NamedTemporaryFile(suffix=".pdf")
+    else:
+        spooled = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    shutil.copyfileobj(stream, spooled, READ_CHUNK_SIZE)
+    spooled.seek(0)
+    return spooled
+
+
+def _extract_page_range(path, start, stop):
+    from pypdf import PdfReader
+    reader = PdfReader(path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+_pdf_executor = None
+_pdf_executor_lock = threading.Lock()
+
+
+def _get_pdf_executor():
+    global _pdf_executor
+    with _pdf_executor_lock:
+        if _pdf_executor is None:
+            _pdf_executor = ProcessPoolExecutor(max_workers=PDF_WORKERS)
+        return _pdf_executor
+
+
+def shutdown_pdf_executor():
+    global _pdf_executor
+    with _pdf_executor_lock:
+        executor, _pdf_executor = _pdf_executor, None
+    if executor is not None:
+        executor.shutdown()
+
+
+def iter_pdf_text(fileobj, max_pages):
+    from pypdf import PdfReader
+    reader = PdfReader(fileobj)
+    page_count = len(reader.pages)
+    if page_count > max_pages:
+        raise TranscriptTooLargeError(f"PDF has {page_count} pages; the limit is {max_pages}")
+
+    path = getattr(fileobj, "name", None)
+    if PDF_WORKERS <= 1 or page_count < PDF_PARALLEL_MIN_PAGES or not isinstance(path, str) or not os.path.exists(path):
+        for page in reader.pages:
+            yield page.extract_text() or ""
+            yield " "
+        return
+
+    starts = range(0, page_count, PDF_PAGES_PER_TASK)
+    stops = [min(start + PDF_PAGES_PER_TASK, page_count) for start in starts]
+    for texts in _get_pdf_executor().map(_extract_page_range, repeat(path), starts, stops):
+        for text in texts:
+            yield text
+            yield " "
+
+
+def iter_docx_text(fileobj):
+    from docx import Document
+    for paragraph in Document(fileobj).paragraphs:
+        yield paragraph.text
+        yield "\n"
+
+
+def iter_plain_text(fileobj):
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    while True:
+        chunk = fileobj.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        yield decoder.decode(chunk)
+    yield decoder.decode(b"", final=True)
+
+
+def iter_transcript(filename, fileobj, max_pages, max_chars):
+    """Yields normalized transcript text incrementally, enforcing page and character limits as it goes."""
+    name = filename.lower()
+    if name.endswith(".pdf"):
+        pieces = iter_pdf_text(fileobj, max_pages)
+    elif name.endswith(".docx"):
+        pieces = iter_docx_text(fileobj)
+    else:
+        pieces = iter_plain_text(fileobj)
+
+    total = 0
+    for text in normalize_whitespace(pieces):
+        total += len(text)
+        if total > max_chars:
+            raise TranscriptTooLargeError(f"Transcript exceeds the {max_chars} character limit")
+        yield text
+
+
+def read_transcript(filename, fileobj, max_pages, max_chars) -> str:
+    kind = os.path.splitext(filename.lower())[1].lstrip(".") or "txt"
+    with timed(f"parse.{kind if kind in ('pdf', 'docx') else 'txt'}"):
+        return "".join(iter_transcript(filename, fileobj, max_pages, max_chars))
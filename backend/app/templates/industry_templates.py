@@ -1,3 +1,7 @@
+# Bump whenever INDUSTRY_TEMPLATES or the export layouts change so that
+# documents cached under the previous structure are no longer served.
+TEMPLATE_STRUCTURE_VERSION = 3
+
 INDUSTRY_TEMPLATES = {
     "saas": {
         "business_plan": {
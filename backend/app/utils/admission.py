@@ -0,0 +1,116 @@
+import ipaddress
+from flask import g, jsonify, request
+from app.services.quotas import AdmissionController, AdmissionRejected, QuotaStore, TenantQuotas, WeightedFairQueue
+
+MAX_TENANT_LENGTH = 128
+# Blueprint-wide costs skip these, so status polling and stats reads stay free.
+READ_ONLY_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+
+
+def request_cost(costs):
+    """The admission cost of the current request, or None when it is not admission controlled.
+
+    An endpoint entry applies to every method; a blueprint entry only to
+    requests that can do work (not GET, HEAD or OPTIONS). A cost of 0
+    exempts the route.
+    """
+    cost = costs.get(request.endpoint or "")
+    if cost is None and request.method not in READ_ONLY_METHODS:
+        cost = costs.get(request.blueprint or "")
+    return cost or None
+
+
+def parse_networks(value) -> list:
+    """Parses "10.0.0.0/8,127.0.0.1" into networks; "*" matches any address."""
+    items = [item.strip() for item in value.split(",") if item.strip()]
+    if "*" in items:
+        return [ipaddress.ip_network("0.0.0.0/0"), ipaddress.ip_network("::/0")]
+    return [ipaddress.ip_network(item, strict=False) for item in items]
+
+
+def is_trusted(address, networks) -> bool:
+    try:
+        ip = ipaddress.ip_address(address or "")
+    except ValueError:
+        return False
+    return any(ip in network for network in networks)
+
+
+def build_admission_controller(config) -> AdmissionController:
+    priorities = set(config["TENANT_PRIORITIES"].values()) | {config["ADMISSION_DEFAULT_PRIORITY"]}
+    for setting in ("ADMISSION_WEIGHTS", "ADMISSION_RATES", "ADMISSION_BURSTS"):
+        missing = priorities - set(config[setting])
+        if missing:
+            raise ValueError(f"{setting} has no entry for priority {', '.join(sorted(missing))}")
+
+    store = QuotaStore(config["ADMISSION_DB_PATH"]) if config["ADMISSION_DB_PATH"] else None
+    return AdmissionController(
+        TenantQuotas(
+            config["ADMISSION_RATES"], config["ADMISSION_BURSTS"], store=store,
+            max_tenants=config["ADMISSION_MAX_TENANTS"], idle_ttl=config["ADMISSION_TENANT_IDLE_TTL"],
+        ),
+        WeightedFairQueue(
+            config["ADMISSION_MAX_CONCURRENT"], config["ADMISSION_WEIGHTS"], max_queue=config["ADMISSION_MAX_QUEUE"]
+        ),
+        tenant_priorities=config["TENANT_PRIORITIES"],
+        default_priority=config["ADMISSION_DEFAULT_PRIORITY"],
+        queue_timeout=config["ADMISSION_QUEUE_TIMEOUT"],
+    )
+
+
+def init_admission(app):
+    """Admits requests to the routes in ADMISSION_COSTS by tenant quota and fair share of the slots.
+
+    The tenant comes from the TENANT_HEADER header when the request arrives
+    from a TENANT_TRUSTED_PROXIES address, and is the client address
+    otherwise, so clients cannot mint fresh quotas with made-up tenants.
+    Rejections carry Retry-After: 429 when the tenant is over quota, 503
+    when the server is saturated. The slot is held until the response body
+    has been sent, or until an async job queued by the request finishes
+    (see jobs.submit_job).
+    """
+    if not app.config["ADMISSION_ENABLED"]:
+        return
+    controller = app.extensions["admission"] = build_admission_controller(app.config)
+    costs = app.config["ADMISSION_COSTS"]
+    trusted_proxies = parse_networks(app.config["TENANT_TRUSTED_PROXIES"])
+
+    @app.before_request
+    def admit_request():
+        cost = request_cost(costs)
+        if cost is None:
+            return None
+        tenant = None
+        if is_trusted(request.remote_addr, trusted_proxies):
+            tenant = request.headers.get(app.config["TENANT_HEADER"])
+        tenant = tenant or f"ip:{request.remote_addr}"
+        if len(tenant) > MAX_TENANT_LENGTH:
+            return jsonify({"error": f"{app.config['TENANT_HEADER']} is too long"}), 400
+        try:
+            g.admission_slot = controller.admit(tenant, cost)
+        except AdmissionRejected as e:
+            response = jsonify({"error": str(e), "tenant": tenant, "retry_after": e.retry_after})
+            response.headers["Retry-After"] = str(e.retry_after)
+            return response, e.status
+        return None
+
+    @app.after_request
+    def hold_slot_while_streaming(response):
+        # Streamed bodies (zips, SSE) are produced after the request context may be
+        # gone, so their slot is released when the server closes the response.
+        if response.is_streamed:
+            slot = g.pop("admission_slot", None)
+            if slot is not None:
+                response.call_on_close(slot.release)
+        return response
+
+    @app.teardown_request
+    def release_slot(exc):
+        slot = g.pop("admission_slot", None)
+        if slot is not None:
+            slot.release()
+
+    @app.route("/admission/stats")
+    def admission_stats():
+        # Per-tenant levels name every tenant, so they are only listed when ADMISSION_STATS_TENANTS is set.
+        return jsonify(controller.stats(tenants=app.config["ADMISSION_STATS_TENANTS"])), 200
@@ -0,0 +1,59 @@
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgiInstance
+
+
+class ThreadPoolWsgiToAsgi:
+    """Serves a WSGI app over ASGI with each request on its own thread from a pool of `threads`.
+
+    asgiref's WsgiToAsgi runs the app with sync_to_async's default
+    thread_sensitive=True, which puts every request of the process on one
+    shared thread. Here requests run with thread_sensitive=False on the pool,
+    so slow I/O-bound routes overlap like they do under gunicorn gthread.
+    The response iterable is also closed when it is done, which runs
+    call_on_close callbacks and stream_with_context teardown.
+    """
+
+    def __init__(self, wsgi_application, threads=8):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="asgi")
+
+    async def __call__(self, scope, receive, send):
+        await _PooledInstance(self.wsgi_application, self.executor)(scope, receive, send)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+
+class _PooledInstance(WsgiToAsgiInstance):
+    def __init__(self, wsgi_application, executor):
+        super().__init__(wsgi_application)
+        self.executor = executor
+
+    async def run_wsgi_app(self, body):
+        await sync_to_async(self._run, thread_sensitive=False, executor=self.executor)(body)
+
+    def _run(self, body):
+        # Same as WsgiToAsgiInstance.run_wsgi_app, plus closing the iterable.
+        environ = self.build_environ(self.scope, body)
+        iterable = self.wsgi_application(environ, self.start_response)
+        try:
+            bytes_sent = 0
+            for output in iterable:
+                if not self.response_started:
+                    self.response_started = True
+                    self.sync_send(self.response_start)
+                if self.response_content_length is not None:
+                    output = output[:self.response_content_length - bytes_sent]
+                self.sync_send({"type": "http.response.body", "body": output, "more_body": True})
+                bytes_sent += len(output)
+                if bytes_sent == self.response_content_length:
+                    break
+        finally:
+            close = getattr(iterable, "close", None)
+            if close is not None:
+                close()
+        if not self.response_started:
+            self.response_started = True
+            self.sync_send(self.response_start)
+        self.sync_send({"type": "http.response.body"})
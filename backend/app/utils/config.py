@@ -1,13 +1,102 @@
 import os
 import json
 import base64
-import firebase_admin
-from firebase_admin import credentials, firestore
+from app.services.document_cache import parse_collection_ttls
+
+def _env_flag(name, default="false"):
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
+def parse_mapping(value: str, cast=str) -> dict:
+    """Parses "high=4,low=1" into {"high": cast("4"), "low": cast("1")}."""
+    mapping = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        key, _, raw = item.partition("=")
+        mapping[key.strip()] = cast(raw.strip())
+    return mapping
+
+
+def server_settings() -> dict:
+    """Serving options for gunicorn.conf.py and the dev server, read from the environment.
+
+    Kept separate from configure_app so the gunicorn master can read them
+    without building the app.
+    """
+    return {
+        "DEBUG": _env_flag("FLASK_DEBUG"),
+        "SERVER_BIND": os.getenv("SERVER_BIND", f"0.0.0.0:{os.getenv('PORT', '5000')}"),
+        "SERVER_WORKERS": int(os.getenv("SERVER_WORKERS", str(min(2 * (os.cpu_count() or 1) + 1, 8)))),
+        # gthread workers serve SERVER_THREADS requests at once each; I/O-bound routes
+        # (OpenAI, Firestore, Slack) spend most of their time waiting.
+        "SERVER_WORKER_CLASS": os.getenv("SERVER_WORKER_CLASS", "gthread"),
+        "SERVER_THREADS": int(os.getenv("SERVER_THREADS", "8")),
+        "SERVER_TIMEOUT": int(os.getenv("SERVER_TIMEOUT", "120")),
+        "SERVER_GRACEFUL_TIMEOUT": int(os.getenv("SERVER_GRACEFUL_TIMEOUT", "30")),
+        "SERVER_KEEPALIVE": int(os.getenv("SERVER_KEEPALIVE", "5")),
+        "SERVER_PRELOAD": _env_flag("SERVER_PRELOAD"),
+        "SERVER_MAX_REQUESTS": int(os.getenv("SERVER_MAX_REQUESTS", "0")),
+        "SERVER_MAX_REQUESTS_JITTER": int(os.getenv("SERVER_MAX_REQUESTS_JITTER", "0")),
+    }
+
 
 def configure_app(app):
+    app.config.update(server_settings())
     app.config["SECRET_KEY"] = os.getenv("SECRET_KEY", "default_secret_key")
     app.config["UPLOAD_FOLDER"] = os.getenv("UPLOAD_FOLDER", "./uploads")
     app.config["MAX_CONTENT_LENGTH"] = 16 * 1024 * 1024  # 16 MB
+    app.config["PROFILER_ENABLED"] = os.getenv("PROFILER_ENABLED", "false").lower() in ("1", "true", "yes")
+    app.config["PROFILER_MAX_SECONDS"] = float(os.getenv("PROFILER_MAX_SECONDS", "30"))
+    app.config["HTTP_POOL_SIZE"] = int(os.getenv("HTTP_POOL_SIZE", "10"))
+    app.config["HTTP_RETRIES"] = int(os.getenv("HTTP_RETRIES", "2"))
+    app.config["HEALTH_PROBE_TTL"] = float(os.getenv("HEALTH_PROBE_TTL", "30"))
+    app.config["DOC_CACHE_DEFAULT_TTL"] = int(os.getenv("DOC_CACHE_DEFAULT_TTL", "30"))
+    app.config["DOC_CACHE_TTLS"] = parse_collection_ttls(os.getenv("DOC_CACHE_TTLS", "settings=300,templates=600"))
+    app.config["DOC_CACHE_MAX_ENTRIES"] = int(os.getenv("DOC_CACHE_MAX_ENTRIES", "4096"))
+    app.config["DOC_CACHE_LISTEN"] = os.getenv("DOC_CACHE_LISTEN", "false").lower() in ("1", "true", "yes")
+    app.config["BULK_MAX_DOCUMENTS"] = int(os.getenv("BULK_MAX_DOCUMENTS", "5000"))
+    app.config["JOB_WORKERS"] = int(os.getenv("JOB_WORKERS", "4"))
+    app.config["JOB_MAX_QUEUE_DEPTH"] = int(os.getenv("JOB_MAX_QUEUE_DEPTH", "100"))
+    app.config["JOB_RETENTION_SECONDS"] = int(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+    app.config["JOB_MAX_FINISHED"] = int(os.getenv("JOB_MAX_FINISHED", "200"))
+    app.config["JOB_RETRY_AFTER"] = int(os.getenv("JOB_RETRY_AFTER", "5"))
+    app.config["TRANSCRIPT_MAX_PAGES"] = int(os.getenv("TRANSCRIPT_MAX_PAGES", "500"))
+    app.config["TRANSCRIPT_MAX_CHARS"] = int(os.getenv("TRANSCRIPT_MAX_CHARS", str(2 * 1024 * 1024)))
+    app.config["BATCH_MAX_SPECS"] = int(os.getenv("BATCH_MAX_SPECS", "27"))
+    app.config["PRELOAD_SECTION_VECTORS"] = os.getenv("PRELOAD_SECTION_VECTORS", "false").lower() in ("1", "true", "yes")
+    app.config["BATCH_MAX_WORKERS"] = int(os.getenv("BATCH_MAX_WORKERS", "4"))
+    app.config["PUBLISH_DB_PATH"] = os.getenv(
+        "PUBLISH_DB_PATH", os.path.join(app.config["UPLOAD_FOLDER"], "publish_outbox.db")
+    )
+    app.config["PUBLISH_WORKERS"] = int(os.getenv("PUBLISH_WORKERS", "2"))
+    app.config["PUBLISH_MAX_ATTEMPTS"] = int(os.getenv("PUBLISH_MAX_ATTEMPTS", "3"))
+    app.config["PUBLISH_RETRY_BACKOFF"] = float(os.getenv("PUBLISH_RETRY_BACKOFF", "5"))
+    app.config["NOTION_SCHEMA_TTL"] = int(os.getenv("NOTION_SCHEMA_TTL", "600"))
+    # Off by default: behind a load balancer every client shares its address, and so its quota, until
+    # TENANT_TRUSTED_PROXIES lists the balancer.
+    app.config["ADMISSION_ENABLED"] = _env_flag("ADMISSION_ENABLED")
+    app.config["ADMISSION_STATS_TENANTS"] = _env_flag("ADMISSION_STATS_TENANTS")
+    app.config["TENANT_HEADER"] = os.getenv("TENANT_HEADER", "X-Tenant-ID")
+    # TENANT_HEADER is only believed from these addresses (IPs or CIDRs, "*" for any); others are keyed by address.
+    app.config["TENANT_TRUSTED_PROXIES"] = os.getenv("TENANT_TRUSTED_PROXIES", "127.0.0.1,::1")
+    # Tenants not listed in TENANT_PRIORITIES get ADMISSION_DEFAULT_PRIORITY.
+    app.config["TENANT_PRIORITIES"] = parse_mapping(os.getenv("TENANT_PRIORITIES", ""))
+    app.config["ADMISSION_DEFAULT_PRIORITY"] = os.getenv("ADMISSION_DEFAULT_PRIORITY", "normal")
+    app.config["ADMISSION_WEIGHTS"] = parse_mapping(os.getenv("ADMISSION_WEIGHTS", "high=4,normal=2,low=1"), float)
+    # Per-tenant quota refill, in cost units per second, and burst size, by priority.
+    app.config["ADMISSION_RATES"] = parse_mapping(os.getenv("ADMISSION_RATES", "high=10,normal=5,low=1"), float)
+    app.config["ADMISSION_BURSTS"] = parse_mapping(os.getenv("ADMISSION_BURSTS", "high=100,normal=50,low=10"), float)
+    # Cost of a request by endpoint or, failing that and for methods other than GET/HEAD/OPTIONS, by
+    # blueprint. A cost of 0, or no entry, leaves a route out of admission control.
+    app.config["ADMISSION_COSTS"] = parse_mapping(os.getenv(
+        "ADMISSION_COSTS", "integration.upload_transcript=5,nlp.process_text=2,template_generator=1"
+    ), float)
+    app.config["ADMISSION_MAX_CONCURRENT"] = int(os.getenv("ADMISSION_MAX_CONCURRENT", "16"))
+    app.config["ADMISSION_MAX_QUEUE"] = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+    app.config["ADMISSION_QUEUE_TIMEOUT"] = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "10"))
+    app.config["ADMISSION_DB_PATH"] = os.getenv("ADMISSION_DB_PATH", "")
+    # Tenant buckets kept in memory (and rows kept in ADMISSION_DB_PATH); idle ones are dropped first.
+    app.config["ADMISSION_MAX_TENANTS"] = int(os.getenv("ADMISSION_MAX_TENANTS", "10000"))
+    app.config["ADMISSION_TENANT_IDLE_TTL"] = float(os.getenv("ADMISSION_TENANT_IDLE_TTL", "3600"))
 
 
 def initialize_firebase():
@@ -22,6 +111,8 @@ def initialize_firebase():
         raise Exception("FIREBASE_DATABASE_URL environment variable is not set")
 
     # Initialize Firebase Admin SDK
+    import firebase_admin
+    from firebase_admin import credentials
     cred = credentials.Certificate(firebase_credentials_path)
     firebase_admin.initialize_app(cred, {
         "databaseURL": firebase_database_url
@@ -0,0 +1,65 @@
+import math
+import time
+from flask import Response, g, jsonify, request
+from app.utils.metrics import REQUESTS_TOTAL, REQUEST_SECONDS, registry, server_timing_header
+from app.utils.profiler import ProfilerBusyError, SamplingProfiler
+
+
+def init_instrumentation(app):
+    """Registers request timing, the Server-Timing header, /metrics and the opt-in /debug/profile."""
+    profiler = SamplingProfiler()
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop("request_started", None)
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        labels = {
+            "method": request.method,
+            "endpoint": request.endpoint or "unmatched",
+            "status": str(response.status_code),
+        }
+        REQUEST_SECONDS.observe(elapsed, **labels)
+        REQUESTS_TOTAL.inc(**labels)
+        response.headers["Server-Timing"] = server_timing_header(g.pop("stage_timings", []), elapsed)
+        return response
+
+    @app.route("/metrics")
+    def metrics():
+        return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+    @app.route("/debug/startup")
+    def startup_report():
+        startup = app.extensions.get("startup")
+        if startup is None:
+            return jsonify({"error": "No startup report recorded"}), 404
+        return jsonify(startup.to_dict()), 200
+
+    @app.route("/debug/profile")
+    def profile():
+        """Samples all threads for ?seconds= (default 5) and returns collapsed stacks."""
+        if not app.config["PROFILER_ENABLED"]:
+            return jsonify({"error": "Profiler is disabled; set PROFILER_ENABLED=true"}), 404
+        seconds = request.args.get("seconds", type=float)
+        interval = request.args.get("interval", type=float)
+        limit = request.args.get("limit", type=int)
+        for name, value in (("seconds", seconds), ("interval", interval), ("limit", limit)):
+            # type= turns unparsable input into None, which only the absent parameter should be.
+            if name in request.args and (value is None or not math.isfinite(value) or value <= 0):
+                return jsonify({"error": f"{name} must be a positive number"}), 400
+        seconds = min(seconds or 5.0, app.config["PROFILER_MAX_SECONDS"])
+        interval = max(interval or 0.005, 0.001)
+        try:
+            samples, stacks = profiler.profile(seconds, interval)
+        except ProfilerBusyError as e:
+            return jsonify({"error": str(e)}), 409
+        return Response(
+            profiler.render(stacks, limit),
+            mimetype="text/plain",
+            headers={"X-Profile-Samples": str(samples)},
+        )
@@ -0,0 +1,50 @@
+import sys
+import time
+import threading
+from collections import Counter
+
+
+class ProfilerBusyError(Exception):
+    pass
+
+
+class SamplingProfiler:
+    """Samples the stacks of every other thread at a fixed interval.
+
+    Results are returned in the collapsed-stack format ("outer;inner count")
+    used by flame graph tools. Only one profile runs at a time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _collapse(frame):
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_filename}:{code.co_name}:{frame.f_lineno}")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def profile(self, seconds, interval=0.005):
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusyError("A profile is already running")
+        try:
+            own_thread = threading.get_ident()
+            stacks = Counter()
+            samples = 0
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id != own_thread:
+                        stacks[self._collapse(frame)] += 1
+                samples += 1
+                time.sleep(interval)
+            return samples, stacks
+        finally:
+            self._lock.release()
+
+    @staticmethod
+    def render(stacks, limit=None) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common(limit))
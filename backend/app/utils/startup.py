@@ -0,0 +1,35 @@
+import sys
+import time
+from contextlib import contextmanager
+
+
+class StartupReport:
+    """Times the phases of create_app so slow cold starts can be traced to a phase."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = []
+        self.total_ms = None
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, (time.perf_counter() - start) * 1000))
+
+    def finish(self):
+        self.total_ms = (time.perf_counter() - self.started) * 1000
+        return self
+
+    def to_dict(self) -> dict:
+        return {
+            "total_ms": round(self.total_ms or 0.0, 1),
+            "phases": {name: round(elapsed, 1) for name, elapsed in self.phases},
+            "modules_loaded": len(sys.modules),
+        }
+
+    def summary(self) -> str:
+        phases = ", ".join(f"{name} {elapsed:.0f} ms" for name, elapsed in self.phases)
+        return f"App started in {self.total_ms:.0f} ms ({phases})"
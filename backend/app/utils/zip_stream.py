@@ -0,0 +1,36 @@
+import io
+import zipfile
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, unseekable sink; zipfile falls back to data descriptors for these."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(entries):
+    """Yields a zip archive chunk by chunk as (name, bytes) entries arrive.
+
+    Only the entry currently being written is held in memory, not the archive.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, data in entries:
+            archive.writestr(name, data)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    yield sink.drain()
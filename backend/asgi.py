@@ -0,0 +1,24 @@
+"""ASGI entry point: uvicorn asgi:app, or python asgi.py to use the SERVER_* settings.
+
+Each worker runs requests on a pool of SERVER_THREADS threads, so slow
+I/O-bound routes (OpenAI, Slack, Firestore) overlap instead of waiting for
+each other.
+"""
+from app.utils.asgi import ThreadPoolWsgiToAsgi
+from wsgi import app as wsgi_app
+
+app = ThreadPoolWsgiToAsgi(wsgi_app, threads=wsgi_app.config["SERVER_THREADS"])
+
+if __name__ == "__main__":
+    import uvicorn
+
+    host, _, port = wsgi_app.config["SERVER_BIND"].rpartition(":")
+    uvicorn.run(
+        "asgi:app",
+        host=host or "0.0.0.0",
+        port=int(port),
+        workers=wsgi_app.config["SERVER_WORKERS"],
+        timeout_keep_alive=wsgi_app.config["SERVER_KEEPALIVE"],
+        timeout_graceful_shutdown=wsgi_app.config["SERVER_GRACEFUL_TIMEOUT"],
+        lifespan="off",
+    )
@@ -0,0 +1,233 @@
+"""Benchmarks for the template and extraction pipelines.
+
+Run from backend/:
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --compare baseline.json --threshold 0.2
+
+Every case is timed over several repeats after a warm-up, and the results
+are written as JSON so runs from different commits can be compared. The
+NLP backend is replaced by a stub so timings never include network calls.
+"""
+import io
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import atexit
+import argparse
+import platform
+import statistics
+import tempfile
+import subprocess
+from unittest import mock
+
+# Section vectors, caches and uploads the app writes go to a scratch directory,
+# not the working tree, and nothing left over from earlier runs is reused.
+_scratch = tempfile.mkdtemp(prefix="benchmarks-")
+atexit.register(shutil.rmtree, _scratch, ignore_errors=True)
+os.environ["UPLOAD_FOLDER"] = _scratch
+os.environ["SECTION_VECTORS_PATH"] = os.path.join(_scratch, "section_vectors.npz")
+os.environ["NLP_CACHE_DISK_PATH"] = os.path.join(_scratch, "nlp_cache")
+
+from docx import Document
+from flask import Flask
+from app.services import layout_engine, template_service
+from app.services.nlp_processor import get_nlp_processor
+from app.services.pdf_renderer import SimplePdfBackend
+from app.services.text_normalizer import collapse_whitespace, compact_points, iter_collapsed
+from app.utils.config import configure_app
+
+SIZES = (10, 100, 1000)
+PAGE_COUNTS = (1, 10, 50)
+SENTENCE = "We agreed to ship the onboarding flow by Friday and revisit pricing next quarter. "
+
+
+def key_points(count):
+    return [f"Key point {i}: {SENTENCE.strip()}" for i in range(count)]
+
+
+def transcript_text(pages):
+    return "\n".join(SENTENCE * 40 for _ in range(pages))
+
+
+def synthetic_pdf(pages) -> bytes:
+    blocks = [("title", "Synthetic transcript")]
+    blocks += [("paragraph", SENTENCE * 40) for _ in range(pages)]
+    return SimplePdfBackend().render(blocks)
+
+
+def synthetic_docx(pages) -> bytes:
+    document = Document()
+    for _ in range(pages):
+        document.add_paragraph(SENTENCE * 40)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def measure(fn, repeat, warmup=1):
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {
+        "repeat": repeat,
+        "min_ms": timings[0] * 1000,
+        "median_ms": statistics.median(timings) * 1000,
+        "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000,
+        "max_ms": timings[-1] * 1000,
+    }
+
+
+def template_cases():
+    for size in SIZES:
+        points = key_points(size)
+        content = template_service.format_template_content("Business Plan", points)
+        yield f"format_template_content[{size}]", lambda p=points: template_service.format_template_content("Business Plan", p)
+        yield f"create_template[{size}]", lambda p=points: template_service.create_template("business_plan", p)
+        for format_type, (_, _, export) in template_service.EXPORT_FORMATS.items():
+            yield f"export.{format_type}[{size}]", lambda c=content, e=export: e(c)
+
+        document = layout_engine.compile_layout("saas", "business_plan").arrange(points)
+        yield f"create_template.saas[{size}]", lambda p=points: template_service.create_template("business_plan", p, "saas")
+        for format_type, export in layout_engine.STRUCTURED_EXPORTERS.items():
+            yield f"export.saas.{format_type}[{size}]", lambda d=document, e=export: e(d)
+
+
+def extraction_cases():
+    from app.routes import integration
+
+    stub = mock.patch.object(
+        get_nlp_processor(), "extract_key_points_chunked",
+        side_effect=lambda text: "1. First point\n2. Second point\n3. Third point",
+    )
+    stub.start()
+
+    app = Flask(__name__)
+    configure_app(app)
+    app.register_blueprint(integration.bp)
+    client = app.test_client()
+
+    def upload(filename, data):
+        response = client.post(
+            "/integration/upload",
+            data={"file": (io.BytesIO(data), filename)},
+            content_type="multipart/form-data",
+        )
+        assert response.status_code == 200, response.get_json()
+
+    for pages in PAGE_COUNTS:
+        text = transcript_text(pages)
+        pdf, docx = synthetic_pdf(pages), synthetic_docx(pages)
+        yield f"clean_and_extract_key_points[{pages}p]", lambda t=text: integration.clean_and_extract_key_points(t)
+        yield f"upload_transcript.pdf[{pages}p]", lambda d=pdf: upload("transcript.pdf", d)
+        yield f"upload_transcript.docx[{pages}p]", lambda d=docx: upload("transcript.docx", d)
+        yield f"upload_transcript.txt[{pages}p]", lambda t=text: upload("transcript.txt", t.encode())
+
+
+def model_output(count):
+    # Every fifth line repeats an earlier point with different numbering and spacing.
+    lines = []
+    for i in range(count):
+        point = f"Key point {i // 5 if i % 5 == 4 else i}:  {SENTENCE.strip()}"
+        lines.append(f"{i + 1}. {point}" if i % 2 else f"-   {point}")
+    return "\n".join(lines)
+
+
+def normalization_cases():
+    whitespace = re.compile(r"\s+")
+    for pages in PAGE_COUNTS + (500,):
+        text = transcript_text(pages).replace(". ", ".\t \n ")
+        pieces = text.split("\n")
+        yield f"collapse_whitespace[{pages}p]", lambda t=text: collapse_whitespace(t)
+        # The regex pass collapse_whitespace replaced, kept as a reference point.
+        yield f"collapse_whitespace.regex[{pages}p]", lambda t=text: whitespace.sub(" ", t).strip()
+        yield f"iter_collapsed[{pages}p]", lambda p=pieces: "".join(iter_collapsed(p))
+
+    for size in SIZES:
+        output = model_output(size)
+        yield f"compact_points[{size}]", lambda o=output: compact_points(o)
+
+
+SUITES = {"templates": template_cases, "extraction": extraction_cases, "normalization": normalization_cases}
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(suites, repeat, selected=None):
+    results = {}
+    for suite in suites:
+        for name, fn in SUITES[suite]():
+            if selected and selected not in name:
+                continue
+            results[name] = measure(fn, repeat)
+            print(f"{name:<45} median {results[name]['median_ms']:9.3f} ms", file=sys.stderr)
+    return {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "pdf_backend": os.getenv("PDF_BACKEND", "wkhtmltopdf"),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "results": results,
+    }
+
+
+def compare(baseline, current, threshold, min_delta_ms=0.05):
+    """Returns the cases whose median slowed down by more than threshold (0.2 = 20%).
+
+    Differences under min_delta_ms are ignored; microsecond cases are mostly noise.
+    """
+    regressions = []
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if not before or not before["median_ms"]:
+            continue
+        change = result["median_ms"] / before["median_ms"] - 1
+        if change > threshold and result["median_ms"] - before["median_ms"] >= min_delta_ms:
+            regressions.append({"name": name, "before_ms": before["median_ms"],
+                                "after_ms": result["median_ms"], "change": change})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--suite", choices=sorted(SUITES), action="append", help="Suite to run (default: all)")
+    parser.add_argument("-k", dest="selected", help="Only run cases whose name contains this string")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--output", help="Write results to this JSON file instead of stdout")
+    parser.add_argument("--compare", help="Baseline JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed median slowdown before failing")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05, help="Ignore slowdowns smaller than this")
+    args = parser.parse_args(argv)
+
+    report = run(args.suite or sorted(SUITES), args.repeat, args.selected)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), report, args.threshold, args.min_delta_ms)
+        for regression in regressions:
+            print(f"REGRESSION {regression['name']}: {regression['before_ms']:.3f} ms -> "
+                  f"{regression['after_ms']:.3f} ms (+{regression['change']:.0%})", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
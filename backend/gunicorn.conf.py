@@ -0,0 +1,32 @@
+"""gunicorn settings, taken from the same environment variables as configure_app.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+import sys
+from app.utils.config import server_settings
+
+_settings = server_settings()
+
+bind = _settings["SERVER_BIND"]
+workers = _settings["SERVER_WORKERS"]
+worker_class = _settings["SERVER_WORKER_CLASS"]
+threads = _settings["SERVER_THREADS"]
+timeout = _settings["SERVER_TIMEOUT"]
+graceful_timeout = _settings["SERVER_GRACEFUL_TIMEOUT"]
+keepalive = _settings["SERVER_KEEPALIVE"]
+# With preload the app (and its lazily created pools) is built once in the master.
+# Process pools and SDK clients are only created on first use, so nothing is
+# shared across the fork.
+preload_app = _settings["SERVER_PRELOAD"]
+max_requests = _settings["SERVER_MAX_REQUESTS"]
+max_requests_jitter = _settings["SERVER_MAX_REQUESTS_JITTER"]
+accesslog = "-"
+errorlog = "-"
+
+
+def worker_exit(server, worker):
+    """Drains async jobs and stops pools before the worker process exits."""
+    module = sys.modules.get("wsgi")
+    if module is not None:
+        from app import shutdown_app
+        shutdown_app(module.app)
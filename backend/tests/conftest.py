@@ -0,0 +1,7 @@
+import os
+import tempfile
+
+# Keep the section vector cache out of the working tree.
+os.environ.setdefault("SECTION_VECTORS_PATH", os.path.join(tempfile.mkdtemp(), "section_vectors.npz"))
+# Routes use the local extractive backend, so no test depends on the OpenAI API.
+os.environ.setdefault("NLP_BACKEND", "extractive")
@@ -0,0 +1,315 @@
+import time
+import threading
+import openai
+import pytest
+from app.services.cache import LRUCache, TieredCache
+from app.services.rate_limiter import OpenAIRateLimiter, RateLimitTimeout, TokenBucket
+from app.services.nlp_processor import (
+    ExtractiveBackend, HybridBackend, NLPProcessor, PromptTooLargeError, clean_key_points, iter_chunks,
+    estimate_tokens, merge_key_points,
+)
+from app.services.text_normalizer import PointIndex, collapse_whitespace, compact_points
+from app.services.token_budget import TokenCounter, UsageTracker, usage_route
+
+
+def fake_completion(calls, content="1. First point\n2. Second point"):
+    def create(**kwargs):
+        calls.append(kwargs)
+        return {"choices": [{"message": {"content": content}}]}
+    return create
+
+
+def test_extract_key_points_is_cached_on_normalized_text(monkeypatch):
+    calls = []
+    monkeypatch.setattr(openai.ChatCompletion, "create", fake_completion(calls))
+    processor = NLPProcessor(api_key="test", cache=TieredCache(LRUCache(max_entries=8)))
+
+    first = processor.extract_key_points("We  agreed on\nthe roadmap.")
+    second = processor.extract_key_points("We agreed on the roadmap.  ")
+
+    assert first == second == "1. First point\n2. Second point"
+    assert len(calls) == 1
+    assert processor.cache_stats()["hits"] == 1
+
+
+def test_errors_are_not_cached(monkeypatch):
+    def failing_create(**kwargs):
+        raise openai.error.RateLimitError("slow down")
+    monkeypatch.setattr(openai.ChatCompletion, "create", failing_create)
+    processor = NLPProcessor(api_key="test", cache=TieredCache(LRUCache(max_entries=8)), max_retries=0)
+
+    assert "error" in processor.extract_key_points("text")
+    assert processor.cache_stats()["memory"]["entries"] == 0
+
+
+def test_iter_chunks_respects_budget_and_overlap():
+    text = " ".join(f"word{i:03d}" for i in range(300))
+    chunks = list(iter_chunks(text, chunk_tokens=60, overlap_tokens=10))
+
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 70 for chunk in chunks)
+    assert chunks[0].split()[-1] in chunks[1].split()
+    assert chunks[-1].split()[-1] == "word299"
+
+
+def test_chunked_extraction_merges_and_deduplicates(monkeypatch):
+    calls = []
+    monkeypatch.setattr(openai.ChatCompletion, "create", fake_completion(calls, "1. Shared point\n2. Shared  point"))
+    processor = NLPProcessor(api_key="test", cache=TieredCache(LRUCache()), chunk_tokens=50, chunk_overlap=5)
+
+    result = processor.extract_key_points_chunked("alpha beta gamma delta " * 50)
+
+    assert len(calls) > 1
+    assert result == "1. Shared point"
+
+
+def test_stream_key_points_yields_lines_as_they_complete(monkeypatch):
+    deltas = ["1. Hire ", "a CTO\n2.", " Launch  beta\n", "3. Raise seed"]
+
+    def create(**kwargs):
+        assert kwargs["stream"] is True
+        return iter({"choices": [{"delta": {"content": delta}}]} for delta in deltas)
+    monkeypatch.setattr(openai.ChatCompletion, "create", create)
+    cache = TieredCache(LRUCache())
+    limiter = OpenAIRateLimiter(tokens_per_minute=10000)
+    processor = NLPProcessor(api_key="test", cache=cache, limiter=limiter)
+
+    stream = processor.stream_key_points("Our plan for the quarter.")
+    assert next(stream) == "Hire a CTO"
+    assert list(stream) == ["Launch beta", "Raise seed"]
+    # The reservation is settled to the prompt plus the counted completion.
+    prompt_tokens = processor.plan("Our plan for the quarter.").prompt_tokens
+    used = prompt_tokens + processor.counter.count("1. Hire a CTO\n2. Launch beta\n3. Raise seed")
+    assert 10000 - used <= limiter.tokens.level() < 10000 - used + 1
+    assert clean_key_points(processor.extract_key_points("Our plan for the quarter.")) == [
+        "Hire a CTO", "Launch beta", "Raise seed"
+    ]
+
+
+def test_abandoned_stream_is_settled_and_recorded_but_not_cached(monkeypatch):
+    deltas = ["1. Hire a CTO\n", "2. Launch beta\n", "3. Raise seed"]
+    monkeypatch.setattr(openai.ChatCompletion, "create", lambda **kwargs: iter(
+        {"choices": [{"delta": {"content": delta}}]} for delta in deltas
+    ))
+    limiter = OpenAIRateLimiter(tokens_per_minute=10000)
+    usage = UsageTracker()
+    cache = TieredCache(LRUCache())
+    processor = NLPProcessor(api_key="test", cache=cache, limiter=limiter, usage=usage)
+
+    stream = processor.stream_key_points("Our plan for the quarter.")
+    assert next(stream) == "Hire a CTO"
+    stream.close()  # The client went away.
+
+    call = usage.stats()["recent"][-1]
+    assert call["error"] == "GeneratorExit"
+    used = call["prompt_tokens"] + call["completion_tokens"]
+    assert 10000 - used <= limiter.tokens.level() < 10000 - used + 1
+    assert cache.get(processor.cache_key("Our plan for the quarter.")) is None
+
+
+def test_rate_limit_errors_are_retried_with_backoff(monkeypatch):
+    attempts = []
+
+    def flaky_create(**kwargs):
+        attempts.append(kwargs)
+        if len(attempts) < 3:
+            raise openai.error.RateLimitError("slow down", headers={"retry-after": "0.01"})
+        return {"choices": [{"message": {"content": "1. Point"}}], "usage": {"total_tokens": 42}}
+    monkeypatch.setattr(openai.ChatCompletion, "create", flaky_create)
+    limiter = OpenAIRateLimiter(tokens_per_minute=10000)
+    processor = NLPProcessor(api_key="test", cache=None, max_retries=3, retry_backoff=0.01, limiter=limiter)
+
+    assert processor.extract_key_points("retry me") == "1. Point"
+    assert len(attempts) == 3
+    # Only the successful attempt is charged, at its reported 42 tokens.
+    assert 10000 - 42 <= limiter.tokens.level() < 10000 - 41
+
+
+def test_concurrent_identical_extractions_share_one_call(monkeypatch):
+    calls = []
+    release = threading.Event()
+
+    def slow_create(**kwargs):
+        calls.append(kwargs)
+        release.wait(5)
+        return {"choices": [{"message": {"content": "1. Shared"}}]}
+    monkeypatch.setattr(openai.ChatCompletion, "create", slow_create)
+    processor = NLPProcessor(api_key="test", cache=None)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(processor.extract_key_points("same text")))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    while not calls:
+        time.sleep(0.01)
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["1. Shared"] * 5
+    assert len(calls) == 1
+
+
+def test_token_bucket_limits_and_times_out():
+    bucket = TokenBucket(rate=100, capacity=2)
+    assert bucket.try_acquire() and bucket.try_acquire()
+    assert not bucket.try_acquire()
+    assert bucket.acquire(1, timeout=1) > 0
+
+    limiter = OpenAIRateLimiter(requests_per_minute=1, timeout=0.01)
+    limiter.acquire(10)
+    try:
+        limiter.acquire(10)
+    except RateLimitTimeout:
+        pass
+    else:
+        raise AssertionError("second request should exceed the one-per-minute budget")
+
+
+def test_compact_points_strips_markers_and_near_duplicates():
+    output = "1. Hire a  CTO\n- hire the CTO.\n2) Grow revenue 20% in Europe\n* Grow revenue 25% in Europe\n\n-5% churn"
+    assert compact_points(output) == [
+        "Hire a CTO", "Grow revenue 20% in Europe", "Grow revenue 25% in Europe", "-5% churn",
+    ]
+    assert collapse_whitespace("  a\t\n b  ") == "a b"
+
+
+def test_decimal_leading_points_keep_their_numbers():
+    output = "2.5 million users signed up\n1. 2.6 million users signed up\n3) 1.5x faster builds"
+    assert compact_points(output) == ["2.5 million users signed up", "2.6 million users signed up", "1.5x faster builds"]
+
+
+def test_point_index_dedupes_across_chunks():
+    index = PointIndex(threshold=0.75)
+    assert index.add("Launch the beta in the US and Canada by March")
+    assert not index.add("Launch beta in US, Canada by March")
+    assert not index.add("launch the beta in the us and canada by march please")
+    assert index.add("Hire two engineers")
+    assert len(index) == 2
+    assert merge_key_points(["1. Ship v2\n2. Raise seed", "1. ship V2.\n2. Hire a CTO"]) == (
+        "1. Ship v2\n2. Raise seed\n3. Hire a CTO"
+    )
+
+
+MEETING = (
+    "Welcome everyone. Today we discuss the product launch plan for Q3. "
+    "The marketing team will prepare a campaign targeting small businesses in Europe. Sounds good. "
+    "Engineering needs two more backend engineers to finish the billing integration before launch. "
+    "Lunch was great. The product launch plan depends on the billing integration."
+)
+
+
+def test_extractive_backend_picks_central_sentences():
+    backend = ExtractiveBackend(max_points=2)
+    assert clean_key_points(backend.extract_key_points_chunked(MEETING)) == [
+        "Today we discuss the product launch plan for Q3.",
+        "The product launch plan depends on the billing integration.",
+    ]
+    assert list(backend.stream_key_points("ok thanks")) == []
+
+
+class FakeRemote:
+    def __init__(self, result="1. From the model"):
+        self.result = result
+        self.calls = 0
+
+    def extract_key_points_chunked(self, text):
+        self.calls += 1
+        return self.result
+
+    def extract_key_points(self, text, route=None):
+        self.route = route
+        return self.extract_key_points_chunked(text)
+
+    def stream_key_points(self, text):
+        self.calls += 1
+        if isinstance(self.result, Exception):
+            raise self.result
+        yield from clean_key_points(self.result)
+
+
+def test_hybrid_backend_escalates_long_and_ambiguous_input():
+    remote = FakeRemote()
+    hybrid = HybridBackend(ExtractiveBackend(max_points=2), remote, max_local_tokens=200, min_confidence=0.1)
+
+    assert "product launch plan" in hybrid.extract_key_points_chunked(MEETING)
+    assert hybrid.extract_key_points_chunked("so yeah we talked about stuff and things and more stuff") == "1. From the model"
+    assert hybrid.extract_key_points_chunked(MEETING * 5) == "1. From the model"
+    assert hybrid.counts == {"local": 1, "escalated_long": 1, "escalated_ambiguous": 1, "fallback": 0}
+
+    remote.result = {"error": "rate limited"}
+    hybrid.min_confidence = 1.0
+    assert "product launch plan" in hybrid.extract_key_points_chunked(MEETING)
+    assert hybrid.counts["fallback"] == 1
+
+
+def test_backends_share_a_signature_and_hybrid_streams_fall_back_locally():
+    remote = FakeRemote()
+    local = ExtractiveBackend(max_points=2)
+    hybrid = HybridBackend(local, remote, max_local_tokens=200, min_confidence=1.0)
+
+    assert local.extract_key_points(MEETING, "nlp.process_text") == local.extract_key_points(MEETING)
+    assert hybrid.extract_key_points(MEETING, "nlp.process_text") == "1. From the model"
+    assert remote.route == "nlp.process_text"
+    assert list(hybrid.stream_key_points(MEETING)) == ["From the model"]
+
+    remote.result = openai.error.RateLimitError("slow down")
+    streamed = list(hybrid.stream_key_points(MEETING))
+    assert any("product launch plan" in point for point in streamed)
+    assert hybrid.counts["fallback"] == 1
+
+    # Nothing local to fall back to: the error reaches the caller.
+    with pytest.raises(openai.error.RateLimitError):
+        list(hybrid.stream_key_points(MEETING * 5))
+
+
+def test_token_counter_shortens_keeping_head_and_tail():
+    counter = TokenCounter("no-such-model")
+    text = "Kickoff notes. " + "We reviewed the roadmap in detail. " * 200 + "Action: ship beta Friday."
+    shortened = counter.shorten(text, 100)
+    assert counter.count(shortened) <= 100
+    assert shortened.startswith("Kickoff notes.") and shortened.endswith("ship beta Friday.")
+    assert counter.shorten("short text", 100) == "short text"
+
+
+def test_prompt_is_budgeted_and_usage_recorded_per_route(monkeypatch):
+    calls = []
+
+    def create(**kwargs):
+        calls.append(kwargs)
+        return {"choices": [{"message": {"content": "1. Ship beta"}}],
+                "usage": {"prompt_tokens": 120, "completion_tokens": 5, "total_tokens": 125}}
+    monkeypatch.setattr(openai.ChatCompletion, "create", create)
+    usage = UsageTracker()
+    processor = NLPProcessor(api_key="test", cache=None, context_tokens=400, min_completion_tokens=50,
+                             completion_ratio=0.1, usage=usage)
+
+    with usage_route("nlp.process_text"):
+        processor.extract_key_points("Ship the beta on Friday.")
+        processor.extract_key_points("We reviewed the roadmap in detail. " * 100)
+
+    short_call, long_call = calls
+    assert 50 < short_call["max_tokens"] < 60
+    prompt = long_call["messages"][1]["content"]
+    assert " … " in prompt
+    assert processor.counter.count_messages(long_call["messages"]) + long_call["max_tokens"] <= 400
+
+    stats = usage.stats()
+    assert stats["routes"]["nlp.process_text"]["requests"] == 2
+    assert stats["routes"]["nlp.process_text"]["prompt_tokens"] == 240
+    assert stats["routes"]["nlp.process_text"]["trimmed"] == 1
+    assert [call["trimmed"] for call in stats["recent"]] == [False, True]
+
+
+def test_prompt_that_cannot_fit_is_an_error_not_an_empty_request(monkeypatch):
+    calls = []
+    monkeypatch.setattr(openai.ChatCompletion, "create", fake_completion(calls))
+    processor = NLPProcessor(api_key="test", cache=None, context_tokens=40, min_completion_tokens=30)
+
+    result = processor.extract_key_points("We reviewed the roadmap in detail. " * 20)
+    assert "context window" in result["error"]
+    with pytest.raises(PromptTooLargeError):
+        list(processor.stream_key_points("We reviewed the roadmap in detail. " * 20))
+    assert calls == []
@@ -0,0 +1,413 @@
+import time
+import threading
+import pytest
+from flask import Flask
+from app.routes import integration, jobs, nlp, settings, template_generator, test
+from app.services.document_cache import DocumentCache
+from app.services.jobs import JobQueue
+from app.services.nlp_processor import get_nlp_processor
+from app.services.publisher import PublishOutbox, PublishService
+from app.utils.config import configure_app
+from app.utils.instrumentation import init_instrumentation
+from app.utils.admission import init_admission
+
+
+class FakeSnapshot:
+    def __init__(self, data):
+        self._data = data
+        self.exists = data is not None
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class FakeDocument:
+    def __init__(self, store, key):
+        self.store = store
+        self.key = key
+
+    def get(self):
+        self.store.reads += 1
+        return FakeSnapshot(self.store.docs.get(self.key))
+
+    def set(self, data):
+        self.store.docs[self.key] = dict(data)
+
+    def update(self, data):
+        if self.key not in self.store.docs:
+            raise Exception("404 No document to update")
+        self.store.docs[self.key].update(data)
+
+    def delete(self):
+        self.store.docs.pop(self.key, None)
+
+
+class FakeBatch:
+    def __init__(self, store):
+        self.store = store
+        self.writes = []
+
+    def set(self, doc_ref, data):
+        self.writes.append((doc_ref.set, data))
+
+    def update(self, doc_ref, data):
+        if doc_ref.key not in self.store.docs:
+            self.writes.append((None, "404 No document to update"))
+        else:
+            self.writes.append((doc_ref.update, data))
+
+    def commit(self):
+        self.store.commits += 1
+        errors = [data for write, data in self.writes if write is None]
+        if errors:
+            raise Exception(errors[0])
+        for write, data in self.writes:
+            write(data)
+
+
+class FakeCollection:
+    def __init__(self, store, name):
+        self.store = store
+        self.name = name
+
+    def document(self, doc_id):
+        return FakeDocument(self.store, (self.name, doc_id))
+
+
+class FakeFirestore:
+    """In-memory stand-in for the handful of Firestore calls the routes make."""
+
+    def __init__(self):
+        self.docs = {}
+        self.reads = 0
+        self.commits = 0
+
+    def collection(self, name):
+        return FakeCollection(self, name)
+
+    def batch(self):
+        return FakeBatch(self)
+
+
+class FakeDocsPublisher:
+    def __init__(self):
+        self.published = []
+
+    def publish(self, title, content, progress=None, checkpoint=None):
+        self.published.append((title, content))
+        return f"https://docs.google.com/document/d/doc{len(self.published)}"
+
+
+class FakeClients:
+    def __init__(self):
+        self.firestore = FakeFirestore()
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    configure_app(app)
+    app.config["TESTING"] = True
+    app.extensions["job_queue"] = JobQueue(max_workers=2, max_depth=2)
+    app.extensions["clients"] = FakeClients()
+    app.extensions["document_cache"] = DocumentCache(
+        lambda: app.extensions["clients"].firestore, collection_ttls=app.config["DOC_CACHE_TTLS"]
+    )
+    app.extensions["publisher"] = PublishService(
+        PublishOutbox(str(tmp_path / "outbox.db")), {"google_docs": FakeDocsPublisher()}, workers=1, poll_interval=0.05
+    )
+    init_instrumentation(app)
+    app.register_blueprint(template_generator.bp)
+    app.register_blueprint(integration.bp)
+    app.register_blueprint(nlp.bp)
+    app.register_blueprint(settings.settings_bp)
+    app.register_blueprint(test.user_bp)
+    app.register_blueprint(jobs.bp)
+    yield app
+    app.extensions["job_queue"].shutdown()
+    app.extensions["publisher"].shutdown()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def wait_for_job(client, status_url):
+    for _ in range(100):
+        payload = client.get(status_url).get_json()
+        if payload["status"] in ("succeeded", "failed"):
+            return payload
+        time.sleep(0.05)
+    raise AssertionError("job did not finish")
+
+
+def test_generate_async_returns_job_and_artifact(client):
+    response = client.post("/templates/generate?async=1", json={
+        "template_type": "pitch_deck",
+        "key_points": ["Raise a seed round"],
+        "format": "pptx",
+    })
+    assert response.status_code == 202
+
+    payload = wait_for_job(client, response.get_json()["status_url"])
+    assert payload["status"] == "succeeded"
+    assert "total_ms" in payload["timings"]
+
+    artifact = client.get(payload["artifact_url"])
+    assert artifact.status_code == 200
+    assert artifact.data.startswith(b"PK")
+
+
+def test_job_queue_rejects_overflow(app, client):
+    app.extensions["job_queue"] = JobQueue(max_workers=1, max_depth=0)
+    response = client.post("/templates/generate?async=1", json={
+        "template_type": "pitch_deck",
+        "key_points": ["Raise a seed round"],
+        "format": "pptx",
+    })
+    assert response.status_code == 429
+    assert response.headers["Retry-After"]
+
+
+def test_generate_serves_cached_document_with_etag(client):
+    payload = {"template_type": "business_plan", "key_points": ["Cache me"], "format": "word"}
+    first = client.post("/templates/generate", json=payload)
+    etag = first.headers["ETag"]
+
+    second = client.post("/templates/generate", json=payload)
+    assert second.data == first.data
+    assert client.get("/templates/cache/stats").get_json()["hits"] >= 1
+
+    revalidated = client.post("/templates/generate", json=payload, headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.data == b""
+
+
+def test_generate_batch_streams_zip(client):
+    import io
+    import json
+    import zipfile
+
+    response = client.post("/templates/generate_batch", json={
+        "key_points": ["Expand to Europe"],
+        "specs": [
+            {"template_type": "business_plan", "format": "word"},
+            {"template_type": "pitch_deck", "format": "pptx", "industry": "saas"},
+            {"template_type": "business_plan", "format": "word"},
+        ],
+    })
+    assert response.status_code == 200
+    assert response.mimetype == "application/zip"
+
+    archive = zipfile.ZipFile(io.BytesIO(response.data))
+    names = set(archive.namelist())
+    assert {"business_plan.docx", "business_plan_2.docx", "saas_pitch_deck.pptx", "manifest.json"} == names
+    assert len(json.loads(archive.read("manifest.json"))["entries"]) == 3
+
+
+def test_read_document_is_cached_until_settings_update(app, client):
+    firestore = app.extensions["clients"].firestore
+    firestore.docs[("settings", "theme")] = {"color": "blue"}
+
+    assert client.get("/integration/read/settings/theme").get_json() == {"color": "blue"}
+    assert client.get("/integration/read/settings/theme").get_json() == {"color": "blue"}
+    assert firestore.reads == 1
+
+    client.post("/settings/update", json={"setting_id": "theme", "settings_data": {"color": "red"}})
+    assert client.get("/integration/read/settings/theme").get_json() == {"color": "red"}
+    assert firestore.reads == 2
+
+    client.delete("/settings/delete/settings/theme")
+    assert client.get("/integration/read/settings/theme").status_code == 404
+    assert client.get("/integration/cache/stats").get_json()["hits"] == 1
+
+
+def test_bulk_create_users_chunks_batches(app, client):
+    users = [{"user_id": f"user-{i}", "user_data": {"n": i}} for i in range(1203)]
+    response = client.post("/user/bulk_create", json={"users": users})
+
+    assert response.status_code == 201
+    report = response.get_json()
+    assert report["committed"] == 1203
+    assert report["batches"] == 3
+    assert app.extensions["clients"].firestore.commits == 3
+
+
+def test_bulk_update_settings_reports_failures_per_document(app, client):
+    firestore = app.extensions["clients"].firestore
+    firestore.docs[("settings", "a")] = {"v": 0}
+    response = client.post("/settings/bulk_update", json={"settings": [
+        {"setting_id": "a", "settings_data": {"v": 1}},
+        {"setting_id": "missing", "settings_data": {"v": 1}},
+        {"setting_id": "b"},
+        1,
+        "x",
+        {"setting_id": 7, "settings_data": {"v": 1}},
+    ]})
+
+    assert response.status_code == 200
+    report = response.get_json()
+    assert [result["status"] for result in report["results"]] == ["ok", "error", "error", "error", "error", "error"]
+    assert report["results"][3]["id"] is None
+    assert report["committed"] == 1 and report["failed"] == 5
+    assert firestore.docs[("settings", "a")] == {"v": 1}
+
+
+def test_process_text_streams_server_sent_events(client, monkeypatch):
+    monkeypatch.setattr(get_nlp_processor(), "stream_key_points", lambda text: iter(["First", "Second"]))
+    response = client.post("/nlp/process", json={"text": "Meeting notes", "stream": True})
+
+    assert response.mimetype == "text/event-stream"
+    events = response.get_data(as_text=True).strip().split("\n\n")
+    assert events[0] == 'event: point\ndata: {"index": 0, "point": "First"}'
+    assert events[-1] == 'event: done\ndata: {"key_points": ["First", "Second"]}'
+
+
+def test_responses_carry_server_timing_and_metrics(client):
+    response = client.post("/templates/generate", json={
+        "template_type": "business_plan", "key_points": ["Time me"], "format": "word",
+    })
+    assert "export.word;dur=" in response.headers["Server-Timing"]
+    assert "total;dur=" in response.headers["Server-Timing"]
+
+    metrics = client.get("/metrics").data.decode()
+    assert 'app_stage_duration_seconds_count{stage="export.word"}' in metrics
+    assert 'http_requests_total{method="POST",endpoint="template_generator.generate",status="200"}' in metrics
+    assert client.get("/debug/profile").status_code == 404
+
+
+def test_profile_rejects_bad_parameters(app, client):
+    app.config["PROFILER_ENABLED"] = True
+    for query in ("seconds=abc", "seconds=nan", "seconds=-1", "interval=x", "limit=1.5"):
+        assert client.get(f"/debug/profile?{query}").status_code == 400, query
+    response = client.get("/debug/profile?seconds=0.05&limit=3")
+    assert response.status_code == 200
+    assert "X-Profile-Samples" in response.headers
+
+
+def test_missing_slack_token_only_disables_slack(client, monkeypatch):
+    monkeypatch.delenv("YOUR_SLACK_BOT_TOKEN", raising=False)
+    response = client.post("/integration/slack", json={"channel_id": "C1"})
+    assert response.status_code == 503
+    assert "YOUR_SLACK_BOT_TOKEN" in response.get_json()["error"]
+
+    assert client.get("/integration/cache/stats").status_code == 200
+
+
+def test_fan_out_runs_as_async_view(client, monkeypatch):
+    from app.services import async_messaging
+
+    async def fake_fetch_many(self, name, ids):
+        return [{"id": conversation_id, "result": f"{name}:{conversation_id}"} for conversation_id in ids]
+
+    monkeypatch.setattr(async_messaging.AsyncMessaging, "fetch_many", fake_fetch_many)
+    response = client.post("/integration/fan_out", json={"provider": "teams", "ids": ["a", "b"]})
+    assert response.status_code == 200
+    assert response.get_json()["succeeded"] == 2
+
+    for ids in ("ab", ["a", ""], ["a", 1], {"a": 1}, []):
+        response = client.post("/integration/fan_out", json={"provider": "teams", "ids": ids})
+        assert response.status_code == 400, ids
+
+
+def test_save_to_google_docs_publishes_in_background(app, client):
+    response = client.post("/templates/save_to_google_docs", json={
+        "template_type": "business_plan", "key_points": ["Expand to Europe"],
+    })
+    assert response.status_code == 202
+    payload = response.get_json()
+    assert payload["status_url"] == f"/templates/publish/{payload['publish_id']}"
+
+    status = wait_for_job(client, payload["status_url"])
+    assert status["status"] == "succeeded"
+    assert status["url"] == "https://docs.google.com/document/d/doc1"
+    title, content = app.extensions["publisher"].publishers["google_docs"].published[0]
+    assert title == "business_plan Template" and "Expand to Europe" in content
+
+    assert client.get("/templates/publish/missing").status_code == 404
+
+
+def test_process_text_runs_offline_with_extractive_backend(client):
+    text = (
+        "We will launch the mobile app in March. The launch needs a marketing budget of forty thousand dollars. "
+        "Support hours will expand to weekends before the launch. Thanks everyone."
+    )
+    response = client.post("/nlp/process", json={"text": text})
+    assert response.status_code == 200
+    assert response.get_json()["key_points"].startswith("1. ")
+    assert client.get("/nlp/limits/stats").get_json() == {"backend": "extractive"}
+    assert client.get("/nlp/usage").get_json()["backend"] == "extractive"
+
+
+def test_admission_limits_each_tenant_separately(app, monkeypatch):
+    app.config.update(ADMISSION_ENABLED=True, ADMISSION_STATS_TENANTS=True, ADMISSION_BURSTS={
+        "high": 100, "normal": 2, "low": 1,
+    }, ADMISSION_RATES={"high": 1, "normal": 0.01, "low": 0.01})
+    init_admission(app)
+    client = app.test_client()
+    monkeypatch.setattr(get_nlp_processor(), "extract_key_points_chunked", lambda text: "1. Point")
+
+    def process(tenant):
+        return client.post("/nlp/process", json={"text": "Hello"}, headers={"X-Tenant-ID": tenant})
+
+    assert process("acme").status_code == 200
+    rejected = process("acme")
+    assert rejected.status_code == 429
+    assert int(rejected.headers["Retry-After"]) > 60
+    assert process("globex").status_code == 200
+    assert client.get("/nlp/cache/stats").status_code == 200  # Not admission controlled.
+    assert client.get("/admission/stats").get_json()["active"] == 0
+
+    # Reads in a charged blueprint are free: polling never uses up the quota.
+    for _ in range(5):
+        assert client.get("/templates/publish/missing", headers={"X-Tenant-ID": "acme"}).status_code == 404
+        assert client.get("/templates/cache/stats", headers={"X-Tenant-ID": "acme"}).status_code == 200
+    assert process("initech").status_code == 200
+    assert client.get("/templates/pdf/stats", headers={"X-Tenant-ID": "initech"}).status_code == 200
+    assert client.get("/admission/stats").get_json()["tenants"]["initech"] < 1
+
+
+def test_tenant_header_is_only_trusted_from_proxies(app, monkeypatch):
+    app.config.update(ADMISSION_ENABLED=True, ADMISSION_STATS_TENANTS=True, TENANT_TRUSTED_PROXIES="10.0.0.0/8")
+    init_admission(app)
+    client = app.test_client()
+    monkeypatch.setattr(get_nlp_processor(), "extract_key_points_chunked", lambda text: "1. Point")
+
+    def process(remote_addr, tenant):
+        return client.post("/nlp/process", json={"text": "Hello"}, headers={"X-Tenant-ID": tenant},
+                           environ_base={"REMOTE_ADDR": remote_addr})
+
+    for i in range(3):
+        assert process("203.0.113.7", f"made-up-{i}").status_code == 200
+        assert process("10.1.2.3", f"tenant-{i}").status_code == 200
+    tenants = client.get("/admission/stats").get_json()["tenants"]
+    assert sorted(tenants) == ["ip:203.0.113.7", "tenant-0", "tenant-1", "tenant-2"]
+
+
+def test_admission_slot_is_held_by_streamed_bodies_and_async_jobs(app, monkeypatch):
+    init_admission(app)
+    assert "admission" not in app.extensions  # Off unless ADMISSION_ENABLED is set.
+    app.config["ADMISSION_ENABLED"] = True
+    init_admission(app)
+    client = app.test_client()
+    stats = lambda: client.get("/admission/stats").get_json()
+
+    response = client.post("/templates/generate_batch", buffered=False, json={
+        "key_points": ["Expand to Europe"], "specs": [{"template_type": "business_plan", "format": "word"}],
+    })
+    assert response.status_code == 200 and stats()["active"] == 1
+    assert "tenants" not in stats() and stats()["tenant_count"] == 1
+    response.get_data()
+    response.close()
+    assert stats()["active"] == 0
+
+    release = threading.Event()
+    monkeypatch.setattr(template_generator, "render_document_job", lambda *args: release.wait(5))
+    response = client.post("/templates/generate?async=1", json={
+        "template_type": "business_plan", "key_points": ["Expand to Europe"], "format": "word",
+    })
+    assert response.status_code == 202 and stats()["active"] == 1
+    release.set()
+    wait_for_job(client, response.get_json()["status_url"])
+    assert stats()["active"] == 0
@@ -0,0 +1,497 @@
+import io
+import time
+import asyncio
+import threading
+import pytest
+from pypdf import PdfReader
+from app.services import clients, transcript_extractor
+from app.services.async_messaging import fan_out
+from app.services.cache import LRUCache, DiskCache, TieredCache, make_key
+from app.services.firestore_bulk import bulk_write
+from app.services.jobs import JobQueue
+from app.services.pdf_renderer import PdfRenderer, SimplePdfBackend
+from app.services.quotas import AdmissionRejected, QuotaStore, TenantQuotas, WeightedFairQueue
+from app.services.publisher import GoogleDocsPublisher, NotionPublisher, PublishOutbox, PublishService
+from app.services.slack_ingest import ChannelStateStore, SlackIngestor
+from app.services.transcript_extractor import TranscriptTooLargeError, normalize_whitespace, read_transcript
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_lru_cache_expires_entries():
+    cache = LRUCache(ttl=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+
+
+def test_disk_tier_survives_memory_loss(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    key = make_key("text", "gpt-4")
+    TieredCache(LRUCache(), DiskCache(path)).set(key, "1. Point")
+
+    cache = TieredCache(LRUCache(), DiskCache(path))
+    assert cache.get(key) == "1. Point"
+    assert cache.memory.get(key) == "1. Point"
+
+
+def test_lru_cache_evicts_by_total_bytes():
+    cache = LRUCache(max_bytes=10)
+    cache.set("a", b"12345")
+    cache.set("b", b"123456")
+
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 6
+    cache.set("huge", b"x" * 11)
+    assert cache.get("huge") is None
+
+
+def test_simple_pdf_backend_renders_readable_pages():
+    lines = "\n".join(f"{i}. Point number {i} (with parentheses)" for i in range(80))
+    pdf_bytes = SimplePdfBackend().render([("title", "Business Plan"), ("paragraph", lines)])
+
+    reader = PdfReader(io.BytesIO(pdf_bytes))
+    assert len(reader.pages) > 1
+    assert "Business Plan" in reader.pages[0].extract_text()
+    assert "Point number 79 (with parentheses)" in reader.pages[-1].extract_text()
+
+
+def test_pdf_renderer_falls_back_and_records_latency():
+    class BrokenBackend:
+        name = "broken"
+
+        def render(self, blocks):
+            raise OSError("No wkhtmltopdf executable found")
+
+    renderer = PdfRenderer(BrokenBackend(), SimplePdfBackend())
+    assert renderer.render([("title", "Pitch Deck")]).startswith(b"%PDF-")
+
+    stats = renderer.stats_dict()["backends"]
+    assert stats["broken"]["failures"] == 1
+    assert stats["python"]["count"] == 1
+
+
+def test_normalize_whitespace_spans_pieces():
+    pieces = ["  Hello ", "", "\n", "world\t", "again", "  "]
+    assert "".join(normalize_whitespace(pieces)) == "Hello world again"
+
+
+def test_iter_transcript_enforces_character_limit():
+    assert read_transcript("notes.txt", io.BytesIO(b"caf\xc3\xa9  ok"), 10, 100) == "café ok"
+    with pytest.raises(TranscriptTooLargeError):
+        read_transcript("notes.txt", io.BytesIO(b"word " * 100), 10, 50)
+
+
+def test_pdf_pages_are_extracted_in_parallel(monkeypatch):
+    monkeypatch.setattr(transcript_extractor, "PDF_WORKERS", 2)
+    monkeypatch.setattr(transcript_extractor, "PDF_PARALLEL_MIN_PAGES", 2)
+    body = "\n".join(f"Line {i}" for i in range(200))
+    pdf_bytes = SimplePdfBackend().render([("title", "Transcript"), ("paragraph", body)])
+
+    with transcript_extractor.spool_upload(io.BytesIO(pdf_bytes), "call.pdf") as spooled:
+        text = transcript_extractor.read_transcript("call.pdf", spooled, 100, 10 ** 6)
+
+    assert text.startswith("Transcript Line 0 Line 1")
+    assert text.endswith("Line 199")
+
+
+def test_client_registry_reuses_clients_and_reports_health(monkeypatch):
+    created = []
+    from firebase_admin import firestore
+    monkeypatch.setattr(firestore, "client", lambda: created.append(object()) or created[-1])
+    monkeypatch.delenv("YOUR_NOTION_INTEGRATION_TOKEN", raising=False)
+    registry = clients.ClientRegistry()
+
+    assert registry.firestore is registry.firestore
+    assert len(created) == 1
+    assert registry.http is registry.http
+
+    assert registry.health()["notion"]["status"] == "idle"
+    health = registry.health(deep=True)
+    assert health["notion"]["status"] == "not_configured"
+    assert health["http"]["status"] == "ok"
+    monkeypatch.setenv("YOUR_NOTION_INTEGRATION_TOKEN", "secret")
+    assert registry.health(deep=True) is health
+
+
+def test_bulk_write_reports_bad_document_ids_per_item():
+    from google.auth.credentials import AnonymousCredentials
+    from google.cloud import firestore
+
+    # References come from the real client, which validates paths; only the commit is faked.
+    real = firestore.Client(project="test", credentials=AnonymousCredentials())
+    committed = []
+
+    class Batch:
+        def __init__(self):
+            self.refs = []
+
+        def set(self, doc_ref, data):
+            self.refs.append(doc_ref.path)
+
+        def commit(self):
+            committed.extend(self.refs)
+
+    db = type("Db", (), {"collection": lambda self, name: real.collection(name), "batch": lambda self: Batch()})()
+    writes = [("set", "users", doc_id, {"n": 1}) for doc_id in ("ok", "a/b", ".", "..", "__x__", "fine")]
+    writes.append(("set", "users/nested", "odd", {"n": 1}))
+
+    report = bulk_write(db, writes, "user_id and user_data are required")
+    statuses = [result["status"] for result in report["results"]]
+    assert statuses == ["ok", "error", "error", "error", "error", "ok", "error"]
+    assert "number of path elements" in report["results"][-1]["error"]
+    assert committed == ["users/ok", "users/fine"]
+    assert report["committed"] == 2 and report["failed"] == 5
+
+
+def test_job_queue_bounds_finished_jobs():
+    queue = JobQueue(max_workers=1, max_finished=2)
+    jobs = [queue.submit("render", lambda i=i: b"x" * i) for i in range(4)]
+    queue.shutdown(wait=True)
+
+    assert [queue.get(job.id) for job in jobs[:2]] == [None, None]
+    assert queue.get(jobs[3].id).result == b"xxx"
+
+    queue.retention = 0
+    assert queue.get(jobs[3].id) is None
+
+
+class FakeSlack:
+    def __init__(self, messages, page_size):
+        self.messages = messages  # oldest first, like a channel's history
+        self.page_size = page_size
+        self.calls = []
+
+    def fetch_history_page(self, channel_id, oldest=None, cursor=None, limit=200):
+        self.calls.append((oldest, cursor))
+        newer = [m for m in reversed(self.messages) if oldest is None or float(m["ts"]) > float(oldest)]
+        start = int(cursor or 0)
+        page = newer[start:start + self.page_size]
+        more = start + self.page_size < len(newer)
+        return page, str(start + self.page_size) if more else None
+
+
+def test_slack_ingestion_only_processes_new_messages(tmp_path):
+    slack = FakeSlack([{"ts": f"{i}.0", "text": f"point {i}"} for i in range(1, 6)], page_size=2)
+    extracted = []
+
+    def extract(conversation):
+        extracted.append(conversation)
+        return conversation.split("\n")
+
+    store = ChannelStateStore(str(tmp_path / "slack.sqlite3"))
+    ingestor = SlackIngestor(slack, extract, store, page_size=2, initial_limit=100)
+
+    first = ingestor.ingest("C1")
+    assert first["new_messages"] == 5
+    assert sorted(first["key_points"]) == [f"point {i}" for i in range(1, 6)]
+    assert first["checkpoint"] == "5.0"
+
+    slack.messages.append({"ts": "6.0", "text": "point 6"})
+    extracted.clear()
+    second = SlackIngestor(slack, extract, ChannelStateStore(store.path), page_size=2).ingest("C1")
+    assert extracted == ["point 6"]
+    assert second["new_messages"] == 1
+    assert second["key_points"][-1] == "point 6"
+
+
+def test_concurrent_slack_ingests_of_one_channel_do_not_overlap(tmp_path):
+    slack = FakeSlack([{"ts": f"{i}.0", "text": f"point {i}"} for i in range(1, 5)], page_size=10)
+    extracted = []
+
+    def extract(conversation):
+        extracted.append(conversation)
+        time.sleep(0.1)
+        return conversation.split("\n")
+
+    ingestor = SlackIngestor(slack, extract, ChannelStateStore(str(tmp_path / "slack.sqlite3")), page_size=10)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(ingestor.ingest("C1"))) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(extracted) == 1
+    assert sorted(result["new_messages"] for result in results) == [0, 0, 4]
+    assert ingestor._locks == {}
+
+
+def test_fan_out_limits_concurrency_and_retries_timeouts():
+    in_flight = 0
+    peak = 0
+    attempts = {}
+
+    async def fetch(channel_id):
+        nonlocal in_flight, peak
+        attempts[channel_id] = attempts.get(channel_id, 0) + 1
+        in_flight += 1
+        peak = max(peak, in_flight)
+        try:
+            if channel_id == "slow" and attempts[channel_id] == 1:
+                await asyncio.sleep(1)
+            await asyncio.sleep(0.01)
+            return f"history of {channel_id}"
+        finally:
+            in_flight -= 1
+
+    channel_ids = [f"C{i}" for i in range(10)] + ["slow"]
+    results = asyncio.run(fan_out(channel_ids, fetch, concurrency=3, timeout=0.2, retries=1))
+
+    assert peak <= 3
+    assert [result["id"] for result in results] == channel_ids
+    assert results[-1] == {"id": "slow", "result": "history of slow"}
+    assert attempts["slow"] == 2
+
+
+def test_benchmark_compare_flags_only_real_slowdowns():
+    from benchmarks.run import compare
+
+    baseline = {"results": {"export.pdf[10]": {"median_ms": 10.0}, "format[10]": {"median_ms": 0.003}}}
+    current = {"results": {"export.pdf[10]": {"median_ms": 13.0}, "format[10]": {"median_ms": 0.006},
+                           "new_case": {"median_ms": 1.0}}}
+    regressions = compare(baseline, current, threshold=0.2)
+    assert [regression["name"] for regression in regressions] == ["export.pdf[10]"]
+
+
+def test_industry_layout_places_key_points_under_sections():
+    import io
+    from docx import Document
+    from app.services.layout_engine import compile_layout, render_word
+
+    layout = compile_layout("saas", "business_plan")
+    assert compile_layout("saas", "business_plan") is layout
+    assert compile_layout("saas", "pitch_deck") is None
+
+    document = layout.arrange(["Our pricing strategy uses tiered plans", "Hire two engineers"])
+    growth = next(section for section in document.sections if section["title"] == "Growth Strategy")
+    assert growth["subsections"] == [
+        {"title": "Pricing Strategy", "key_points": ["Our pricing strategy uses tiered plans"]}
+    ]
+    assert document.sections[0]["key_points"] == ["Hire two engineers"]
+
+    doc = Document(io.BytesIO(render_word(document)))
+    headings = [p.text for p in doc.paragraphs if p.style.name.startswith("Heading")]
+    assert "Growth Strategy" in headings and "Pricing Strategy" in headings
+
+
+def test_section_classifier_caches_vectors_to_disk(tmp_path):
+    from app.services.section_classifier import SectionClassifier
+
+    path = str(tmp_path / "vectors.npz")
+    built = SectionClassifier(cache_path=path)
+    loaded = SectionClassifier(cache_path=path)
+    assert not built.loaded_from_disk and loaded.loaded_from_disk
+
+    points = ["Customer acquisition through paid ads", "We need a seed round of funding", "zzz"]
+    assert loaded.assign("saas", "business_plan", points) == [(3, 0), (4, 2), (0, None)]
+    assert loaded.assign("saas", "business_plan", points) == built.assign("saas", "business_plan", points)
+
+
+def test_server_settings_come_from_the_environment(monkeypatch):
+    from app.utils.config import server_settings
+
+    monkeypatch.setenv("PORT", "8080")
+    monkeypatch.setenv("SERVER_WORKERS", "3")
+    monkeypatch.setenv("SERVER_PRELOAD", "true")
+    settings = server_settings()
+    assert settings["SERVER_BIND"] == "0.0.0.0:8080"
+    assert settings["SERVER_WORKERS"] == 3
+    assert settings["SERVER_PRELOAD"] is True
+    assert settings["DEBUG"] is False
+
+
+def test_asgi_adapter_runs_requests_concurrently_and_closes_responses():
+    from app.utils.asgi import ThreadPoolWsgiToAsgi
+
+    closed = []
+
+    class Body:
+        def __iter__(self):
+            time.sleep(0.3)
+            yield b"done"
+
+        def close(self):
+            closed.append(threading.current_thread().name)
+
+    def wsgi_app(environ, start_response):
+        start_response("200 OK", [("Content-Type", "text/plain")])
+        return Body()
+
+    adapter = ThreadPoolWsgiToAsgi(wsgi_app, threads=4)
+    scope = {"type": "http", "method": "GET", "path": "/", "query_string": b"", "http_version": "1.1", "headers": []}
+
+    async def request():
+        sent = []
+
+        async def receive():
+            return {"type": "http.request", "body": b""}
+
+        async def send(message):
+            sent.append(message)
+
+        await adapter(scope, receive, send)
+        return b"".join(message.get("body", b"") for message in sent)
+
+    async def main():
+        return await asyncio.gather(*(request() for _ in range(4)))
+
+    start = time.perf_counter()
+    assert asyncio.run(main()) == [b"done"] * 4
+    # One shared thread would take 4 x 0.3 s.
+    assert time.perf_counter() - start < 0.9
+    assert len(closed) == 4 and all(name.startswith("asgi") for name in closed)
+    adapter.close()
+
+
+def test_google_docs_content_goes_out_in_one_batch_update():
+    requests = GoogleDocsPublisher.build_requests("Business Plan:\n\nMarket Analysis\n- Grow 🚀\n- Hire")
+    assert [next(iter(r)) for r in requests] == [
+        "insertText", "updateParagraphStyle", "updateParagraphStyle", "createParagraphBullets", "createParagraphBullets",
+    ]
+    assert requests[0]["insertText"]["text"] == "Business Plan\nMarket Analysis\nGrow 🚀\nHire\n"
+    # The emoji is two UTF-16 code units, so the last bullet starts one index later.
+    assert requests[3]["createParagraphBullets"]["range"] == {"startIndex": 31, "endIndex": 39}
+    assert requests[4]["createParagraphBullets"]["range"] == {"startIndex": 39, "endIndex": 44}
+
+
+class FakeNotion:
+    def __init__(self):
+        self.retrieves = 0
+        self.created = []
+        self.appended = []
+        self.fail_appends = 0
+        self.databases = self.pages = self
+        self.blocks = type("Blocks", (), {"children": type("Children", (), {"append": self._append})()})()
+
+    def retrieve(self, database_id):
+        self.retrieves += 1
+        return {"properties": {"Name": {"type": "title"}, "Status": {"type": "select"}, "Due Date": {"type": "date"}}}
+
+    def create(self, parent, properties, children):
+        self.created.append((properties, children))
+        return {"id": "page1", "url": "https://notion.so/page1"}
+
+    def _append(self, block_id, children):
+        if self.fail_appends:
+            self.fail_appends -= 1
+            raise ConnectionError("502 from Notion")
+        self.appended.append(children)
+
+
+def test_notion_publisher_caches_schema_and_splits_blocks():
+    notion = FakeNotion()
+    publisher = NotionPublisher(type("Clients", (), {"notion": notion})(), database_id="db")
+    content = "Plan:\n\n" + "\n".join(f"- point {i}" for i in range(150)) + "\n" + "x" * 4500
+
+    assert publisher.publish("Plan", content) == "https://notion.so/page1"
+    publisher.publish("Plan", "Plan:\n\n- one")
+    assert notion.retrieves == 1
+
+    properties, children = notion.created[0]
+    assert "Name" in properties and properties["Status"] == {"select": {"name": "In Progress"}}
+    assert properties["Due Date"] == {"date": {"start": "2024-12-31"}}
+    assert len(children) == 100 and len(notion.appended) == 1 and len(notion.appended[0]) == 52
+    long_block = notion.appended[0][-1]["paragraph"]["rich_text"]
+    assert [len(piece["text"]["content"]) for piece in long_block] == [2000, 2000, 500]
+
+
+def test_publish_service_retries_then_fails(tmp_path):
+    class Flaky:
+        def publish(self, title, content, progress=None, checkpoint=None):
+            raise ConnectionError("503 from provider")
+
+    outbox = PublishOutbox(str(tmp_path / "outbox.db"))
+    service = PublishService(outbox, {"notion": Flaky()}, workers=0, max_attempts=2, retry_backoff=0)
+    publish_id = service.submit("notion", "Plan", "Plan:")
+
+    service.process(outbox.claim(1)[0])
+    assert outbox.get(publish_id)["status"] == "pending"
+    service.process(outbox.claim(1)[0])
+    entry = outbox.get(publish_id)
+    assert entry["status"] == "failed" and entry["attempts"] == 2 and "503" in entry["error"]
+    assert outbox.claim(1) == []
+
+
+def test_notion_retry_resumes_the_page_it_created(tmp_path):
+    notion = FakeNotion()
+    notion.fail_appends = 1
+    publisher = NotionPublisher(type("Clients", (), {"notion": notion})(), database_id="db")
+    outbox = PublishOutbox(str(tmp_path / "outbox.db"))
+    service = PublishService(outbox, {"notion": publisher}, workers=0, retry_backoff=0)
+    publish_id = service.submit("notion", "Plan", "Plan:\n\n" + "\n".join(f"- point {i}" for i in range(250)))
+
+    service.process(outbox.claim(1)[0])
+    assert outbox.get(publish_id)["status"] == "pending"
+    service.process(outbox.claim(1)[0])
+
+    assert outbox.get(publish_id)["status"] == "succeeded"
+    assert len(notion.created) == 1
+    assert [len(children) for children in notion.appended] == [100, 51]
+
+
+def test_weighted_fair_queue_shares_slots_by_weight():
+    queue = WeightedFairQueue(1, {"high": 4, "low": 1.5}, max_queue=0)
+    queue.acquire("high")
+    order = []
+
+    def request(priority):
+        queue.acquire(priority, timeout=5)
+        order.append(priority)
+        queue.release()
+
+    threads = []
+    for priority in ["high"] * 6 + ["low"] * 2:
+        queue.max_queue += 1
+        thread = threading.Thread(target=request, args=(priority,))
+        thread.start()
+        threads.append(thread)
+        while queue.stats()["queued"] < len(threads):
+            time.sleep(0.001)
+    with pytest.raises(AdmissionRejected):
+        queue.acquire("low", timeout=5)
+
+    queue.release()
+    for thread in threads:
+        thread.join()
+    # Low priority is slowed down, not starved.
+    assert order == ["high", "high", "low", "high", "high", "high", "low", "high"]
+    assert queue.stats()["active"] == 0
+
+
+def test_tenant_quota_survives_restart(tmp_path):
+    store = QuotaStore(str(tmp_path / "quotas.db"))
+    quotas = TenantQuotas({"normal": 0.01}, {"normal": 5}, store=store)
+    assert quotas.consume("acme", "normal", 4) == 0
+    assert quotas.consume("acme", "normal", 4) > 60
+    quotas.flush()
+
+    restarted = TenantQuotas({"normal": 0.01}, {"normal": 5}, store=QuotaStore(str(tmp_path / "quotas.db")))
+    assert restarted.consume("acme", "normal", 4) > 60
+    assert restarted.consume("globex", "normal", 4) == 0
+
+
+def test_tenant_quotas_are_bounded_and_evicted_levels_kept(tmp_path):
+    store = QuotaStore(str(tmp_path / "quotas.db"))
+    quotas = TenantQuotas({"normal": 0.01}, {"normal": 5}, store=store, max_tenants=3)
+    assert quotas.consume("acme", "normal", 4) == 0
+    for i in range(50):
+        quotas.consume(f"random-{i}", "normal", 1)
+    assert len(quotas) == 3 and quotas.evictions == 48
+
+    # acme was evicted with its level saved, so coming back does not refill it.
+    assert quotas.consume("acme", "normal", 4) > 60
+
+    quotas.idle_ttl = 0
+    quotas.flush()
+    assert len(quotas) == 0 and store.load("acme") is None
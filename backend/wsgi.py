@@ -0,0 +1,8 @@
+"""WSGI entry point for production servers: gunicorn -c gunicorn.conf.py wsgi:app"""
+import atexit
+from app import create_app, shutdown_app
+
+app = create_app()
+
+# gunicorn's worker_exit hook also calls this; it only runs once.
+atexit.register(shutdown_app, app)
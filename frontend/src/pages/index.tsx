@@ -2,6 +2,7 @@ import React, { useState } from 'react';
 import Header from '../components/Header';
 import TemplateCard from '../components/TemplateCard';
 import Footer from '../components/Footer';
+import { publishTemplate } from '../utils/api';
 import styles from '../styles/Home.module.scss';
 
 const Home = () => {
@@ -116,19 +117,8 @@ const Home = () => {
                 link.remove();
                 window.URL.revokeObjectURL(url);
             } else if (saveOption === 'googleDocs') {
-                const googleDocsResponse = await fetch('/api/templates/save_to_google_docs', {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({ key_points: data.key_points, template_type: selectedTemplate }),
-                });
-
-                if (!googleDocsResponse.ok) {
-                    const errorText = await googleDocsResponse.text();
-                    throw new Error(`Failed to save to Google Docs: ${errorText}`);
-                }
-
-                const googleDocsData = await googleDocsResponse.json();
-                window.open(googleDocsData.url, '_blank');
+                const docUrl = await publishTemplate('google_docs', data.key_points, selectedTemplate);
+                window.open(docUrl, '_blank');
             }
         } catch (err) {
             setError(err instanceof Error ? err.message : 'An unknown error occurred.');
@@ -2,7 +2,7 @@ import { useState } from 'react';
 import Header from '../components/Header';
 import Footer from '../components/Footer';
 import styles from '../styles/Home.module.scss';
-import { fetchConversation, generateTemplate } from '../utils/api';
+import { fetchConversation, generateTemplate, publishTemplate } from '../utils/api';
 
 const TemplateGeneration = () => {
     const [platform, setPlatform] = useState('slack');
@@ -60,19 +60,8 @@ const TemplateGeneration = () => {
 
       try {
           if (saveOption === 'googleDocs') {
-              const response = await fetch('/api/templates/save_to_google_docs', {
-                  method: 'POST',
-                  headers: { 'Content-Type': 'application/json' },
-                  body: JSON.stringify({ key_points: keyPoints, template_type: templateType }),
-              });
-
-              if (!response.ok) {
-                  const errorData = await response.json();
-                  throw new Error(errorData.error || `Failed to save to Google Docs: ${response.status}`);
-              }
-
-              const data = await response.json();
-              window.open(data.url, '_blank');
+              const docUrl = await publishTemplate('google_docs', keyPoints, templateType);
+              window.open(docUrl, '_blank');
           } else if (saveOption === 'download') {
               try {
                   const response = await generateTemplate(keyPoints, templateType, fileFormat);
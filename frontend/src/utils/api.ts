@@ -52,4 +52,42 @@ export const generateTemplate = async (keyPoints: string[], templateType: string
         console.error('Error generating template:', error);
         throw error;
     }
-};
\ No newline at end of file
+};
+// Publishing runs in the background: the save endpoints return a publish id and a
+// status URL, which is polled until the document URL is ready.
+export const publishTemplate = async (
+    provider: 'google_docs' | 'notion',
+    keyPoints: string[],
+    templateType: string,
+    pollIntervalMs = 1000,
+    timeoutMs = 120000,
+): Promise<string> => {
+    const response = await fetch(`${BASE_URL}/templates/save_to_${provider}`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ key_points: keyPoints, template_type: templateType }),
+    });
+
+    if (!response.ok) {
+        const errorText = await response.text();
+        throw new Error(`Failed to publish template: ${response.status} - ${errorText}`);
+    }
+
+    const { status_url: statusUrl } = await response.json();
+    const deadline = Date.now() + timeoutMs;
+    while (Date.now() < deadline) {
+        await new Promise((resolve) => setTimeout(resolve, pollIntervalMs));
+        const statusResponse = await fetch(`${BASE_URL}${statusUrl}`);
+        if (!statusResponse.ok) {
+            throw new Error(`Failed to check publish status: ${statusResponse.status}`);
+        }
+        const status = await statusResponse.json();
+        if (status.status === 'succeeded') {
+            return status.url;
+        }
+        if (status.status === 'failed') {
+            throw new Error(status.error || 'Publishing failed');
+        }
+    }
+    throw new Error('Publishing is taking longer than expected; please try again later.');
+};